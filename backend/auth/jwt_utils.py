@@ -1,8 +1,80 @@
-import jwt
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify, current_app
+
+import jwt
+from flask import request, jsonify, g
 from backend.config import SECRET_KEY
 
+# Tokens whose signature has already been verified in this process, most recent last.
+# A hit skips the HMAC check and JSON parsing; expiry is still enforced on every use.
+VERIFIED_TOKEN_CACHE_SIZE = 1024
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+
+
+class AuthContext:
+    """Claims of the request's bearer token, decoded once by `token_required`.
+
+    Handlers read it with `current_auth()` instead of parsing the header again.
+    """
+
+    __slots__ = ('user_id', 'role', 'company_id', 'agent_number', 'exp', 'token')
+
+    def __init__(self, claims: dict, token: str):
+        self.user_id = claims['user_id']
+        self.role = claims.get('role', 'admin')
+        company_id = claims.get('company_id')
+        self.company_id = int(company_id) if company_id else None
+        self.agent_number = claims.get('agent_number')
+        self.exp = claims.get('exp')
+        self.token = token
+
+    @property
+    def is_tenant(self) -> bool:
+        """True for company admins/agents, whose data lives in per-company tables."""
+        return self.role in ('admin', 'agent') and bool(self.company_id)
+
+
+def decode_token(token: str) -> AuthContext:
+    """Verify `token` and return its AuthContext, using the verified-token LRU.
+
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode.
+    """
+    with _verified_lock:
+        context = _verified.get(token)
+        if context is not None:
+            _verified.move_to_end(token)
+    if context is not None:
+        if context.exp is not None and context.exp <= time.time():
+            with _verified_lock:
+                _verified.pop(token, None)
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        return context
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    try:
+        context = AuthContext(claims, token)
+    except (KeyError, TypeError, ValueError):
+        raise jwt.InvalidTokenError('Token is missing required claims')
+    with _verified_lock:
+        _verified[token] = context
+        if len(_verified) > VERIFIED_TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return context
+
+
+def clear_verified_tokens() -> None:
+    with _verified_lock:
+        _verified.clear()
+
+
+def current_auth() -> AuthContext:
+    """AuthContext of the current request (set by `token_required`)."""
+    return g.auth
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -16,11 +88,10 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token missing'}), 401
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            current_user_id = data['user_id']
+            g.auth = decode_token(token)
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token expired'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'message': 'Token invalid'}), 401
-        return f(current_user_id, *args, **kwargs)
-    return decorated
\ No newline at end of file
+        return f(g.auth.user_id, *args, **kwargs)
+    return decorated
@@ -0,0 +1,135 @@
+"""Benchmark: POST /api/calls/upload ingest, legacy per-row path vs the streaming pipeline.
+
+Generates .xlsx files with N synthetic rows (write-only mode, cached next to this
+script), loads each into a scratch tenant (default company id 999998) and reports
+wall time, rows/s and peak RSS. Each run happens in a fresh child process so peak
+RSS is per run. Legacy runs are skipped above --legacy-max rows (they take hours at 1M).
+
+    python backend/benchmarks/bench_calls_ingest.py --rows 10000 100000 1000000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from openpyxl import Workbook, load_workbook
+from backend.db.connection import get_db_connection
+from backend.db.call_rollups import customer_table_name, daily_table_name, hourly_table_name
+from backend.db.company_tables import get_company_table_name
+from backend.db.customers import customers_table_name
+from backend.db.migrations import migrate_tenant
+from backend.ingest.calls import ingest_calls, read_xlsx_rows
+from backend.ingest.phones import normalize_indian_mobile, is_valid_indian_mobile
+
+AGENTS = [str(1000 + i) for i in range(50)]
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
+def sheet_path(rows):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f'calls_{rows}.xlsx')
+    if not os.path.exists(path):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(['agent_number', 'customer', 'name', 'remarks'])
+        for i in range(rows):
+            ws.append([random.choice(AGENTS), f'+91 9{random.randint(0, 999999999):09d}', f'Customer {i}', 'bench'])
+        wb.save(path)
+    return path
+
+
+def legacy_ingest(connection, company_id, path):
+    """The pre-pipeline handler body: full workbook load, one SELECT + INSERT per row."""
+    with open(path, 'rb') as fh:
+        wb = load_workbook(filename=io.BytesIO(fh.read()))
+    ws = wb.active
+    cursor = connection.cursor(buffered=True)
+    agents_table = get_company_table_name('agents', company_id)
+    calls_table = get_company_table_name('calls', company_id)
+    inserted = 0
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        digits = normalize_indian_mobile(row[1])
+        if not is_valid_indian_mobile(digits):
+            continue
+        cursor.execute(f"SELECT 1 FROM `{agents_table}` WHERE agent_number = %s", (str(row[0]),))
+        if cursor.fetchone() is None:
+            continue
+        cursor.execute(
+            f"INSERT INTO `{calls_table}` (agent_number, customer_number, duration, call_status, timestamp, "
+            "remarks, name, remarks_status) VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s)",
+            (str(row[0]), digits, 0, 'Uploaded', row[3], row[2], ''))
+        inserted += 1
+    connection.commit()
+    cursor.close()
+    return inserted
+
+
+def child(mode, company_id, path):
+    connection = get_db_connection()
+    t0 = time.perf_counter()
+    if mode == 'legacy':
+        inserted = legacy_ingest(connection, company_id, path)
+    else:
+        with open(path, 'rb') as fh:
+            inserted = ingest_calls(connection, company_id, read_xlsx_rows(fh)).inserted
+    elapsed = time.perf_counter() - t0
+    connection.close()
+    # ru_maxrss is KiB on Linux
+    print(json.dumps({'inserted': inserted, 'seconds': elapsed,
+                      'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}))
+
+
+def prepare_tenant(company_id):
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    # Ingest also writes customers_<id> and the call rollups: the tenant needs the current schema
+    migrate_tenant(connection, company_id)
+    cursor = connection.cursor()
+    cursor.executemany(
+        f"INSERT IGNORE INTO `{get_company_table_name('agents', company_id)}` (agent_number, name, email, password) "
+        "VALUES (%s, %s, %s, %s)",
+        [(a, f'Agent {a}', f'{a}@bench.test', 'x') for a in AGENTS])
+    for table in (get_company_table_name('calls', company_id), customers_table_name(company_id),
+                  hourly_table_name(company_id), daily_table_name(company_id), customer_table_name(company_id)):
+        cursor.execute(f"TRUNCATE TABLE `{table}`")
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    ap.add_argument('--company-id', type=int, default=999998)
+    ap.add_argument('--legacy-max', type=int, default=100000)
+    ap.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child[0], args.company_id, args.child[1])
+        return
+
+    print(f"{'rows':>9} {'mode':<8} {'seconds':>9} {'rows/s':>10} {'peak RSS':>10}")
+    for rows in args.rows:
+        path = sheet_path(rows)
+        for mode in ('legacy', 'stream'):
+            if mode == 'legacy' and rows > args.legacy_max:
+                continue
+            prepare_tenant(args.company_id)
+            out = subprocess.run(
+                [sys.executable, __file__, '--company-id', str(args.company_id), '--child', mode, path],
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{rows:>9} {mode:<8} {result['seconds']:>9.1f} {rows / result['seconds']:>10.0f} "
+                  f"{result['peak_rss_mb']:>8.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
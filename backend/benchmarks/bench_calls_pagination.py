@@ -0,0 +1,119 @@
+"""Benchmark: GET /api/calls full scan vs keyset pagination.
+
+Seeds a scratch tenant (default company id 999999) with synthetic calls and times
+the unpaginated listing against the first page and a deep page of the keyset
+query. Runs against the database configured in backend/config.py.
+
+    python backend/benchmarks/bench_calls_pagination.py --rows 1000000 --limit 100 --depth 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.db.connection import get_db_connection
+from backend.db.company_tables import get_company_table_name
+from backend.db.migrations import migrate_tenant
+from backend.routes.calls import calls_listing_query, keyset_after
+
+
+def seed(connection, table, rows):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+    existing = cursor.fetchone()[0]
+    batch = []
+    start = time.time() - 365 * 86400
+    for i in range(existing, rows):
+        batch.append((
+            str(1000 + i % 50),
+            str(9000000000 + random.randint(0, 99999999)),
+            random.randint(0, 900),
+            random.choice(('Answered', 'Missed', 'Uploaded')),
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start + i * 365 * 86400 / rows)),
+        ))
+        if len(batch) == 5000:
+            cursor.executemany(
+                f"INSERT INTO `{table}` (agent_number, customer_number, duration, call_status, timestamp) "
+                "VALUES (%s, %s, %s, %s, %s)", batch)
+            connection.commit()
+            batch = []
+    if batch:
+        cursor.executemany(
+            f"INSERT INTO `{table}` (agent_number, customer_number, duration, call_status, timestamp) "
+            "VALUES (%s, %s, %s, %s, %s)", batch)
+        connection.commit()
+    cursor.close()
+
+
+def timed(connection, sql, params, repeat):
+    samples = []
+    rows = []
+    for _ in range(repeat):
+        cursor = connection.cursor(dictionary=True)
+        t0 = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        cursor.close()
+    return statistics.median(samples), rows
+
+
+def listing_sql(company_id):
+    """The SELECT GET /api/calls runs for a company admin, without date filters."""
+    base_query, _, _, _ = calls_listing_query('admin', None, company_id, None, None)
+    return base_query
+
+
+def page_sql(company_id, limit, after=None):
+    sql = listing_sql(company_id)
+    params = []
+    if after is not None:
+        where, params = keyset_after('c', after[0], after[1])
+        sql += f" WHERE {where}"
+    sql += " ORDER BY c.timestamp DESC, c.id DESC LIMIT %s"
+    return sql, tuple(params) + (limit + 1,)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--company-id', type=int, default=999999)
+    ap.add_argument('--rows', type=int, default=200000)
+    ap.add_argument('--limit', type=int, default=100)
+    ap.add_argument('--depth', type=int, default=1000, help='page number used for the deep-page timing')
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    # The listing joins customers_<id>, so the tenant needs the full current schema
+    migrate_tenant(connection, args.company_id)
+    table = get_company_table_name('calls', args.company_id)
+    seed(connection, table, args.rows)
+
+    full_ms, full_rows = timed(
+        connection, listing_sql(args.company_id) + " ORDER BY c.timestamp DESC", (), args.repeat)
+    first_ms, _ = timed(connection, *page_sql(args.company_id, args.limit), args.repeat)
+
+    # Locate the row that starts the deep page, then time only that page's query
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT DATE_FORMAT(timestamp, '%Y-%m-%d %H:%i:%s'), id FROM `{table}` "
+        "ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET %s",
+        (min(args.depth * args.limit, max(len(full_rows) - 1, 0)),))
+    anchor = cursor.fetchone()
+    cursor.close()
+    deep_ms, _ = timed(connection, *page_sql(args.company_id, args.limit, anchor), args.repeat)
+
+    print(f"rows in table        : {len(full_rows)}")
+    print(f"unpaginated listing  : {full_ms:9.2f} ms")
+    print(f"keyset first page    : {first_ms:9.2f} ms  (limit {args.limit})")
+    print(f"keyset page {args.depth:<8} : {deep_ms:9.2f} ms")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Microbenchmark: upload parse + validate throughput per format, and phone normalisation.
+
+No database is needed. Synthetic files are generated in memory; each format is read
+with backend.ingest.formats.open_rows and validated in INGEST_BATCH_SIZE batches by
+the same _prepare_batch the upload endpoint uses (only the INSERT is left out).
+
+- normalize: per-value normalize_indian_mobile + is_valid_indian_mobile vs
+  normalize_mobile_batch over the same column
+- parse: rows/s from raw bytes to INSERT parameters for csv, tsv, ndjson and
+  their .gz variants
+
+    python backend/benchmarks/bench_ingest_formats.py --rows 100000
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.ingest.calls import INGEST_BATCH_SIZE, IngestReport, _prepare_batch, column_indices
+from backend.ingest.formats import open_rows
+from backend.ingest.phones import is_valid_indian_mobile, normalize_indian_mobile, normalize_mobile_batch
+
+AGENTS = [str(1000 + i) for i in range(50)]
+HEADER = ('agent_number', 'customer', 'name', 'remarks')
+
+
+def synthetic_rows(count):
+    formats = ('+91 9{:09d}', '09{:09d}', '9{:09d}', '91-9{:09d}', '5{:09d}')
+    return [(random.choice(AGENTS), random.choice(formats).format(random.randint(0, 999999999)),
+             f'Customer {i}', 'bench') for i in range(count)]
+
+
+def encode(rows, fmt):
+    buf = io.StringIO(newline='')
+    if fmt == 'ndjson':
+        for row in rows:
+            buf.write(json.dumps(dict(zip(HEADER, row))) + '\n')
+    else:
+        writer = csv.writer(buf, delimiter='\t' if fmt == 'tsv' else ',')
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+
+def parse_and_validate(data, fmt, gzipped):
+    rows, header_row = open_rows(io.BytesIO(data), fmt, gzipped)
+    rows = iter(rows)
+    columns = column_indices(next(rows))
+    agent_numbers = set(AGENTS)
+    report = IngestReport()
+    batch, accepted = [], 0
+    for row_number, row in enumerate(rows, start=header_row + 1):
+        batch.append((row_number, row))
+        if len(batch) >= INGEST_BATCH_SIZE:
+            accepted += len(_prepare_batch(batch, columns, '', agent_numbers, report))
+            batch = []
+    if batch:
+        accepted += len(_prepare_batch(batch, columns, '', agent_numbers, report))
+    return accepted, report.error_count
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--rows', type=int, default=100000)
+    ap.add_argument('--seed', type=int, default=7)
+    args = ap.parse_args()
+    random.seed(args.seed)
+    rows = synthetic_rows(args.rows)
+
+    numbers = [r[1] for r in rows]
+    per_value = lambda: [d if is_valid_indian_mobile(d) else None
+                         for d in map(normalize_indian_mobile, numbers)]
+    t_scalar, scalar = timed(per_value)
+    t_batch, batch = timed(normalize_mobile_batch, numbers)
+    assert scalar == batch, 'batch normalisation disagrees with the per-value helpers'
+    print(f"normalize {args.rows} numbers")
+    print(f"  {'per-value':<10} {t_scalar:>8.3f}s {args.rows / t_scalar:>12.0f} rows/s")
+    print(f"  {'batch':<10} {t_batch:>8.3f}s {args.rows / t_batch:>12.0f} rows/s")
+
+    print(f"parse + validate {args.rows} rows")
+    print(f"  {'format':<10} {'size':>10} {'seconds':>9} {'rows/s':>12} {'accepted':>9} {'errors':>7}")
+    for fmt in ('csv', 'tsv', 'ndjson'):
+        raw = encode(rows, fmt)
+        for gzipped, data in ((False, raw), (True, gzip.compress(raw, compresslevel=6))):
+            seconds, (accepted, errors) = timed(parse_and_validate, data, fmt, gzipped)
+            label = fmt + ('.gz' if gzipped else '')
+            print(f"  {label:<10} {len(data) / 1e6:>8.1f}MB {seconds:>9.2f} {args.rows / seconds:>12.0f} "
+                  f"{accepted:>9} {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
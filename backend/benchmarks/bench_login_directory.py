@@ -0,0 +1,126 @@
+"""Benchmark: tenant resolution at login, per-tenant scan vs the login directory.
+
+Creates N synthetic tenants (agents tables only, company ids from --base-id up) with
+a few agents each and registers them in login_directory, then times resolving:
+
+- a login that lives in the last tenant (the scan's worst successful case)
+- an unknown login (every failed login paid the full scan before)
+
+"scan" replays the old fallback: one SELECT against every agents_<id> table.
+"directory" is what /api/login does now: one indexed lookup plus one query per
+matching tenant. Scratch tables are dropped afterwards unless --keep is given.
+
+    python backend/benchmarks/bench_login_directory.py --tenants 1000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.db.connection import get_db_connection
+from backend.db.company_tables import company_table_statements, get_company_table_name
+from backend.db.login_directory import CREATE_LOGIN_DIRECTORY, backfill_company, companies_for_login
+
+AGENTS_PER_TENANT = 5
+
+
+def agent_lookup(cursor, company_id, login_id, password):
+    cursor.execute(
+        f"SELECT id, agent_number, name, email, is_admin, status FROM `{get_company_table_name('agents', company_id)}` "
+        "WHERE agent_number = %s AND password = %s",
+        (login_id, password)
+    )
+    return cursor.fetchone()
+
+
+def resolve_by_scan(cursor, company_ids, login_id, password):
+    queries = 0
+    for cid in company_ids:
+        queries += 1
+        if agent_lookup(cursor, cid, login_id, password):
+            return cid, queries
+    return None, queries
+
+
+def resolve_by_directory(cursor, login_id, password):
+    queries = 1
+    for cid in companies_for_login(cursor, login_id):
+        queries += 1
+        if agent_lookup(cursor, cid, login_id, password):
+            return cid, queries
+    return None, queries
+
+
+def seed(connection, company_ids):
+    cursor = connection.cursor(buffered=True)
+    cursor.execute(CREATE_LOGIN_DIRECTORY)
+    for cid in company_ids:
+        cursor.execute(company_table_statements(cid)[0])  # agents table only
+        cursor.executemany(
+            f"INSERT IGNORE INTO `{get_company_table_name('agents', cid)}` (agent_number, name, email, password) "
+            "VALUES (%s, %s, %s, %s)",
+            [(f"{cid}{n:02d}", f"Agent {n}", f"a{n}@t{cid}.test", 'secret') for n in range(AGENTS_PER_TENANT)]
+        )
+        backfill_company(cursor, cid)
+    connection.commit()
+    cursor.close()
+
+
+def cleanup(connection, company_ids):
+    cursor = connection.cursor()
+    cursor.execute(
+        "DELETE FROM login_directory WHERE company_id BETWEEN %s AND %s", (company_ids[0], company_ids[-1]))
+    for cid in company_ids:
+        cursor.execute(f"DROP TABLE IF EXISTS `{get_company_table_name('agents', cid)}`")
+    connection.commit()
+    cursor.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples), result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--tenants', type=int, default=1000)
+    ap.add_argument('--base-id', type=int, default=900000)
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--keep', action='store_true', help='keep the scratch tenants')
+    args = ap.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    company_ids = list(range(args.base_id, args.base_id + args.tenants))
+    try:
+        t0 = time.perf_counter()
+        seed(connection, company_ids)
+        print(f"seeded {args.tenants} tenants in {time.perf_counter() - t0:.1f} s")
+
+        cursor = connection.cursor(buffered=True)
+        last_login = f"{company_ids[-1]}00"
+        cases = (('last tenant', last_login), ('unknown login', '1'))
+        for label, login_id in cases:
+            scan_ms, (_, scan_q) = timed(
+                lambda: resolve_by_scan(cursor, company_ids, login_id, 'secret'), args.repeat)
+            dir_ms, (_, dir_q) = timed(
+                lambda: resolve_by_directory(cursor, login_id, 'secret'), args.repeat)
+            print(f"{label:<14} scan {scan_ms:9.2f} ms ({scan_q} queries)   "
+                  f"directory {dir_ms:7.2f} ms ({dir_q} queries)")
+        cursor.close()
+    finally:
+        if not args.keep:
+            cleanup(connection, company_ids)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Query-plan regression check for the per-tenant hot queries.
+
+Seeds a scratch tenant (default company id 999997) through the tenant migrations,
+so it carries exactly the production index set, refreshes its statistics and runs
+EXPLAIN FORMAT=JSON on every hot query issued by the route modules. Exits with
+status 1 if any plan reads a table with a full scan (access_type ALL) or sorts
+with a filesort. Run it against a local MySQL after changing a query or an index:
+
+    python backend/benchmarks/check_query_plans.py --calls 50000 --breaks 20000
+
+Queries that return every row by design (the unpaginated calls listing) are listed as
+skipped rather than checked. Scans and sorts of the agents roster are tolerated: it
+holds one row per agent and is read whole.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.db.connection import get_db_connection
+from backend.db.company_tables import get_company_table_name
+from backend.db.migrations import migrate_tenant
+from backend.db.break_history import day_aggregates, latest_open_break, list_breaks, page_days, search_agents
+from backend.db.agent_state import current_status_sql, rebuild_table as rebuild_agent_state
+from backend.db.call_remarks import list_remarks, remarks_table_name
+from backend.db.customers import customers_table_name
+from backend.ingest.corrections import _existing_upload_ids
+from backend.routes.calls import calls_listing_query, keyset_after
+
+AGENTS = [str(1000 + i) for i in range(50)]
+DAY = '2025-06-15'
+
+
+class ExplainCursor:
+    """Stands in for a cursor handed to backend helpers: records the plan of each
+    statement they execute instead of running it."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.plans = []
+
+    def execute(self, sql, params=()):
+        self._cursor.execute('EXPLAIN FORMAT=JSON ' + sql, params)
+        self.plans.append(json.loads(self._cursor.fetchone()[0]))
+
+    def fetchone(self):
+        return (None,)
+
+    def fetchall(self):
+        return []
+
+
+def calls_listing(company_id, agent=None, date_range=False, after=None, limit=100):
+    """The paginated GET /api/calls query, from backend.routes.calls.calls_listing_query."""
+    day = DAY if date_range else None
+    sql, where, params, _ = calls_listing_query('agent' if agent else 'admin', agent, company_id, day, day)
+    if after:
+        after_sql, after_params = keyset_after('c', *after)
+        where.append(after_sql)
+        params.extend(after_params)
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY c.timestamp DESC, c.id DESC LIMIT %s'
+    return sql, params + [limit + 1]
+
+
+def open_break_lookup(company_id):
+    """close_latest_agent_break in backend.routes.agents."""
+    return lambda cursor: latest_open_break(cursor, company_id, AGENTS[0])
+
+
+def current_status(company_id, agent=None):
+    """get_agents_current_status in backend.routes.agents."""
+    sql = current_status_sql(company_id)
+    if agent:
+        return sql + " WHERE a.agent_number = %s ORDER BY a.agent_number", [agent]
+    return sql + " WHERE a.status = 'Active' AND a.is_admin = 0 ORDER BY a.agent_number", []
+
+
+def break_history(helper, agents=None):
+    """One statement of get_agent_breaks in backend.routes.agents, for a one-week page."""
+    upper = datetime.datetime(2025, 6, 16)
+    lower = upper - datetime.timedelta(days=7)
+
+    def run(company_id):
+        if helper is page_days:
+            return lambda cursor: page_days(cursor, company_id, upper, 7, agent_numbers=agents)
+        return lambda cursor: helper(cursor, company_id, lower, upper, agents)
+    return run
+
+
+def agent_search(mode):
+    return lambda cid: (lambda cursor: search_agents(cursor, cid, 'Agent 10', mode))
+
+
+def unpaginated_calls(company_id):
+    """get_calls without ?limit/?cursor (and ?stream=): every row, newest first."""
+    sql, params = calls_listing(company_id)
+    return sql.rsplit(' LIMIT', 1)[0], params[:-1]
+
+
+def remark_history(company_id):
+    return lambda cursor: list_remarks(cursor, company_id, 1, 20, before_id=1000)
+
+
+def corrections_lookup(company_id):
+    chunk = [(2, AGENTS[0], '9000000001', '', ''), (3, AGENTS[1], '9000000002', '', '')]
+    return lambda cursor: _existing_upload_ids(cursor, get_company_table_name('calls', company_id), chunk)
+
+
+# name -> (builder, tolerated tables, checked). A builder returns (sql, params) or a
+# callable that issues its statements against a cursor.
+HOT_QUERIES = {
+    'calls: admin first page': (lambda cid: calls_listing(cid), (), True),
+    'calls: admin page after cursor': (lambda cid: calls_listing(cid, after=(DAY + ' 12:00:00', 10 ** 9)), (), True),
+    'calls: admin date range': (lambda cid: calls_listing(cid, date_range=True), (), True),
+    'calls: agent first page': (lambda cid: calls_listing(cid, agent=AGENTS[0]), (), True),
+    'calls: agent date range after cursor': (
+        lambda cid: calls_listing(cid, agent=AGENTS[0], date_range=True, after=(DAY + ' 12:00:00', 10 ** 9)), (), True),
+    'calls: remark history page': (remark_history, (), True),
+    'calls: corrections upsert lookup': (corrections_lookup, (), True),
+    'breaks: open break of agent': (open_break_lookup, (), True),
+    'breaks: current status (admin)': (lambda cid: current_status(cid), ('a',), True),
+    'breaks: current status (agent)': (lambda cid: current_status(cid, AGENTS[0]), ('a',), True),
+    'breaks: history day probe': (break_history(page_days), (), True),
+    'breaks: history day probe (agents)': (break_history(page_days, AGENTS[:3]), (), True),
+    'breaks: history page': (break_history(list_breaks), (), True),
+    'breaks: history page (agents)': (break_history(list_breaks, AGENTS[:3]), (), True),
+    # A page's (day, agent) groups are sorted in a temporary table: at most days x agents rows
+    'breaks: history aggregates': (break_history(day_aggregates), ('ab',), True),
+    'agents: prefix search': (agent_search('prefix'), (), True),
+    'agents: full-text search': (agent_search('fulltext'), (), True),
+    'calls: unpaginated listing': (unpaginated_calls, (), False),
+}
+
+
+def plan_problems(plan, tolerated=()) -> list:
+    """Full table scans and filesorts anywhere in an EXPLAIN FORMAT=JSON document."""
+    problems = []
+
+    def first_table(node):
+        # The table a sort node reads first is the one whose rows it sorts
+        if isinstance(node, dict):
+            if isinstance(node.get('table'), dict):
+                return node['table'].get('table_name')
+            values = node.values()
+        elif isinstance(node, list):
+            values = node
+        else:
+            return None
+        for value in values:
+            name = first_table(value)
+            if name:
+                return name
+        return None
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table')
+            if isinstance(table, dict):
+                name = table.get('table_name', '?')
+                # Materialized derived tables are always read whole; their own plans are walked
+                if table.get('access_type') == 'ALL' and name not in tolerated and not name.startswith('<'):
+                    problems.append(f"full scan of {name}")
+            if node.get('using_filesort') is True:
+                sorted_table = first_table(node)
+                if sorted_table not in tolerated:
+                    problems.append(f"filesort of {sorted_table or '?'}")
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return problems
+
+
+def seed(connection, company_id, calls, breaks):
+    cursor = connection.cursor()
+    agents_table = get_company_table_name('agents', company_id)
+    calls_table = get_company_table_name('calls', company_id)
+    breaks_table = get_company_table_name('agent_breaks', company_id)
+    cursor.executemany(
+        f"INSERT IGNORE INTO `{agents_table}` (agent_number, name, email, password) VALUES (%s, %s, %s, %s)",
+        [(a, f'Agent {a}', f'{a}@plans.test', 'x') for a in AGENTS])
+    for table, target, make, insert in (
+        (calls_table, calls,
+         lambda i, ts: (random.choice(AGENTS), str(9000000000 + random.randint(0, 99999)),
+                        random.choice(('Answered', 'Missed', 'Uploaded')), ts),
+         f"INSERT INTO `{calls_table}` (agent_number, customer_number, call_status, timestamp) "
+         "VALUES (%s, %s, %s, %s)"),
+        (breaks_table, breaks,
+         lambda i, ts: (random.choice(AGENTS), random.choice(('Working', 'Break')), ts, None if i % 97 == 0 else ts),
+         f"INSERT INTO `{breaks_table}` (agent_number, status, break_start, break_end) VALUES (%s, %s, %s, %s)"),
+    ):
+        cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+        existing = cursor.fetchone()[0]
+        start = time.time() - 365 * 86400
+        rows = [make(i, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start + i * 365 * 86400 / target)))
+                for i in range(existing, target)]
+        for i in range(0, len(rows), 5000):
+            cursor.executemany(insert, rows[i:i + 5000])
+            connection.commit()
+    cursor.execute(
+        f"INSERT INTO `{remarks_table_name(company_id)}` (call_id, remark, created_at) "
+        f"SELECT id, 'seed', timestamp FROM `{calls_table}` WHERE id % 10 = 0 AND remarks_count = 0"
+    )
+    cursor.execute(f"UPDATE `{calls_table}` SET remarks_count = 1 WHERE id % 10 = 0 AND remarks_count = 0")
+    cursor.execute(
+        f"INSERT IGNORE INTO `{customers_table_name(company_id)}` (customer_number, name) "
+        f"SELECT DISTINCT customer_number, 'Seed' FROM `{calls_table}`"
+    )
+    rebuild_agent_state(cursor, company_id)
+    connection.commit()
+    for table in (agents_table, calls_table, breaks_table, remarks_table_name(company_id),
+                  customers_table_name(company_id)):
+        cursor.execute(f"ANALYZE TABLE `{table}`")
+        cursor.fetchall()
+    cursor.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--company-id', type=int, default=999997)
+    ap.add_argument('--calls', type=int, default=50000)
+    ap.add_argument('--breaks', type=int, default=20000)
+    ap.add_argument('--verbose', action='store_true', help='print every plan')
+    args = ap.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        migrate_tenant(connection, args.company_id)
+        seed(connection, args.company_id, args.calls, args.breaks)
+        failures = 0
+        cursor = connection.cursor(buffered=True)
+        for name, (builder, tolerated, checked) in HOT_QUERIES.items():
+            query = builder(args.company_id)
+            explain = ExplainCursor(cursor)
+            if callable(query):
+                query(explain)
+            else:
+                explain.execute(*query)
+            if not checked:
+                print(f"SKIP {name} (returns every row)")
+                continue
+            problems = [p for plan in explain.plans for p in plan_problems(plan, tolerated)]
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok  '} {name}" + (f": {', '.join(problems)}" if problems else ''))
+            if args.verbose or problems:
+                for plan in explain.plans:
+                    print(json.dumps(plan, indent=2))
+        cursor.close()
+    finally:
+        connection.close()
+    if failures:
+        sys.exit(f"{failures} hot queries regressed to a full scan or filesort")
+
+
+if __name__ == '__main__':
+    main()
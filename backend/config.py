@@ -1,3 +1,5 @@
+import os
+
 # Configuration variables for Flask app and databases
 SECRET_KEY = 'your-secret-key-here'  # Change this in production
 DB_CONFIG = {
@@ -13,4 +15,105 @@ CDR_DB_CONFIG = {
     'password': 'retro',
     'charset': 'utf8mb4',  
     'use_unicode': True
-}
\ No newline at end of file
+}
+# Connection pool settings (per worker process)
+DB_POOL_CONFIG = {
+    'pool_size': 10,          # connections kept open while idle
+    'max_overflow': 10,       # extra connections allowed under burst load
+    'timeout': 5,             # seconds to wait for a free connection
+    'idle_timeout': 300,      # close connections idle longer than this (seconds)
+    'max_lifetime': 3600,     # recycle connections older than this (seconds)
+    'ping_on_checkout': True  # verify reused connections before handing them out
+}
+CDR_DB_POOL_CONFIG = {
+    'pool_size': 2,
+    'max_overflow': 2,
+    'timeout': 5,
+    'idle_timeout': 120,
+    'max_lifetime': 1800,
+    'ping_on_checkout': True
+}
+
+# Call recording storage. 'local' keeps files under root/ab/cd/<sha256>;
+# 's3' uses any S3-compatible endpoint (bucket, endpoint_url, access_key, secret_key, region, prefix)
+RECORDING_STORAGE = {
+    'backend': 'local',
+    'root': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings_store'),
+}
+
+# Resumable recording uploads (/api/calls/<id>/recording/uploads)
+RECORDING_UPLOAD = {
+    'max_size': 200 * 1024 * 1024,   # largest accepted recording in bytes
+    'chunk_size': 8 * 1024 * 1024,   # largest accepted chunk per request in bytes
+    'session_ttl': 24 * 3600,        # seconds before an unfinished upload is discarded
+    'allowed_types': ('audio/wav', 'audio/x-wav', 'audio/wave', 'audio/mpeg', 'audio/mp3',
+                      'audio/ogg', 'audio/flac', 'audio/mp4', 'audio/x-m4a'),
+    'spool_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings_store', 'tmp'),
+}
+
+# Per-process cache of company status/payment_status used by the 403 gate.
+# stamp_dir holds one small file per company that edits touch, so every worker
+# process drops its cached entry at once; set it to None for TTL-only expiry.
+TENANT_CACHE = {
+    'ttl': 30,  # seconds
+    'stamp_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run', 'tenant_stamps'),
+}
+
+# Background jobs for bulk call uploads (worker: python -m backend.jobs.worker)
+JOBS = {
+    'async_uploads': True,       # False runs uploads inside the request, as before (no worker needed)
+    'inline_max_bytes': 256 * 1024,  # smaller .xlsx uploads are still processed inside the request
+    'inline_max_rows': 500,      # likewise for upload-corrections payloads
+    'work_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run', 'jobs'),
+    'workers': 2,                # worker processes started by backend.jobs.worker
+    'per_company_limit': 1,      # jobs of one company running at the same time
+    'poll_interval': 1.0,        # seconds an idle worker waits before looking for work
+    'heartbeat_timeout': 300,    # running jobs silent for longer are marked failed
+    'retention': 7 * 24 * 3600,  # seconds input files and error reports are kept
+}
+
+# Server-sent event streams (GET /api/events), fed by the in-process bus in backend/events/bus.py
+EVENTS = {
+    'replay_size': 500,              # recent events per company a reconnecting stream can resume from
+    'max_streams_per_company': 50,   # concurrent open streams per company; more get 429
+    'max_streams': 48,               # open streams of the whole process; each holds a worker thread,
+                                     # so keep it well below gunicorn --threads
+    'heartbeat': 15,                 # seconds between keep-alive comments on an idle stream
+    'retry_ms': 3000,                # reconnect delay suggested to EventSource clients
+}
+
+# Incremental CDR sync (worker: python -m backend.ingest.cdr_sync). Rows of the CDR
+# table are read in id order past a stored watermark and upserted into calls_<company_id>
+# of the company whose agent has the row's extension.
+CDR_SYNC = {
+    'source_table': 'calls',
+    'columns': {                 # CDR column read for each calls_<id> column
+        'id': 'id',              # monotonically increasing key the watermark follows
+        'agent_number': 'agent_number',
+        'customer_number': 'customer_number',
+        'duration': 'duration',
+        'call_status': 'call_status',
+        'timestamp': 'timestamp',
+    },
+    'status_map': {              # CDR dispositions -> call_status; others are kept as they are
+        'ANSWERED': 'Answered',
+        'NO ANSWER': 'Missed',
+        'BUSY': 'Missed',
+        'FAILED': 'Missed',
+    },
+    'batch_size': 1000,          # CDR rows per read and per transaction
+    'max_batches': 50,           # batches per run, so one run cannot hold the lock for long
+    'interval': 30,              # seconds between runs of the worker loop
+    'settle_seconds': 10,        # rows younger than this wait for the next run (late commits)
+}
+
+# Cached health probes (GET /api/health/ready, /api/health/cdr). Probes answer from a
+# snapshot a background thread refreshes, so load balancer hits never touch a database.
+HEALTH = {
+    'ttl': 5,                      # seconds a snapshot is served before it counts as stale
+    'refresh_interval': 5,         # seconds between background refreshes
+    'idle_stop': 300,              # stop refreshing after this long without a probe
+    'max_pool_saturation': 0.9,    # main pool in_use / capacity above this -> not ready
+    'max_replication_lag': 60,     # CDR replica lag in seconds above this -> degraded
+    'cdr_required': False,         # True: an unreachable CDR database makes the API not ready
+}
@@ -0,0 +1,311 @@
+"""Agent productivity per day: talk, break, working and idle time, calls per working hour.
+
+For each (agent, day):
+
+- talk_seconds / calls: from call_rollup_daily_<id>. 'Uploaded' rows are leads an admin
+  assigned, not calls, and count neither as calls nor as agent activity
+- break_seconds: Break records clipped to the day. An open break (break_end IS NULL)
+  lasts until the agent's next status record, or until now, the way
+  close_latest_agent_break would close it
+- the shift runs from the first activity to the last: status records, break ends
+  and calls. working_seconds is the shift minus breaks, idle_seconds is working time
+  not spent talking
+
+Break records are read with one window query (LEAD gives each record the start of
+the next one) and folded into per-day totals as the rows stream in. Days before
+today are closed: their results are kept in `agent_day_stats_<id>` and never
+recomputed, unless a write touching that day forgets them (`forget_days`). Forget a
+range by hand after editing history:
+
+    python -m backend.db.agent_productivity --company-id N --forget-from YYYY-MM-DD
+"""
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.db.call_rollups import daily_table_name as rollup_daily_table_name
+from backend.db.company_tables import get_company_table_name
+
+MAX_BREAK_SPAN = datetime.timedelta(days=1)  # how far before a range an overlapping break may start
+STREAM_BATCH = 1000  # break rows fetched per round trip
+_STATS = ('first_activity', 'last_activity', 'talk_seconds', 'calls', 'break_seconds', 'breaks',
+          'open_breaks', 'working_seconds', 'idle_seconds')
+
+
+def stats_table_name(company_id) -> str:
+    return get_company_table_name('agent_day_stats', int(company_id))
+
+
+def create_stats_table(cursor, company_id) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{stats_table_name(company_id)}` (
+            day DATE NOT NULL,
+            agent_number VARCHAR(20) NOT NULL,
+            first_activity DATETIME NULL,
+            last_activity DATETIME NULL,
+            talk_seconds BIGINT NOT NULL DEFAULT 0,
+            calls INT NOT NULL DEFAULT 0,
+            break_seconds INT NOT NULL DEFAULT 0,
+            breaks INT NOT NULL DEFAULT 0,
+            open_breaks INT NOT NULL DEFAULT 0,
+            working_seconds INT NOT NULL DEFAULT 0,
+            idle_seconds INT NOT NULL DEFAULT 0,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (day, agent_number)
+        )
+    """)
+
+
+def forget_days(cursor, company_id, pairs) -> None:
+    """Drop memoised results for (agent_number, day) pairs a write has changed. Does not commit."""
+    pairs = sorted({(str(agent), day) for agent, day in pairs if day < datetime.date.today()})
+    if pairs:
+        cursor.executemany(
+            f"DELETE FROM `{stats_table_name(company_id)}` WHERE agent_number = %s AND day = %s", pairs)
+
+
+def forget_span(cursor, company_id, agent_number, start, end=None) -> None:
+    """forget_days for every day from `start` to `end` (or today). Does not commit."""
+    if start is None:
+        return
+    first = start.date() if isinstance(start, datetime.datetime) else start
+    last = (end.date() if isinstance(end, datetime.datetime) else end) if end else datetime.date.today()
+    forget_days(cursor, company_id,
+                ((agent_number, first + datetime.timedelta(days=i)) for i in range((last - first).days + 1)))
+
+
+def _blank() -> dict:
+    return {'first_activity': None, 'last_activity': None, 'talk_seconds': 0, 'calls': 0, 'break_seconds': 0,
+            'breaks': 0, 'open_breaks': 0, 'working_seconds': 0, 'idle_seconds': 0}
+
+
+def _touch(entry, moment) -> None:
+    if entry['first_activity'] is None or moment < entry['first_activity']:
+        entry['first_activity'] = moment
+    if entry['last_activity'] is None or moment > entry['last_activity']:
+        entry['last_activity'] = moment
+
+
+def _in_clause(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def compute_days(connection, company_id, agents: list, day_from, day_to, now: datetime.datetime) -> dict:
+    """(agent_number, day) -> stats for every agent and day in [day_from, day_to]."""
+    lower = datetime.datetime.combine(day_from, datetime.time.min)
+    upper = datetime.datetime.combine(day_to + datetime.timedelta(days=1), datetime.time.min)
+    stats = {(a, day_from + datetime.timedelta(days=i)): _blank()
+             for a in agents for i in range((day_to - day_from).days + 1)}
+
+    cursor = connection.cursor()
+    try:
+        # Records just past the range are read only to serve as the LEAD of the last one inside it
+        cursor.execute(
+            f"""
+            SELECT agent_number, status, started_at, break_end,
+                   LEAD(started_at) OVER (PARTITION BY agent_number ORDER BY started_at, id) AS next_started
+            FROM `{get_company_table_name('agent_breaks', int(company_id))}`
+            WHERE agent_number IN ({_in_clause(agents)}) AND started_at >= %s AND started_at < %s
+            ORDER BY agent_number, started_at, id
+            """,
+            list(agents) + [lower - MAX_BREAK_SPAN, upper + MAX_BREAK_SPAN]
+        )
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH)
+            if not rows:
+                break
+            for agent, status, started, break_end, next_started in rows:
+                if started >= upper or started > now:
+                    continue
+                if status == 'Break':
+                    end = min(break_end or next_started or now, now)
+                    if break_end is None and started >= lower:
+                        stats[(agent, started.date())]['open_breaks'] += 1
+                    if started >= lower:
+                        stats[(agent, started.date())]['breaks'] += 1
+                    # Split the break at midnights; each piece counts for its own day
+                    piece = max(started, lower)
+                    while piece < min(end, upper):
+                        day_end = datetime.datetime.combine(piece.date() + datetime.timedelta(days=1),
+                                                            datetime.time.min)
+                        piece_end = min(end, upper, day_end)
+                        entry = stats[(agent, piece.date())]
+                        entry['break_seconds'] += int((piece_end - piece).total_seconds())
+                        _touch(entry, piece)
+                        _touch(entry, piece_end if piece_end < day_end else day_end - datetime.timedelta(seconds=1))
+                        piece = piece_end
+                elif started >= lower:
+                    _touch(stats[(agent, started.date())], started)
+        cursor.close()
+
+        cursor = connection.cursor(buffered=True)
+        cursor.execute(
+            f"""
+            SELECT agent_number, DATE(timestamp), MIN(timestamp), MAX(timestamp)
+            FROM `{get_company_table_name('calls', int(company_id))}`
+            WHERE agent_number IN ({_in_clause(agents)}) AND timestamp >= %s AND timestamp < %s
+              AND (call_status IS NULL OR call_status <> 'Uploaded')
+            GROUP BY agent_number, DATE(timestamp)
+            """,
+            list(agents) + [lower, upper]
+        )
+        for agent, day, first_call, last_call in cursor.fetchall():
+            entry = stats.get((agent, day))
+            if entry is not None:
+                _touch(entry, first_call)
+                _touch(entry, last_call)
+        cursor.execute(
+            f"""
+            SELECT agent_number, day, SUM(calls), SUM(total_duration)
+            FROM `{rollup_daily_table_name(company_id)}`
+            WHERE agent_number IN ({_in_clause(agents)}) AND day >= %s AND day <= %s
+              AND call_status <> 'Uploaded'
+            GROUP BY agent_number, day
+            """,
+            list(agents) + [day_from, day_to]
+        )
+        for agent, day, calls, talk in cursor.fetchall():
+            entry = stats.get((agent, day))
+            if entry is not None:
+                entry['calls'], entry['talk_seconds'] = int(calls), int(talk)
+    finally:
+        cursor.close()
+
+    for entry in stats.values():
+        if entry['first_activity'] is not None:
+            shift = int((entry['last_activity'] - entry['first_activity']).total_seconds())
+            entry['working_seconds'] = max(0, shift - entry['break_seconds'])
+            entry['idle_seconds'] = max(0, entry['working_seconds'] - entry['talk_seconds'])
+    return stats
+
+
+def _load_memo(cursor, company_id, agents, day_from, day_to) -> dict:
+    cursor.execute(
+        f"""
+        SELECT agent_number, day, {', '.join(_STATS)} FROM `{stats_table_name(company_id)}`
+        WHERE day >= %s AND day <= %s AND agent_number IN ({_in_clause(agents)})
+        """,
+        [day_from, day_to] + list(agents)
+    )
+    return {(row[0], row[1]): dict(zip(_STATS, row[2:])) for row in cursor.fetchall()}
+
+
+def _store_memo(cursor, company_id, stats: dict) -> None:
+    cursor.executemany(
+        f"""
+        INSERT INTO `{stats_table_name(company_id)}` (day, agent_number, {', '.join(_STATS)})
+        VALUES (%s, %s, {', '.join(['%s'] * len(_STATS))})
+        ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in _STATS)}, computed_at = NOW()
+        """,
+        [(day, agent) + tuple(entry[c] for c in _STATS) for (agent, day), entry in stats.items()]
+    )
+
+
+def day_stats(connection, company_id, agents: list, day_from, day_to, now: datetime.datetime = None) -> dict:
+    """(agent_number, day) -> stats, from the memo for closed days and computed otherwise.
+
+    Newly computed closed days are stored and committed.
+    """
+    now = now or datetime.datetime.now()
+    today = now.date()
+    result = {}
+    if not agents:
+        return result
+    last_closed = min(day_to, today - datetime.timedelta(days=1))
+    if day_from <= last_closed:
+        cursor = connection.cursor(buffered=True)
+        try:
+            result.update(_load_memo(cursor, company_id, agents, day_from, last_closed))
+        finally:
+            cursor.close()
+        missing = [(a, day_from + datetime.timedelta(days=i))
+                   for a in agents for i in range((last_closed - day_from).days + 1)]
+        missing = [key for key in missing if key not in result]
+        if missing:
+            missing_agents = sorted({a for a, _ in missing})
+            first, last = min(d for _, d in missing), max(d for _, d in missing)
+            computed = compute_days(connection, company_id, missing_agents, first, last, now)
+            computed = {key: computed[key] for key in missing}
+            cursor = connection.cursor()
+            try:
+                _store_memo(cursor, company_id, computed)
+                connection.commit()
+            finally:
+                cursor.close()
+            result.update(computed)
+    open_from = max(day_from, today)
+    if open_from <= day_to:
+        result.update(compute_days(connection, company_id, agents, open_from, day_to, now))
+    return result
+
+
+def roster(cursor, company_id, agent_number: str = None) -> dict:
+    """agent_number -> name for the company's non-admin agents (inactive ones included,
+    as they still have history), or for one agent."""
+    sql = f"SELECT agent_number, name FROM `{get_company_table_name('agents', int(company_id))}` WHERE is_admin = 0"
+    params = ()
+    if agent_number:
+        sql, params = sql + " AND agent_number = %s", (agent_number,)
+    cursor.execute(sql + " ORDER BY agent_number", params)
+    return {str(a): name for a, name in cursor.fetchall()}
+
+
+def _iso(moment):
+    return moment.isoformat(sep=' ') if moment is not None else None
+
+
+def _rates(entry: dict) -> dict:
+    working = entry['working_seconds']
+    entry['calls_per_working_hour'] = round(entry['calls'] * 3600 / working, 2) if working else None
+    entry['utilisation'] = round(entry['talk_seconds'] / working, 3) if working else None
+    return entry
+
+
+def productivity_report(connection, company_id, agents: dict, day_from, day_to, per_day: bool = False,
+                        now: datetime.datetime = None) -> list:
+    """Per-agent totals over [day_from, day_to] (plus per-day rows when `per_day`) for
+    `agents` (agent_number -> name, see `roster`)."""
+    stats = day_stats(connection, company_id, list(agents), day_from, day_to, now)
+    by_agent = {}
+    for (agent, day), entry in stats.items():
+        by_agent.setdefault(agent, []).append((day, entry))
+    report = []
+    for agent, name in agents.items():
+        days = sorted(by_agent.get(agent, ()), key=lambda item: item[0])
+        totals = {c: sum(entry[c] for _, entry in days) for c in _STATS[2:]}
+        totals['active_days'] = sum(1 for _, entry in days if entry['first_activity'] is not None)
+        row = {'agent_number': agent, 'name': name, **_rates(totals)}
+        if per_day:
+            row['days'] = [_rates({'day': str(day), **{c: entry[c] for c in _STATS[2:]},
+                                   'first_activity': _iso(entry['first_activity']),
+                                   'last_activity': _iso(entry['last_activity'])})
+                           for day, entry in days]
+        report.append(row)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Forget memoised agent productivity days')
+    ap.add_argument('--company-id', type=int, required=True)
+    ap.add_argument('--forget-from', type=datetime.date.fromisoformat, required=True,
+                    help='drop stored results from this date (YYYY-MM-DD) on; they are recomputed on demand')
+    args = ap.parse_args()
+
+    from backend.db.connection import get_db_connection
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DELETE FROM `{stats_table_name(args.company_id)}` WHERE day >= %s", (args.forget_from,))
+        print(f"Forgot {cursor.rowcount} agent days")
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Materialized current status: one row per agent with their latest break/working record.
+
+`agent_state_<company_id>` (`agent_state` for the shared agent_breaks table) holds,
+per agent, the agent_breaks row that sorts last by COALESCE(break_start, created_at).
+GET /api/agents/current-status joins it to the agents table by primary key instead
+of grouping the whole break history on every poll. Handlers that insert or close
+breaks call `record_break` / `record_break_closed` inside their own transaction; the
+rebuild command recomputes it from the history:
+
+    python -m backend.db.agent_state [--company-id N] [--shared]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error
+from backend.db.company_tables import get_company_table_name
+
+
+def state_table_name(company_id=None) -> str:
+    """State table paired with agent_breaks_<company_id>, or with the shared agent_breaks table."""
+    if company_id:
+        return get_company_table_name('agent_state', int(company_id))
+    return 'agent_state'
+
+
+def _breaks_table_name(company_id=None) -> str:
+    return get_company_table_name('agent_breaks', int(company_id)) if company_id else 'agent_breaks'
+
+
+def create_state_table(cursor, company_id=None) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{state_table_name(company_id)}` (
+            agent_number VARCHAR(20) NOT NULL PRIMARY KEY,
+            break_id INT NOT NULL,
+            status ENUM('Working', 'Break') NOT NULL,
+            break_start DATETIME NULL,
+            break_end DATETIME NULL,
+            started_at DATETIME NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def current_status_sql(company_id=None, agents_table: str = None) -> str:
+    """SELECT of agent_number, current_status, break_start, break_end for every agent
+    (alias `a`); callers append their WHERE / ORDER BY."""
+    if agents_table is None:
+        agents_table = get_company_table_name('agents', int(company_id)) if company_id else 'agents'
+    return f"""
+        SELECT a.agent_number,
+               CASE WHEN s.status = 'Break' AND s.break_end IS NULL THEN 'Break' ELSE 'Working' END AS current_status,
+               s.break_start,
+               s.break_end
+        FROM `{agents_table}` a
+        LEFT JOIN `{state_table_name(company_id)}` s ON s.agent_number = a.agent_number
+    """
+
+
+def record_break(cursor, company_id, break_id: int) -> None:
+    """Make a just-inserted agent_breaks row the agent's state if it is their latest.
+
+    Does not commit; it runs in the caller's transaction.
+    """
+    state = state_table_name(company_id)
+    started = "COALESCE(b.break_start, b.created_at)"
+    newer = f"{started} >= `{state}`.started_at"
+    # Assignments run left to right, so started_at is compared before it is replaced
+    cursor.execute(
+        f"""
+        INSERT INTO `{state}` (agent_number, break_id, status, break_start, break_end, started_at)
+        SELECT b.agent_number, b.id, b.status, b.break_start, b.break_end, {started}
+        FROM `{_breaks_table_name(company_id)}` b WHERE b.id = %s
+        ON DUPLICATE KEY UPDATE
+            break_id = IF({newer}, b.id, `{state}`.break_id),
+            status = IF({newer}, b.status, `{state}`.status),
+            break_start = IF({newer}, b.break_start, `{state}`.break_start),
+            break_end = IF({newer}, b.break_end, `{state}`.break_end),
+            started_at = GREATEST(`{state}`.started_at, {started})
+        """,
+        (int(break_id),)
+    )
+
+
+def record_break_closed(cursor, company_id, agent_number, break_id: int, break_end) -> None:
+    """Reflect a break being closed, if that break is the agent's current state. Does not commit."""
+    cursor.execute(
+        f"UPDATE `{state_table_name(company_id)}` SET break_end = %s WHERE agent_number = %s AND break_id = %s",
+        (break_end, agent_number, int(break_id))
+    )
+
+
+def agent_status(cursor, company_id, agent_number) -> dict:
+    """The agent's state as an agent_status event payload (the current-status row shape)."""
+    cursor.execute(
+        f"SELECT status, break_start, break_end FROM `{state_table_name(company_id)}` WHERE agent_number = %s",
+        (agent_number,)
+    )
+    rows = cursor.fetchall()
+    status, break_start, break_end = rows[0] if rows else ('Working', None, None)
+    return {
+        'agent_number': str(agent_number),
+        'current_status': 'Break' if status == 'Break' and break_end is None else 'Working',
+        'break_start': break_start,
+        'break_end': break_end,
+    }
+
+
+def rebuild_table(cursor, company_id=None) -> None:
+    """Recompute the state table from the full break history."""
+    state = state_table_name(company_id)
+    cursor.execute(f"DELETE FROM `{state}`")
+    cursor.execute(f"""
+        INSERT INTO `{state}` (agent_number, break_id, status, break_start, break_end, started_at)
+        SELECT agent_number, id, status, break_start, break_end, started_at FROM (
+            SELECT agent_number, id, status, break_start, break_end,
+                   COALESCE(break_start, created_at) AS started_at,
+                   ROW_NUMBER() OVER (PARTITION BY agent_number
+                                      ORDER BY COALESCE(break_start, created_at) DESC, id DESC) AS rn
+            FROM `{_breaks_table_name(company_id)}`
+        ) latest
+        WHERE latest.rn = 1
+    """)
+
+
+def rebuild(connection, company_id: int = None, shared: bool = False) -> int:
+    """Rebuild the state of one company, or of all of them (plus the shared table when
+    `shared`), committing per table. Returns the number of tables rebuilt; a company
+    whose tables are missing is reported and skipped."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        if company_id:
+            company_ids = [int(company_id)]
+        else:
+            cursor.execute("SELECT id FROM companies ORDER BY id")
+            company_ids = [int(row[0]) for row in cursor.fetchall()]
+        if shared:
+            company_ids.append(None)
+        done = 0
+        for cid in company_ids:
+            try:
+                rebuild_table(cursor, cid)
+                connection.commit()
+                done += 1
+            except Error as e:
+                connection.rollback()
+                print(f"Warning: agent state rebuild for {state_table_name(cid)} failed: {e}")
+        return done
+    finally:
+        cursor.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Rebuild the agent current-status tables from the break history')
+    ap.add_argument('--company-id', type=int, help='only rebuild this tenant')
+    ap.add_argument('--shared', action='store_true', help='also rebuild the shared agent_state table')
+    args = ap.parse_args()
+
+    from backend.db.connection import get_db_connection
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        done = rebuild(connection, args.company_id, args.shared)
+        print(f"Agent state rebuilt for {done} tables")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Break history listing behind GET /api/agents/breaks, paginated by day in SQL.
+
+A page is a run of consecutive days that have records, newest first. The days are
+found by seeking: MAX(started_at) below the page's upper bound is one index probe on
+idx_started_at (or idx_agent_started when the agents are narrowed down), so a page
+of N days costs N + 1 probes plus a range read of exactly those days, however long
+the history is. The next page starts below the oldest day returned.
+
+Agent search never scans the break history: the term is first resolved to agent
+numbers against the agents roster, by agent_number / name prefix (uniq_agent_number
+and idx_name) or, in full-text mode, by the words of the name (ft_name).
+"""
+import datetime
+import re
+from backend.db.company_tables import get_company_table_name
+
+DEFAULT_PAGE_DAYS = 7
+MAX_PAGE_DAYS = 62
+SEARCH_MODES = ('prefix', 'fulltext')
+
+_FULLTEXT_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def breaks_table_name(company_id=None) -> str:
+    return get_company_table_name('agent_breaks', int(company_id)) if company_id else 'agent_breaks'
+
+
+def agents_table_name(company_id=None) -> str:
+    return get_company_table_name('agents', int(company_id)) if company_id else 'agents'
+
+
+def latest_open_break(cursor, company_id, agent_number):
+    """The agent's newest break without a break_end (id, break_start, started_at), or None.
+
+    close_latest_agent_break closes this row.
+    """
+    cursor.execute(
+        f"""
+        SELECT id, break_start, started_at FROM `{breaks_table_name(company_id)}`
+        WHERE agent_number = %s AND status = 'Break' AND break_end IS NULL
+        ORDER BY break_start DESC
+        LIMIT 1
+        """,
+        (agent_number,)
+    )
+    return cursor.fetchone()
+
+
+def _like_prefix(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def search_agents(cursor, company_id, term: str, mode: str = 'prefix') -> list:
+    """Agent numbers whose number starts with `term` or whose name matches it.
+
+    'prefix' matches names starting with the term; 'fulltext' matches names containing
+    every word of the term as a word prefix ("kum sin" finds "Sunil Kumar Singh").
+    """
+    agents = agents_table_name(company_id)
+    sql = f"SELECT agent_number FROM `{agents}` WHERE agent_number LIKE %s UNION "
+    params = [_like_prefix(term)]
+    if mode == 'fulltext':
+        words = _FULLTEXT_WORD.findall(term)
+        if not words:
+            return []
+        sql += f"SELECT agent_number FROM `{agents}` WHERE MATCH(name) AGAINST (%s IN BOOLEAN MODE)"
+        params.append(' '.join(f'+{w}*' for w in words))
+    else:
+        sql += f"SELECT agent_number FROM `{agents}` WHERE name LIKE %s"
+        params.append(_like_prefix(term))
+    cursor.execute(sql, params)
+    return sorted({row[0] for row in cursor.fetchall()})
+
+
+def _filters(agent_numbers, date_from, upper):
+    where, params = ['ab.started_at < %s'], [upper]
+    if date_from is not None:
+        where.append('ab.started_at >= %s')
+        params.append(date_from)
+    if agent_numbers is not None:
+        where.append(f"ab.agent_number IN ({', '.join(['%s'] * len(agent_numbers))})")
+        params.extend(agent_numbers)
+    return ' AND '.join(where), params
+
+
+def page_days(cursor, company_id, upper: datetime.datetime, days: int,
+              date_from: datetime.datetime = None, agent_numbers: list = None) -> list:
+    """Up to `days` + 1 dates that have records before `upper`, newest first.
+
+    The extra date tells the caller there is a next page.
+    """
+    table = breaks_table_name(company_id)
+    found = []
+    while len(found) <= days:
+        where, params = _filters(agent_numbers, date_from, upper)
+        cursor.execute(f"SELECT MAX(ab.started_at) FROM `{table}` ab WHERE {where}", params)
+        latest = cursor.fetchone()[0]
+        if latest is None:
+            break
+        found.append(latest.date())
+        upper = datetime.datetime.combine(latest.date(), datetime.time.min)
+    return found
+
+
+def list_breaks(cursor, company_id, lower: datetime.datetime, upper: datetime.datetime,
+                agent_numbers: list = None) -> list:
+    """Records in [lower, upper) with the agent's name and email, newest first (dict cursor)."""
+    where, params = _filters(agent_numbers, lower, upper)
+    cursor.execute(
+        f"""
+        SELECT ab.id, ab.agent_number, ab.status, ab.break_start, ab.break_end, ab.duration_seconds,
+               ab.remark, ab.created_at, ab.started_at, a.name, a.email
+        FROM `{breaks_table_name(company_id)}` ab
+        JOIN `{agents_table_name(company_id)}` a ON a.agent_number = ab.agent_number
+        WHERE {where}
+        ORDER BY ab.started_at DESC, ab.id DESC
+        """,
+        params
+    )
+    return cursor.fetchall()
+
+
+def day_aggregates(cursor, company_id, lower: datetime.datetime, upper: datetime.datetime,
+                   agent_numbers: list = None) -> list:
+    """Per day and agent over [lower, upper): records, breaks, closed break seconds and
+    breaks still open (dict cursor). Rows come newest day first, then by agent."""
+    where, params = _filters(agent_numbers, lower, upper)
+    cursor.execute(
+        f"""
+        SELECT DATE(ab.started_at) AS day, ab.agent_number,
+               COUNT(*) AS records,
+               SUM(ab.status = 'Break') AS breaks,
+               COALESCE(SUM(CASE WHEN ab.status = 'Break' AND ab.break_end IS NOT NULL
+                                 THEN COALESCE(ab.duration_seconds,
+                                               TIMESTAMPDIFF(SECOND, ab.break_start, ab.break_end))
+                            END), 0) AS break_seconds,
+               SUM(ab.status = 'Break' AND ab.break_end IS NULL) AS open_breaks
+        FROM `{breaks_table_name(company_id)}` ab
+        WHERE {where}
+        GROUP BY day, ab.agent_number
+        ORDER BY day DESC, ab.agent_number
+        """,
+        params
+    )
+    return cursor.fetchall()
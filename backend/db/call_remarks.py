@@ -0,0 +1,205 @@
+"""Append-only remark history of calls.
+
+Every remark / remark status an agent saves on a call becomes one row of
+`call_remarks_<company_id>` (`call_remarks` for the shared calls table), indexed by
+(call_id, created_at). The calls row itself only keeps the latest remark, the latest
+status and `remarks_count`, so listings stay small however long a history grows.
+
+A remark typed into the upload sheet stays on the calls row until the call is first
+edited; the edit then copies it into the history ahead of the new entry. Histories
+stored the old way (entries concatenated into calls.remarks / remarks_status with an
+inline `<span>[dd/mm/YYYY HH:MM:SS]</span>` stamp) are split by `backfill_table`,
+which tenant migration 3 runs.
+"""
+import datetime
+import re
+from backend.db.company_tables import get_company_table_name
+
+REMARKS_PAGE_DEFAULT_LIMIT = 20
+REMARKS_PAGE_MAX_LIMIT = 100
+BACKFILL_BATCH = 1000  # calls rows split per round-trip by backfill_table
+
+# " <span style='font-size:10px;color:gray;'>[18/10/2025 14:03:11]</span>" after each legacy entry
+_LEGACY_STAMP = re.compile(r"\s*<span[^>]*>\s*\[(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})\]\s*</span>", re.I)
+_LEGACY_SEPARATOR = re.compile(r"\s*\|\s|<br\s*/?>", re.I)
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def remarks_table_name(company_id=None) -> str:
+    """History table paired with calls_<company_id>, or with the shared calls table."""
+    if company_id:
+        return get_company_table_name('call_remarks', int(company_id))
+    return 'call_remarks'
+
+
+def create_remarks_table(cursor, company_id=None) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{remarks_table_name(company_id)}` (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            call_id INT NOT NULL,
+            remark TEXT NULL,
+            remark_status TEXT NULL,
+            created_by VARCHAR(50) NULL,
+            created_at DATETIME NOT NULL,
+            INDEX idx_call_created (call_id, created_at, id)
+        )
+    """)
+
+
+def _clean(text) -> str:
+    return _TAGS.sub('', text or '').strip()
+
+
+def split_legacy(text, default_at=None) -> list:
+    """Split a concatenated legacy remarks string into [(created_at, text), ...].
+
+    Entries without a stamp (the uploaded remark at the front) get `default_at`.
+    Empty entries are dropped; the order of the string is kept.
+    """
+    if not text or not text.strip():
+        return []
+    parts = _LEGACY_STAMP.split(text)
+    entries = []
+    # parts alternates text, stamp, text, stamp, ..., trailing text
+    for i in range(0, len(parts) - 1, 2):
+        segment, stamp = parts[i], parts[i + 1]
+        pieces = [p for p in (_clean(s) for s in _LEGACY_SEPARATOR.split(segment)) if p]
+        if not pieces:
+            continue
+        *untimed, last = pieces
+        entries.extend((default_at, p) for p in untimed)
+        entries.append((datetime.datetime.strptime(stamp, '%d/%m/%Y %H:%M:%S'), last))
+    tail = [p for p in (_clean(s) for s in _LEGACY_SEPARATOR.split(parts[-1])) if p]
+    entries.extend((default_at, p) for p in tail)
+    return entries
+
+
+def legacy_entries(remarks, remarks_status, default_at) -> list:
+    """Merge legacy remark and status strings into [(created_at, remark, status), ...] oldest first.
+
+    One save used to append to both strings with the same stamp, so a remark and a
+    status sharing a stamp become one history row.
+    """
+    if default_at is None:
+        default_at = datetime.datetime.now().replace(microsecond=0)
+    merged = {}
+    order = []
+    for field, text in ((0, remarks), (1, remarks_status)):
+        seen = {}
+        for created_at, value in split_legacy(text, default_at):
+            # Repeated stamps within one string are separate saves; keep them apart
+            nth = seen[created_at] = seen.get(created_at, -1) + 1
+            key = (created_at, nth)
+            if key not in merged:
+                merged[key] = [None, None]
+                order.append(key)
+            merged[key][field] = value
+    order.sort()
+    return [(k[0], merged[k][0], merged[k][1]) for k in order]
+
+
+def _latest(entries, field):
+    for entry in reversed(entries):
+        if entry[field]:
+            return entry[field]
+    return ''
+
+
+def record_remark(cursor, company_id, call: dict, remark, remark_status, created_by=None) -> dict:
+    """Append one save of remark and/or status to a call's history.
+
+    `call` is the calls row (id, timestamp, remarks, remarks_status, remarks_count).
+    Returns the values the calls row should now hold: remarks, remarks_status and
+    `added`, the number of history rows written (add it to remarks_count). Does not
+    commit; it runs in the caller's transaction.
+    """
+    table = remarks_table_name(company_id)
+    rows = []
+    if not call.get('remarks_count'):
+        # First edit: move what the row carried so far (uploaded or legacy text) into history
+        for created_at, old_remark, old_status in legacy_entries(
+                call.get('remarks'), call.get('remarks_status'), call.get('timestamp')):
+            rows.append((call['id'], old_remark, old_status, None, created_at))
+    remark = (remark or '').strip()
+    remark_status = (remark_status or '').strip()
+    now = datetime.datetime.now().replace(microsecond=0)
+    rows.append((call['id'], remark or None, remark_status or None, created_by, now))
+    cursor.executemany(
+        f"INSERT INTO `{table}` (call_id, remark, remark_status, created_by, created_at) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        rows
+    )
+    # Once a call has history, its row already holds the latest values
+    kept_remark = call.get('remarks') or '' if call.get('remarks_count') else ''
+    kept_status = call.get('remarks_status') or '' if call.get('remarks_count') else ''
+    written = [(r[4], r[1], r[2]) for r in rows]
+    return {
+        'remarks': _latest(written, 1) or kept_remark,
+        'remarks_status': _latest(written, 2) or kept_status,
+        'added': len(rows),
+    }
+
+
+def list_remarks(cursor, company_id, call_id: int, limit: int = REMARKS_PAGE_DEFAULT_LIMIT,
+                 before_id: int = None) -> tuple:
+    """One page of a call's history, newest first: (rows, next_before_id or None)."""
+    table = remarks_table_name(company_id)
+    sql = (f"SELECT id, remark, remark_status, created_by, created_at FROM `{table}` "
+           "WHERE call_id = %s")
+    params = [int(call_id)]
+    if before_id is not None:
+        # ids grow with created_at for a call, so the id alone is a stable cursor
+        sql += " AND id < %s"
+        params.append(int(before_id))
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(int(limit) + 1)
+    cursor.execute(sql, tuple(params))
+    rows = cursor.fetchall()
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_before = last['id'] if isinstance(last, dict) else last[0]
+    return rows, next_before
+
+
+def backfill_table(cursor, company_id=None, batch: int = BACKFILL_BATCH) -> int:
+    """Split legacy concatenated remarks of every not yet migrated call into history rows.
+
+    Calls whose remarks_count is already set are skipped, so this is safe to re-run.
+    Returns the number of calls migrated.
+    """
+    calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+    table = remarks_table_name(company_id)
+    migrated = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            f"""
+            SELECT id, timestamp, remarks, remarks_status FROM `{calls_table}`
+            WHERE id > %s AND remarks_count = 0
+              AND (remarks LIKE %s OR remarks_status LIKE %s)
+            ORDER BY id LIMIT %s
+            """,
+            (last_id, '%<span%', '%<span%', batch)
+        )
+        calls = cursor.fetchall()
+        if not calls:
+            return migrated
+        history = []
+        updates = []
+        for call_id, timestamp, remarks, remarks_status in calls:
+            entries = legacy_entries(remarks, remarks_status, timestamp)
+            history.extend((call_id, r, s, created_at) for created_at, r, s in entries)
+            updates.append((_latest(entries, 1), _latest(entries, 2), len(entries), call_id))
+        if history:
+            cursor.executemany(
+                f"INSERT INTO `{table}` (call_id, remark, remark_status, created_at) VALUES (%s, %s, %s, %s)",
+                history
+            )
+        cursor.executemany(
+            f"UPDATE `{calls_table}` SET remarks = %s, remarks_status = %s, remarks_count = %s WHERE id = %s",
+            updates
+        )
+        migrated += len(calls)
+        last_id = calls[-1][0]
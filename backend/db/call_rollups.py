@@ -0,0 +1,284 @@
+"""Pre-aggregated call analytics per tenant, behind GET /api/analytics/calls.
+
+Three rollup tables sit next to `calls_<company_id>`:
+
+- `call_rollup_hourly_<id>`: calls, total and timed duration per (hour, agent, status)
+- `call_rollup_daily_<id>`: the same per (day, agent, status)
+- `call_rollup_customer_<id>`: calls and total duration per (day, customer number)
+
+Writers keep them current in their own transaction by passing the calls they add
+(and, for rewrites, the values they replace) to `record_calls`, which applies the
+difference with additive upserts: uploads, upload corrections and the CDR sync.
+Uploaded leads are passed without a duration: they are not calls, and must not
+count towards `timed_calls` and the average duration.
+A rebuild recomputes them from the calls table, e.g. after manual edits:
+
+    python -m backend.db.call_rollups [--company-id N] [--from YYYY-MM-DD]
+"""
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error
+from backend.db.company_tables import get_company_table_name
+
+
+def hourly_table_name(company_id) -> str:
+    return get_company_table_name('call_rollup_hourly', int(company_id))
+
+
+def daily_table_name(company_id) -> str:
+    return get_company_table_name('call_rollup_daily', int(company_id))
+
+
+def customer_table_name(company_id) -> str:
+    return get_company_table_name('call_rollup_customer', int(company_id))
+
+
+def create_rollup_tables(cursor, company_id) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{hourly_table_name(company_id)}` (
+            bucket DATETIME NOT NULL,
+            agent_number VARCHAR(20) NOT NULL,
+            call_status VARCHAR(50) NOT NULL,
+            calls INT NOT NULL DEFAULT 0,
+            total_duration BIGINT NOT NULL DEFAULT 0,
+            timed_calls INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, agent_number, call_status),
+            INDEX idx_agent_bucket (agent_number, bucket)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{daily_table_name(company_id)}` (
+            day DATE NOT NULL,
+            agent_number VARCHAR(20) NOT NULL,
+            call_status VARCHAR(50) NOT NULL,
+            calls INT NOT NULL DEFAULT 0,
+            total_duration BIGINT NOT NULL DEFAULT 0,
+            timed_calls INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, agent_number, call_status),
+            INDEX idx_agent_day (agent_number, day)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{customer_table_name(company_id)}` (
+            day DATE NOT NULL,
+            customer_number VARCHAR(20) NOT NULL,
+            calls INT NOT NULL DEFAULT 0,
+            total_duration BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, customer_number)
+        )
+    """)
+
+
+def _add(totals, key, duration, sign) -> None:
+    entry = totals.get(key)
+    if entry is None:
+        entry = totals[key] = [0, 0, 0]
+    entry[0] += sign
+    if duration is not None:
+        entry[1] += sign * int(duration)
+        entry[2] += sign
+
+
+def record_calls(cursor, company_id, calls, sign: int = 1) -> None:
+    """Add (sign=1) or take back (sign=-1) calls in the rollups. Does not commit.
+
+    `calls` yields (agent_number, customer_number, call_status, timestamp, duration)
+    tuples; the work is one executemany per rollup table over the distinct buckets.
+    """
+    hourly, daily, customers = {}, {}, {}
+    for agent, customer, status, ts, duration in calls:
+        if ts is None:
+            continue
+        agent, status = str(agent or ''), str(status or '')
+        hour = ts.replace(minute=0, second=0, microsecond=0)
+        _add(hourly, (hour, agent, status), duration, sign)
+        _add(daily, (hour.date(), agent, status), duration, sign)
+        _add(customers, (hour.date(), str(customer or '')), duration, sign)
+    if not hourly:
+        return
+    for table, key_columns, totals in (
+        (hourly_table_name(company_id), 'bucket, agent_number, call_status', hourly),
+        (daily_table_name(company_id), 'day, agent_number, call_status', daily),
+    ):
+        cursor.executemany(
+            f"""
+            INSERT INTO `{table}` ({key_columns}, calls, total_duration, timed_calls)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE calls = calls + VALUES(calls),
+                                    total_duration = total_duration + VALUES(total_duration),
+                                    timed_calls = timed_calls + VALUES(timed_calls)
+            """,
+            [key + tuple(values) for key, values in totals.items()]
+        )
+    cursor.executemany(
+        f"""
+        INSERT INTO `{customer_table_name(company_id)}` (day, customer_number, calls, total_duration)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE calls = calls + VALUES(calls), total_duration = total_duration + VALUES(total_duration)
+        """,
+        [key + (values[0], values[1]) for key, values in customers.items()]
+    )
+
+
+def rebuild_table(cursor, company_id, day_from: datetime.date = None) -> None:
+    """Recompute the rollups of one company from its calls table, from `day_from` on
+    (everything when None)."""
+    calls = get_company_table_name('calls', int(company_id))
+    since = datetime.datetime.combine(day_from or datetime.date(1970, 1, 2), datetime.time.min)
+    hour = "TIMESTAMP(DATE(timestamp), MAKETIME(HOUR(timestamp), 0, 0))"
+    cursor.execute(f"DELETE FROM `{hourly_table_name(company_id)}` WHERE bucket >= %s", (since,))
+    cursor.execute(f"DELETE FROM `{daily_table_name(company_id)}` WHERE day >= %s", (since.date(),))
+    cursor.execute(f"DELETE FROM `{customer_table_name(company_id)}` WHERE day >= %s", (since.date(),))
+    cursor.execute(
+        f"""
+        INSERT INTO `{hourly_table_name(company_id)}`
+            (bucket, agent_number, call_status, calls, total_duration, timed_calls)
+        SELECT {hour}, agent_number, COALESCE(call_status, ''), COUNT(*), COALESCE(SUM(duration), 0),
+               COUNT(CASE WHEN call_status <> 'Uploaded' THEN duration END)
+        FROM `{calls}` WHERE timestamp >= %s
+        GROUP BY {hour}, agent_number, COALESCE(call_status, '')
+        """,
+        (since,)
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO `{daily_table_name(company_id)}`
+            (day, agent_number, call_status, calls, total_duration, timed_calls)
+        SELECT DATE(bucket), agent_number, call_status, SUM(calls), SUM(total_duration), SUM(timed_calls)
+        FROM `{hourly_table_name(company_id)}` WHERE bucket >= %s
+        GROUP BY DATE(bucket), agent_number, call_status
+        """,
+        (since,)
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO `{customer_table_name(company_id)}` (day, customer_number, calls, total_duration)
+        SELECT DATE(timestamp), customer_number, COUNT(*), COALESCE(SUM(duration), 0)
+        FROM `{calls}` WHERE timestamp >= %s
+        GROUP BY DATE(timestamp), customer_number
+        """,
+        (since,)
+    )
+
+
+def rebuild(connection, company_id: int = None, day_from: datetime.date = None) -> int:
+    """Rebuild one company's rollups, or every company's, committing per company.
+    Returns the number of companies rebuilt; a failing company is reported and skipped."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        if company_id:
+            company_ids = [int(company_id)]
+        else:
+            cursor.execute("SELECT id FROM companies ORDER BY id")
+            company_ids = [int(row[0]) for row in cursor.fetchall()]
+        done = 0
+        for cid in company_ids:
+            try:
+                rebuild_table(cursor, cid, day_from)
+                connection.commit()
+                done += 1
+            except Error as e:
+                connection.rollback()
+                print(f"Warning: call rollup rebuild for company {cid} failed: {e}")
+        return done
+    finally:
+        cursor.close()
+
+
+def _average(total, timed):
+    return round(total / timed, 1) if timed else None
+
+
+def call_analytics(cursor, company_id, day_from: datetime.date, day_to: datetime.date,
+                   granularity: str = 'day', agent_number: str = None, top: int = 10) -> dict:
+    """Totals, a per-hour or per-day series, per-agent volume and (without an agent
+    filter) the busiest customers over [day_from, day_to], read from the rollups."""
+    if granularity == 'hour':
+        table, bucket = hourly_table_name(company_id), 'bucket'
+        lower = datetime.datetime.combine(day_from, datetime.time.min)
+        upper = datetime.datetime.combine(day_to + datetime.timedelta(days=1), datetime.time.min)
+    else:
+        table, bucket = daily_table_name(company_id), 'day'
+        lower, upper = day_from, day_to + datetime.timedelta(days=1)
+    where, params = f"{bucket} >= %s AND {bucket} < %s", [lower, upper]
+    if agent_number:
+        where += " AND agent_number = %s"
+        params.append(agent_number)
+
+    cursor.execute(
+        f"""
+        SELECT {bucket}, call_status, SUM(calls), SUM(total_duration), SUM(timed_calls)
+        FROM `{table}` WHERE {where}
+        GROUP BY {bucket}, call_status ORDER BY {bucket}
+        """,
+        params
+    )
+    series, totals = {}, {'calls': 0, 'total_duration': 0, 'timed_calls': 0, 'by_status': {}}
+    for key, status, calls, total, timed in cursor.fetchall():
+        calls, total, timed = int(calls), int(total), int(timed)
+        if not calls:
+            continue
+        point = series.get(key)
+        if point is None:
+            point = series[key] = {'bucket': str(key), 'calls': 0, 'total_duration': 0, 'timed_calls': 0,
+                                   'by_status': {}}
+        for entry in (point, totals):
+            entry['calls'] += calls
+            entry['total_duration'] += total
+            entry['timed_calls'] += timed
+            entry['by_status'][status] = entry['by_status'].get(status, 0) + calls
+    for entry in list(series.values()) + [totals]:
+        entry['average_duration'] = _average(entry['total_duration'], entry.pop('timed_calls'))
+
+    cursor.execute(
+        f"""
+        SELECT agent_number, SUM(calls) AS n, SUM(total_duration), SUM(timed_calls)
+        FROM `{daily_table_name(company_id)}` WHERE day >= %s AND day < %s
+        {"AND agent_number = %s" if agent_number else ""}
+        GROUP BY agent_number HAVING n > 0 ORDER BY n DESC, agent_number
+        """,
+        [day_from, day_to + datetime.timedelta(days=1)] + ([agent_number] if agent_number else [])
+    )
+    agents = [{'agent_number': a, 'calls': int(n), 'total_duration': int(total),
+               'average_duration': _average(int(total), int(timed))}
+              for a, n, total, timed in cursor.fetchall()]
+
+    result = {'totals': totals, 'series': list(series.values()), 'agents': agents}
+    if not agent_number:
+        cursor.execute(
+            f"""
+            SELECT customer_number, SUM(calls) AS n, SUM(total_duration)
+            FROM `{customer_table_name(company_id)}` WHERE day >= %s AND day < %s
+            GROUP BY customer_number HAVING n > 0 ORDER BY n DESC, customer_number LIMIT %s
+            """,
+            (day_from, day_to + datetime.timedelta(days=1), int(top))
+        )
+        result['top_customers'] = [{'customer_number': c, 'calls': int(n), 'total_duration': int(total)}
+                                   for c, n, total in cursor.fetchall()]
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Rebuild the call analytics rollup tables from the calls tables')
+    ap.add_argument('--company-id', type=int, help='only rebuild this tenant')
+    ap.add_argument('--from', dest='day_from', type=datetime.date.fromisoformat,
+                    help='only recompute days from this date (YYYY-MM-DD) on')
+    args = ap.parse_args()
+
+    from backend.db.connection import get_db_connection
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        done = rebuild(connection, args.company_id, args.day_from)
+        print(f"Call rollups rebuilt for {done} companies")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,78 @@
-import mysql.connector
+import threading
+from contextlib import contextmanager
 from mysql.connector import Error
-from backend.config import DB_CONFIG, CDR_DB_CONFIG
+from backend.config import DB_CONFIG, CDR_DB_CONFIG, DB_POOL_CONFIG, CDR_DB_POOL_CONFIG
+from backend.db.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(name, connect_args, pool_config):
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ConnectionPool(name, connect_args, **pool_config)
+                _pools[name] = pool
+    return pool
+
+
+def get_db_pool():
+    return _get_pool('main', DB_CONFIG, DB_POOL_CONFIG)
+
+
+def get_cdr_db_pool():
+    return _get_pool('cdr', CDR_DB_CONFIG, CDR_DB_POOL_CONFIG)
+
+
+def get_pool_stats():
+    """Counters for every pool created in this process, keyed by pool name."""
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
 
 def get_db_connection():
+    """Check out a pooled connection; connection.close() returns it to the pool."""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        return get_db_pool().acquire()
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
 def get_cdr_db_connection():
+    """Check out a pooled CDR database connection, or None if it cannot be reached."""
     try:
-        print(f"Attempting to connect to CDR database at {CDR_DB_CONFIG['host']}:3306")
-        connection = mysql.connector.connect(**CDR_DB_CONFIG)
-        print("CDR Database connection successful!")
-        return connection
+        return get_cdr_db_pool().acquire()
     except Error as e:
-        print(f"Error connecting to CDR MySQL: {e}")
-        print(f"Connection details: {CDR_DB_CONFIG}")
-        return None
\ No newline at end of file
+        # Never log CDR_DB_CONFIG itself: it holds the password
+        print(f"Error connecting to CDR MySQL at {CDR_DB_CONFIG['host']}/{CDR_DB_CONFIG['database']}: {e}")
+        return None
+
+
+@contextmanager
+def db_connection():
+    """Context-manager form of get_db_connection().
+
+    Usage:
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            ...
+    Raises mysql.connector.Error if no connection could be obtained. The connection
+    goes back to the pool on exit; uncommitted work is rolled back.
+    """
+    connection = get_db_pool().acquire()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def cdr_db_connection():
+    """Context-manager form of get_cdr_db_connection()."""
+    connection = get_cdr_db_pool().acquire()
+    try:
+        yield connection
+    finally:
+        connection.close()
@@ -0,0 +1,98 @@
+"""Customer records: one canonical name and set of alternative numbers per customer number.
+
+`customers_<company_id>` (`customers` for the shared calls table) is keyed by the
+normalized 10-digit number that calls rows store in customer_number. Listings join
+it to show the customer's name on every call, so renaming a customer is one
+primary-key write instead of an update of every call row with that number.
+
+Calls whose number has no customers row fall back to the name on the call itself.
+"""
+from backend.db.company_tables import get_company_table_name
+
+
+def customers_table_name(company_id=None) -> str:
+    """Customers table paired with calls_<company_id>, or with the shared calls table."""
+    if company_id:
+        return get_company_table_name('customers', int(company_id))
+    return 'customers'
+
+
+def create_customers_table(cursor, company_id=None) -> None:
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS `{customers_table_name(company_id)}` (
+            customer_number VARCHAR(20) NOT NULL PRIMARY KEY,
+            name TEXT NULL,
+            alternative_numbers TEXT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def customer_columns_sql(call_alias: str, customer_alias: str = 'cu') -> str:
+    """SELECT list entries for name and alternative_numbers, preferring the customer record."""
+    return (
+        f"COALESCE(NULLIF({customer_alias}.name, ''), {call_alias}.name) AS name, "
+        f"COALESCE(NULLIF({customer_alias}.alternative_numbers, ''), {call_alias}.alternative_numbers) AS alternative_numbers"
+    )
+
+
+def customer_join_sql(company_id, call_alias: str, customer_alias: str = 'cu') -> str:
+    return (f" LEFT JOIN `{customers_table_name(company_id)}` {customer_alias} "
+            f"ON {customer_alias}.customer_number = {call_alias}.customer_number")
+
+
+def set_customer_name(cursor, company_id, customer_number, name) -> None:
+    """Make `name` the customer's canonical name. Does not commit."""
+    cursor.execute(
+        f"INSERT INTO `{customers_table_name(company_id)}` (customer_number, name) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name)",
+        (customer_number, name)
+    )
+
+
+def set_alternative_numbers(cursor, company_id, customer_number, alternative_numbers) -> None:
+    """Replace the customer's alternative numbers. Does not commit."""
+    cursor.execute(
+        f"INSERT INTO `{customers_table_name(company_id)}` (customer_number, alternative_numbers) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE alternative_numbers = VALUES(alternative_numbers)",
+        (customer_number, alternative_numbers)
+    )
+
+
+def upsert_customer_names(cursor, company_id, pairs) -> int:
+    """Set canonical names from (customer_number, name) pairs, later pairs winning.
+
+    Used by bulk loads so a freshly uploaded name shows on the customer's older calls,
+    as the most recent call's name always did. Empty names are ignored. Does not commit.
+    """
+    names = {}
+    for number, name in pairs:
+        if number and name:
+            names[number] = name
+    if names:
+        cursor.executemany(
+            f"INSERT INTO `{customers_table_name(company_id)}` (customer_number, name) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE name = VALUES(name)",
+            list(names.items())
+        )
+    return len(names)
+
+
+def backfill_customers(cursor, company_id=None) -> None:
+    """Create customer records from the calls table: the newest non-empty name and
+    alternative numbers seen for each number. Existing records are left untouched,
+    so this is safe to re-run."""
+    calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+    table = customers_table_name(company_id)
+    for column in ('name', 'alternative_numbers'):
+        cursor.execute(f"""
+            INSERT INTO `{table}` (customer_number, {column})
+            SELECT latest.customer_number, latest.value FROM (
+                SELECT customer_number, TRIM({column}) AS value,
+                       ROW_NUMBER() OVER (PARTITION BY customer_number ORDER BY timestamp DESC, id DESC) AS rn
+                FROM `{calls_table}`
+                WHERE customer_number <> '' AND TRIM(COALESCE({column}, '')) <> ''
+            ) latest
+            WHERE latest.rn = 1
+            ON DUPLICATE KEY UPDATE {column} = COALESCE(NULLIF(`{table}`.{column}, ''), latest.value)
+        """)
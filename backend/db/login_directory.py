@@ -0,0 +1,129 @@
+"""Global login directory: which companies have an agent with a given login id.
+
+`login_directory` maps login_id (a per-company agent_number, including the company
+admin's username) to company_id, so login resolves the tenant with one indexed
+lookup instead of probing every `agents_<id>` table. Handlers that add, edit or
+delete agents call `sync_login` inside their own transaction; the backfill job
+rebuilds the directory from the tenant tables:
+
+    python -m backend.db.login_directory [--company-id N]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error
+from backend.db.company_tables import get_company_table_name
+
+CREATE_LOGIN_DIRECTORY = """
+    CREATE TABLE IF NOT EXISTS login_directory (
+        login_id VARCHAR(50) NOT NULL,
+        company_id INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (login_id, company_id),
+        INDEX idx_login_directory_company (company_id)
+    )
+"""
+
+
+def companies_for_login(cursor, login_id) -> list:
+    """Company ids that have an agent with this login id, lowest id first."""
+    cursor.execute(
+        "SELECT company_id FROM login_directory WHERE login_id = %s ORDER BY company_id",
+        (str(login_id),)
+    )
+    return [int(row['company_id'] if isinstance(row, dict) else row[0]) for row in cursor.fetchall()]
+
+
+def sync_login(cursor, company_id: int, login_id) -> None:
+    """Make the directory entry for (login_id, company_id) match the tenant's agents table.
+
+    Adds the entry if the agent exists there and removes it otherwise, so callers need
+    not know whether the preceding write inserted, updated or deleted the agent.
+    Does not commit; it runs in the caller's transaction.
+    """
+    table = get_company_table_name('agents', int(company_id))
+    login_id = str(login_id)
+    cursor.execute(
+        f"""
+        INSERT IGNORE INTO login_directory (login_id, company_id)
+        SELECT agent_number, %s FROM `{table}` WHERE agent_number = %s
+        """,
+        (int(company_id), login_id)
+    )
+    cursor.execute(
+        f"""
+        DELETE FROM login_directory
+        WHERE login_id = %s AND company_id = %s
+          AND NOT EXISTS (SELECT 1 FROM `{table}` WHERE agent_number = %s)
+        """,
+        (login_id, int(company_id), login_id)
+    )
+
+
+def backfill_company(cursor, company_id: int) -> None:
+    """Rebuild the directory entries of one company from its agents table."""
+    table = get_company_table_name('agents', int(company_id))
+    cursor.execute(
+        f"""
+        DELETE FROM login_directory
+        WHERE company_id = %s
+          AND login_id NOT IN (SELECT agent_number FROM `{table}`)
+        """,
+        (int(company_id),)
+    )
+    cursor.execute(
+        f"""
+        INSERT IGNORE INTO login_directory (login_id, company_id)
+        SELECT agent_number, %s FROM `{table}`
+        """,
+        (int(company_id),)
+    )
+
+
+def backfill(connection, company_id: int = None) -> int:
+    """Rebuild the directory for one company or all of them, committing per company.
+
+    Returns the number of companies processed; a company whose tables are missing is
+    reported and skipped.
+    """
+    cursor = connection.cursor(buffered=True)
+    try:
+        if company_id:
+            company_ids = [int(company_id)]
+        else:
+            cursor.execute("SELECT id FROM companies ORDER BY id")
+            company_ids = [int(row[0]) for row in cursor.fetchall()]
+        done = 0
+        for cid in company_ids:
+            try:
+                backfill_company(cursor, cid)
+                connection.commit()
+                done += 1
+            except Error as e:
+                connection.rollback()
+                print(f"Warning: login directory backfill for company {cid} failed: {e}")
+        return done
+    finally:
+        cursor.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Rebuild the global login directory from tenant agents tables')
+    ap.add_argument('--company-id', type=int, help='only rebuild this tenant')
+    args = ap.parse_args()
+
+    from backend.db.connection import get_db_connection
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        done = backfill(connection, args.company_id)
+        print(f"Login directory rebuilt for {done} companies")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
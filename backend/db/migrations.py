@@ -0,0 +1,572 @@
+"""Versioned schema migrations for the shared tables and every tenant's tables.
+
+Applied versions are recorded in `schema_migrations` under a scope: 'global' for the
+shared tables and 'tenant:<company_id>' for the per-company tables. Migrations run
+once at startup (or via `python -m backend.db.migrations`); request handlers assume
+the schema is current and never inspect or alter it.
+
+To change the schema, append a new (version, name, function) entry to
+GLOBAL_MIGRATIONS or TENANT_MIGRATIONS. Never edit or reorder an applied one.
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error
+from backend.db.company_tables import company_table_statements, get_company_table_name
+from backend.db.login_directory import CREATE_LOGIN_DIRECTORY, backfill_company
+from backend.db.call_remarks import backfill_table as backfill_remarks, create_remarks_table
+from backend.db.customers import backfill_customers, create_customers_table
+from backend.db.agent_state import create_state_table, rebuild_table as rebuild_agent_state
+from backend.ingest.cdr_sync import CREATE_SYNC_STATE
+from backend.db.call_rollups import create_rollup_tables, rebuild_table as rebuild_call_rollups
+from backend.db.agent_productivity import create_stats_table as create_agent_day_stats
+
+MIGRATION_LOCK_NAME = 'call_center_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 120  # seconds to wait for another process to finish migrating
+
+
+def _columns(cursor, table):
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (table,)
+    )
+    return {row[0].lower(): row[1].lower() for row in cursor.fetchall()}
+
+
+def _has_index(cursor, table, index_name):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (table, index_name)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+# -- global (shared table) migrations ----------------------------------------
+
+def _g001_baseline_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(64) NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agents (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agent_number VARCHAR(20) UNIQUE NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            password VARCHAR(64) NOT NULL,
+            status ENUM('Active', 'Inactive') DEFAULT 'Active',
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            company_id INT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS master_users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(64) NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS companies (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(150) NOT NULL,
+            admin_username VARCHAR(50) NOT NULL,
+            admin_password VARCHAR(64) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            contact_no VARCHAR(30),
+            payment_status ENUM('Paid','Unpaid') DEFAULT 'Paid',
+            status ENUM('Active','Partially Close','Fully Close') DEFAULT 'Active',
+            created_by_master_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _g002_company_id_columns(cursor):
+    """users/agents.company_id, backfilled when there is exactly one company."""
+    if 'company_id' not in _columns(cursor, 'users'):
+        cursor.execute("ALTER TABLE users ADD COLUMN company_id INT NULL AFTER email")
+    if 'company_id' not in _columns(cursor, 'agents'):
+        cursor.execute("ALTER TABLE agents ADD COLUMN company_id INT NULL AFTER email")
+        cursor.execute("SELECT id FROM companies LIMIT 2")
+        companies = cursor.fetchall()
+        if len(companies) == 1:
+            cursor.execute("UPDATE agents SET company_id = %s WHERE company_id IS NULL", (companies[0][0],))
+
+
+def _g003_shared_calls(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agent_number VARCHAR(20) NOT NULL,
+            customer_number VARCHAR(20) NOT NULL,
+            duration INT,
+            call_status VARCHAR(50),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            remarks TEXT,
+            name TEXT,
+            remarks_status TEXT,
+            recordings LONGBLOB,
+            alternative_numbers TEXT,
+            meeting_datetime DATETIME NULL,
+            meeting_description TEXT,
+            company_id INT NULL,
+            FOREIGN KEY (agent_number) REFERENCES agents(agent_number)
+        )
+    """)
+    cols = _columns(cursor, 'calls')
+    if 'recordings' not in cols:
+        cursor.execute("ALTER TABLE calls ADD COLUMN recordings LONGBLOB AFTER remarks_status")
+    elif cols['recordings'] != 'longblob':
+        cursor.execute("ALTER TABLE calls MODIFY recordings LONGBLOB")
+    if 'alternative_numbers' not in cols:
+        cursor.execute("ALTER TABLE calls ADD COLUMN alternative_numbers TEXT AFTER recordings")
+    if 'meeting_datetime' not in cols:
+        cursor.execute("ALTER TABLE calls ADD COLUMN meeting_datetime DATETIME NULL AFTER alternative_numbers")
+    if 'meeting_description' not in cols:
+        cursor.execute("ALTER TABLE calls ADD COLUMN meeting_description TEXT AFTER meeting_datetime")
+    if 'company_id' not in cols:
+        cursor.execute("ALTER TABLE calls ADD COLUMN company_id INT NULL AFTER meeting_description")
+        cursor.execute(
+            """
+            UPDATE calls c
+            JOIN agents a ON a.agent_number = c.agent_number
+            SET c.company_id = a.company_id
+            WHERE c.company_id IS NULL
+            """
+        )
+
+
+def _g004_shared_agent_breaks(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agent_breaks (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agent_number VARCHAR(20) NOT NULL,
+            status ENUM('Working', 'Break') NOT NULL,
+            break_start DATETIME,
+            break_end DATETIME,
+            duration_seconds INT,
+            remark TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            company_id INT NULL,
+            FOREIGN KEY (agent_number) REFERENCES agents(agent_number)
+        )
+    """)
+    if 'company_id' not in _columns(cursor, 'agent_breaks'):
+        cursor.execute("ALTER TABLE agent_breaks ADD COLUMN company_id INT NULL AFTER created_at")
+        cursor.execute(
+            """
+            UPDATE agent_breaks b
+            JOIN agents a ON a.agent_number = b.agent_number
+            SET b.company_id = a.company_id
+            WHERE b.company_id IS NULL
+            """
+        )
+
+
+def _g005_agents_company_unique(cursor):
+    """Composite unique (company_id, agent_number) instead of a global unique agent_number."""
+    cursor.execute(
+        """
+        SELECT INDEX_NAME, NON_UNIQUE, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS cols
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agents'
+        GROUP BY INDEX_NAME, NON_UNIQUE
+        """
+    )
+    try:
+        for idx_name, non_unique, cols in cursor.fetchall():
+            if non_unique == 0 and (cols or '').lower() == 'agent_number':
+                cursor.execute(f"ALTER TABLE agents DROP INDEX `{idx_name}`")
+                break
+    except Error as e:
+        # The legacy calls/agent_breaks FKs reference agents.agent_number; keep the index then
+        print(f"Warning: kept unique index on agents.agent_number: {e}")
+    if not _has_index(cursor, 'agents', 'uniq_agents_company_agent'):
+        cursor.execute("ALTER TABLE agents ADD UNIQUE KEY `uniq_agents_company_agent` (`company_id`,`agent_number`)")
+
+
+def _g006_companies_admin_username_not_unique(cursor):
+    cursor.execute(
+        """
+        SELECT INDEX_NAME, NON_UNIQUE FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'companies' AND COLUMN_NAME = 'admin_username'
+        """
+    )
+    for idx_name, non_unique in cursor.fetchall():
+        if non_unique == 0:
+            cursor.execute(f"ALTER TABLE companies DROP INDEX `{idx_name}`")
+            break
+
+
+def _add_recording_columns(cursor, table):
+    cols = _columns(cursor, table)
+    if 'recording_ref' not in cols:
+        cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN recording_ref VARCHAR(80) NULL AFTER recordings")
+    if 'recording_size' not in cols:
+        cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN recording_size BIGINT NULL AFTER recording_ref")
+    if 'recording_mime' not in cols:
+        cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN recording_mime VARCHAR(50) NULL AFTER recording_size")
+
+
+def _g007_shared_calls_recording_ref(cursor):
+    _add_recording_columns(cursor, 'calls')
+
+
+def _g008_login_directory(cursor):
+    cursor.execute(CREATE_LOGIN_DIRECTORY)
+    if not _has_index(cursor, 'companies', 'idx_companies_admin_username'):
+        cursor.execute("ALTER TABLE companies ADD INDEX idx_companies_admin_username (admin_username)")
+    cursor.execute("SELECT id FROM companies ORDER BY id")
+    for (cid,) in cursor.fetchall():
+        try:
+            backfill_company(cursor, int(cid))
+        except Error as e:
+            # Re-run `python -m backend.db.login_directory` once the tenant is repaired
+            print(f"Warning: login directory backfill for company {cid} failed: {e}")
+
+
+def _g009_jobs(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id CHAR(32) PRIMARY KEY,
+            company_id INT NOT NULL,
+            kind VARCHAR(50) NOT NULL,
+            status ENUM('queued', 'running', 'succeeded', 'failed', 'cancelled') NOT NULL DEFAULT 'queued',
+            payload TEXT,
+            progress_done INT NOT NULL DEFAULT 0,
+            progress_total INT NULL,
+            result MEDIUMTEXT,
+            error TEXT,
+            cancel_requested TINYINT(1) NOT NULL DEFAULT 0,
+            worker_id VARCHAR(100) NULL,
+            created_by INT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME NULL,
+            heartbeat_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            INDEX idx_jobs_status_created (status, created_at),
+            INDEX idx_jobs_company_status (company_id, status)
+        )
+    """)
+
+
+def _split_remarks(cursor, calls_table, company_id=None):
+    """Move concatenated remark histories of calls_table into its call_remarks table."""
+    if 'remarks_count' not in _columns(cursor, calls_table):
+        cursor.execute(
+            f"ALTER TABLE `{calls_table}` ADD COLUMN remarks_count INT NOT NULL DEFAULT 0 AFTER remarks_status"
+        )
+    create_remarks_table(cursor, company_id)
+    migrated = backfill_remarks(cursor, company_id)
+    if migrated:
+        print(f"Split remark history of {migrated} calls in {calls_table}")
+
+
+def _g010_shared_call_remarks(cursor):
+    _split_remarks(cursor, 'calls')
+
+
+def _g011_shared_customers(cursor):
+    create_customers_table(cursor)
+    backfill_customers(cursor)
+
+
+def _g012_shared_agent_state(cursor):
+    create_state_table(cursor)
+    rebuild_agent_state(cursor)
+
+
+def _agent_name_search_indexes(cursor, agents):
+    """Prefix (idx_name) and word (ft_name) indexes for the break history agent search."""
+    if not _has_index(cursor, agents, 'idx_name'):
+        cursor.execute(f"ALTER TABLE `{agents}` ADD INDEX idx_name (name)")
+    if not _has_index(cursor, agents, 'ft_name'):
+        cursor.execute(f"ALTER TABLE `{agents}` ADD FULLTEXT INDEX ft_name (name)")
+
+
+def _g013_shared_break_history(cursor):
+    """The shared agent_breaks table gets the started_at column and indexes the tenant
+    tables got in tenant migration 5, so the break history pages the same way."""
+    if 'started_at' not in _columns(cursor, 'agent_breaks'):
+        cursor.execute(
+            "ALTER TABLE agent_breaks ADD COLUMN started_at DATETIME "
+            "GENERATED ALWAYS AS (COALESCE(break_start, created_at)) VIRTUAL"
+        )
+    if not _has_index(cursor, 'agent_breaks', 'idx_started_at'):
+        cursor.execute("ALTER TABLE agent_breaks ADD INDEX idx_started_at (started_at)")
+    if not _has_index(cursor, 'agent_breaks', 'idx_agent_started'):
+        cursor.execute("ALTER TABLE agent_breaks ADD INDEX idx_agent_started (agent_number, started_at)")
+    _agent_name_search_indexes(cursor, 'agents')
+
+
+def _g014_cdr_sync_state(cursor):
+    cursor.execute(CREATE_SYNC_STATE)
+
+
+GLOBAL_MIGRATIONS = [
+    (1, 'baseline tables', _g001_baseline_tables),
+    (2, 'company_id columns on users/agents', _g002_company_id_columns),
+    (3, 'shared calls table', _g003_shared_calls),
+    (4, 'shared agent_breaks table', _g004_shared_agent_breaks),
+    (5, 'agents (company_id, agent_number) unique key', _g005_agents_company_unique),
+    (6, 'companies.admin_username not unique', _g006_companies_admin_username_not_unique),
+    (7, 'shared calls recording reference columns', _g007_shared_calls_recording_ref),
+    (8, 'login directory', _g008_login_directory),
+    (9, 'background jobs', _g009_jobs),
+    (10, 'shared call remark history', _g010_shared_call_remarks),
+    (11, 'shared customers table', _g011_shared_customers),
+    (12, 'shared agent current-status table', _g012_shared_agent_state),
+    (13, 'shared break history indexes', _g013_shared_break_history),
+    (14, 'CDR sync checkpoints', _g014_cdr_sync_state),
+]
+
+
+# -- per-tenant migrations ----------------------------------------------------
+
+def _t001_company_tables(cursor, company_id):
+    for statement in company_table_statements(company_id):
+        cursor.execute(statement)
+
+
+def _t002_recording_ref(cursor, company_id):
+    _add_recording_columns(cursor, get_company_table_name('calls', company_id))
+
+
+def _t003_call_remarks(cursor, company_id):
+    _split_remarks(cursor, get_company_table_name('calls', company_id), company_id)
+
+
+def _t004_customers(cursor, company_id):
+    create_customers_table(cursor, company_id)
+    backfill_customers(cursor, company_id)
+
+
+def _t005_hot_query_indexes(cursor, company_id):
+    """Index set for the per-tenant hot queries (see backend/benchmarks/check_query_plans.py).
+
+    calls:        (agent_number, timestamp) for agents' listings, whose keyset order
+                  (timestamp DESC, id DESC) it covers because InnoDB appends the id;
+                  (customer_number, agent_number) for per-customer lookups.
+    agent_breaks: started_at = COALESCE(break_start, created_at), the moment a row is
+                  sorted and grouped by, as an indexed virtual column;
+                  (agent_number, status, break_end, break_start) for the open-break
+                  lookup. Single-column indexes made redundant by these are dropped.
+    """
+    calls = get_company_table_name('calls', company_id)
+    if not _has_index(cursor, calls, 'idx_agent_timestamp'):
+        cursor.execute(f"ALTER TABLE `{calls}` ADD INDEX idx_agent_timestamp (agent_number, timestamp)")
+    if not _has_index(cursor, calls, 'idx_customer_agent'):
+        cursor.execute(f"ALTER TABLE `{calls}` ADD INDEX idx_customer_agent (customer_number, agent_number)")
+    if _has_index(cursor, calls, 'idx_agent_number'):
+        cursor.execute(f"ALTER TABLE `{calls}` DROP INDEX idx_agent_number")
+
+    breaks = get_company_table_name('agent_breaks', company_id)
+    if 'started_at' not in _columns(cursor, breaks):
+        cursor.execute(
+            f"ALTER TABLE `{breaks}` ADD COLUMN started_at DATETIME "
+            "GENERATED ALWAYS AS (COALESCE(break_start, created_at)) VIRTUAL"
+        )
+    if not _has_index(cursor, breaks, 'idx_started_at'):
+        cursor.execute(f"ALTER TABLE `{breaks}` ADD INDEX idx_started_at (started_at)")
+    if not _has_index(cursor, breaks, 'idx_agent_started'):
+        cursor.execute(f"ALTER TABLE `{breaks}` ADD INDEX idx_agent_started (agent_number, started_at)")
+    if not _has_index(cursor, breaks, 'idx_agent_open_break'):
+        cursor.execute(
+            f"ALTER TABLE `{breaks}` ADD INDEX idx_agent_open_break (agent_number, status, break_end, break_start)"
+        )
+    for redundant in ('idx_agent_number', 'idx_break_start'):
+        if _has_index(cursor, breaks, redundant):
+            cursor.execute(f"ALTER TABLE `{breaks}` DROP INDEX {redundant}")
+
+
+def _t006_agent_state(cursor, company_id):
+    create_state_table(cursor, company_id)
+    rebuild_agent_state(cursor, company_id)
+
+
+def _t007_agent_name_search(cursor, company_id):
+    _agent_name_search_indexes(cursor, get_company_table_name('agents', company_id))
+
+
+def _t008_cdr_id(cursor, company_id):
+    """calls.cdr_id: the CDR row a synced call came from, unique so re-syncing updates it."""
+    calls = get_company_table_name('calls', company_id)
+    if 'cdr_id' not in _columns(cursor, calls):
+        cursor.execute(f"ALTER TABLE `{calls}` ADD COLUMN cdr_id BIGINT NULL")
+    if not _has_index(cursor, calls, 'uniq_cdr_id'):
+        cursor.execute(f"ALTER TABLE `{calls}` ADD UNIQUE KEY uniq_cdr_id (cdr_id)")
+
+
+def _t009_call_rollups(cursor, company_id):
+    create_rollup_tables(cursor, company_id)
+    rebuild_call_rollups(cursor, company_id)
+
+
+def _t010_agent_day_stats(cursor, company_id):
+    create_agent_day_stats(cursor, company_id)
+
+
+def _t011_agent_day_stats_recompute(cursor, company_id):
+    """Days stored before uploaded leads were excluded counted them as calls; drop them."""
+    cursor.execute(f"DELETE FROM `{get_company_table_name('agent_day_stats', company_id)}`")
+
+
+def _t012_call_rollups_rebuild(cursor, company_id):
+    """Uploaded leads were recorded with duration 0 and counted as timed calls."""
+    rebuild_call_rollups(cursor, company_id)
+
+
+TENANT_MIGRATIONS = [
+    (1, 'agents/calls/agent_breaks tables', _t001_company_tables),
+    (2, 'calls recording reference columns', _t002_recording_ref),
+    (3, 'call remark history', _t003_call_remarks),
+    (4, 'customers table', _t004_customers),
+    (5, 'hot query indexes', _t005_hot_query_indexes),
+    (6, 'agent current-status table', _t006_agent_state),
+    (7, 'agent name search indexes', _t007_agent_name_search),
+    (8, 'calls CDR id', _t008_cdr_id),
+    (9, 'call analytics rollups', _t009_call_rollups),
+    (10, 'agent productivity day stats', _t010_agent_day_stats),
+    (11, 'recompute agent productivity day stats', _t011_agent_day_stats_recompute),
+    (12, 'rebuild call rollups without uploaded leads as timed calls', _t012_call_rollups_rebuild),
+]
+
+
+# -- runner -------------------------------------------------------------------
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            scope VARCHAR(50) NOT NULL,
+            version INT NOT NULL,
+            name VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (scope, version)
+        )
+    """)
+
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT scope, MAX(version) FROM schema_migrations GROUP BY scope")
+    return {scope: int(version) for scope, version in cursor.fetchall()}
+
+
+def _apply(connection, scope, current, migrations, *args):
+    applied = 0
+    for version, name, func in migrations:
+        if version <= current:
+            continue
+        cursor = connection.cursor(buffered=True)
+        try:
+            func(cursor, *args)
+            cursor.execute(
+                "INSERT INTO schema_migrations (scope, version, name) VALUES (%s, %s, %s)",
+                (scope, version, name)
+            )
+            connection.commit()
+            applied += 1
+            print(f"Applied migration {scope} v{version}: {name}")
+        except Exception:
+            # DDL auto-commits in MySQL; migrations are written to be safely re-runnable
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+    return applied
+
+
+def tenant_scope(company_id: int) -> str:
+    return f"tenant:{int(company_id)}"
+
+
+def migrate_tenant(connection, company_id: int) -> int:
+    """Bring one tenant's tables to the latest version. Returns migrations applied."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM schema_migrations WHERE scope = %s",
+            (tenant_scope(company_id),)
+        )
+        current = int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+    return _apply(connection, tenant_scope(company_id), current, TENANT_MIGRATIONS, int(company_id))
+
+
+def run_migrations(connection) -> int:
+    """Apply pending global migrations, then pending migrations for every tenant.
+
+    A MySQL advisory lock serialises concurrent callers (e.g. several workers booting).
+    A failing tenant is reported and skipped so one bad tenant cannot block the rest.
+    """
+    cursor = connection.cursor(buffered=True)
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise Error("Timed out waiting for the schema migration lock")
+    applied = 0
+    try:
+        _ensure_migrations_table(cursor)
+        versions = _applied_versions(cursor)
+        applied += _apply(connection, 'global', versions.get('global', 0), GLOBAL_MIGRATIONS)
+        cursor.execute("SELECT id FROM companies ORDER BY id")
+        latest = TENANT_MIGRATIONS[-1][0]
+        for (cid,) in cursor.fetchall():
+            current = versions.get(tenant_scope(cid), 0)
+            if current >= latest:
+                continue
+            try:
+                applied += _apply(connection, tenant_scope(cid), current, TENANT_MIGRATIONS, int(cid))
+            except Exception as e:
+                print(f"Warning: migrations for company {cid} failed: {e}")
+        return applied
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+        cursor.fetchall()
+        cursor.close()
+
+
+def schema_status(connection) -> dict:
+    """Current version per scope alongside the latest known versions."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        _ensure_migrations_table(cursor)
+        return {
+            'latest_global': GLOBAL_MIGRATIONS[-1][0],
+            'latest_tenant': TENANT_MIGRATIONS[-1][0],
+            'applied': _applied_versions(cursor),
+        }
+    finally:
+        cursor.close()
+
+
+if __name__ == '__main__':
+    from backend.db.connection import get_db_connection
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        count = run_migrations(connection)
+        print(f"Schema up to date ({count} migrations applied)")
+    finally:
+        connection.close()
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+
+class _PoolEntry:
+    """A raw connection plus the bookkeeping the pool needs to recycle it."""
+
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """Proxy handed out by the pool.
+
+    Behaves like a mysql.connector connection, except that close() returns the
+    underlying connection to its pool instead of tearing down the socket. This lets
+    existing handlers keep their `finally: connection.close()` blocks unchanged.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise Error("Connection already returned to the pool")
+        return getattr(entry.raw, name)
+
+    def __setattr__(self, name, value):
+        # Properties such as `connection.database = ...` must reach the real connection
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._entry.raw, name, value)
+
+    def close(self):
+        entry = self._entry
+        if entry is None:
+            return
+        self._entry = None
+        self._pool._release(entry)
+
+    def discard(self):
+        """Close the underlying connection instead of returning it to the pool.
+
+        Use when the connection is in an unknown state, e.g. an unbuffered result set
+        was abandoned halfway and draining it would cost more than reconnecting.
+        """
+        entry = self._entry
+        if entry is None:
+            return
+        self._entry = None
+        self._pool._discard(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool.
+
+    - pool_size: connections kept open while idle
+    - max_overflow: extra connections allowed under burst load (closed on release)
+    - timeout: seconds a checkout waits for a free connection before PoolError
+    - idle_timeout: idle connections older than this are closed instead of reused
+    - max_lifetime: connections older than this are recycled regardless of use
+    - ping_on_checkout: verify a reused connection with a ping before handing it out
+    """
+
+    def __init__(self, name, connect_args, pool_size=10, max_overflow=10, timeout=5.0,
+                 idle_timeout=300, max_lifetime=3600, ping_on_checkout=True):
+        self.name = name
+        self._connect_args = dict(connect_args)
+        self.pool_size = int(pool_size)
+        self.max_overflow = int(max_overflow)
+        self.timeout = float(timeout)
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_on_checkout = ping_on_checkout
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+        }
+
+    # -- checkout / release -------------------------------------------------
+
+    def acquire(self):
+        """Check out a connection, blocking up to `timeout` seconds when exhausted."""
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        entry = None
+        with self._cond:
+            while True:
+                entry = self._pop_idle_locked()
+                if entry is not None:
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    # Reserve a slot; the actual connect happens outside the lock
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolError(f"Pool '{self.name}' exhausted after {self.timeout:.1f}s")
+                waited = True
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_ms'] += (time.monotonic() - started) * 1000.0
+
+        if entry is not None and self.ping_on_checkout and not self._ping(entry):
+            with self._cond:
+                self._stats['ping_failures'] += 1
+            self._close_raw(entry.raw)
+            entry = None  # slot stays reserved; reconnect below
+        if entry is None:
+            try:
+                entry = _PoolEntry(mysql.connector.connect(**self._connect_args))
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+        return PooledConnection(self, entry)
+
+    def _release(self, entry):
+        raw = entry.raw
+        reusable = True
+        try:
+            # Never hand the next request a half-read result set or an open transaction
+            if getattr(raw, 'unread_result', False):
+                raw.consume_results()
+            if getattr(raw, 'in_transaction', False):
+                raw.rollback()
+        except Exception:
+            reusable = False
+        entry.last_used = time.monotonic()
+        with self._cond:
+            if (reusable and os.getpid() == self._pid
+                    and len(self._idle) < self.pool_size and not self._expired(entry, entry.last_used)):
+                self._idle.append(entry)
+                raw = None
+            else:
+                self._open -= 1
+                if reusable:
+                    self._stats['recycled'] += 1
+            self._cond.notify()
+        if raw is not None:
+            self._close_raw(raw)
+
+    def _discard(self, entry):
+        with self._cond:
+            self._open -= 1
+            self._stats['recycled'] += 1
+            self._cond.notify()
+        self._close_raw(entry.raw)
+
+    # -- helpers ------------------------------------------------------------
+
+    def _pop_idle_locked(self):
+        now = time.monotonic()
+        while self._idle:
+            # LIFO keeps the hottest connections in use and lets the rest age out
+            entry = self._idle.pop()
+            if self._expired(entry, now) or (
+                    self.idle_timeout and now - entry.last_used > self.idle_timeout):
+                self._open -= 1
+                self._stats['recycled'] += 1
+                self._close_raw(entry.raw)
+                continue
+            return entry
+        return None
+
+    def _expired(self, entry, now):
+        return bool(self.max_lifetime) and now - entry.created_at > self.max_lifetime
+
+    @staticmethod
+    def _ping(entry):
+        try:
+            entry.raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        # A pool created before a gunicorn fork must not share sockets with the parent
+        if os.getpid() != self._pid:
+            with self._cond:
+                if os.getpid() != self._pid:
+                    self._idle.clear()
+                    self._open = 0
+                    self._pid = os.getpid()
+
+    def dispose(self):
+        """Close every idle connection. Checked-out connections close on release."""
+        with self._cond:
+            entries = list(self._idle)
+            self._idle.clear()
+            self._open -= len(entries)
+        for entry in entries:
+            self._close_raw(entry.raw)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data['wait_time_ms'] = round(data['wait_time_ms'], 3)
+            data['open'] = self._open
+            data['idle'] = len(self._idle)
+            data['in_use'] = self._open - len(self._idle)
+            data['pool_size'] = self.pool_size
+            data['max_overflow'] = self.max_overflow
+        return data
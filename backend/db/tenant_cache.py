@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from backend.config import TENANT_CACHE
+
+# company_id -> (expires_at, stamp, {'status': ..., 'payment_status': ...})
+_entries = {}
+_lock = threading.Lock()
+
+
+def _stamp_path(company_id):
+    stamp_dir = TENANT_CACHE.get('stamp_dir')
+    if not stamp_dir:
+        return None
+    return os.path.join(stamp_dir, str(int(company_id)))
+
+
+def _read_stamp(company_id):
+    """Cross-process version stamp for a company: the identity of its stamp file.
+
+    Checking it is a single stat() call, so the 403 gate stays free of database
+    round-trips while still noticing invalidations made by other workers.
+    """
+    path = _stamp_path(company_id)
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _load(connection, company_id):
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("SELECT status, payment_status FROM companies WHERE id = %s", (company_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        return None
+    return {'status': row.get('status') or 'Active', 'payment_status': row.get('payment_status') or 'Paid'}
+
+
+def get_company_access(connection, company_id):
+    """Return {'status', 'payment_status'} for a company, or None if it does not exist.
+
+    Served from an in-process cache for TENANT_CACHE['ttl'] seconds; `connection` is
+    only used on a miss.
+    """
+    company_id = int(company_id)
+    now = time.monotonic()
+    stamp = _read_stamp(company_id)
+    entry = _entries.get(company_id)
+    if entry is not None and entry[0] > now and entry[1] == stamp:
+        return entry[2]
+    info = _load(connection, company_id)
+    with _lock:
+        _entries[company_id] = (now + TENANT_CACHE['ttl'], stamp, info)
+    return info
+
+
+def is_company_blocked(connection, company_id) -> bool:
+    """True when the company is Fully Close or Unpaid (its users get a 403)."""
+    info = get_company_access(connection, company_id)
+    if info is None:
+        return False
+    return info['status'] == 'Fully Close' or info['payment_status'] == 'Unpaid'
+
+
+def invalidate_company(company_id) -> None:
+    """Drop a company's cached status here and signal every other worker process."""
+    company_id = int(company_id)
+    with _lock:
+        _entries.pop(company_id, None)
+    path = _stamp_path(company_id)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as fh:
+            fh.write(str(time.time_ns()))
+        # os.replace gives the stamp a new inode, so readers see a new identity
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Warning: could not publish tenant cache invalidation: {e}")
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
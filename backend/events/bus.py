@@ -0,0 +1,184 @@
+"""In-process event bus behind GET /api/events.
+
+Write paths call `publish(company_id, event, data)` after they commit; every open
+event stream of that company wakes up and forwards the event. Each company has a
+bounded replay buffer so a reconnecting client can resume from its Last-Event-ID,
+and a cap on concurrent streams; another cap bounds the streams of the whole process.
+
+Each event has an audience, resolved from its data when it is published (see
+EVENT_AUDIENCES): the company's admins only, or the admins plus the one agent the
+event is about. Streams of agents skip everything else.
+
+Events live in the memory of the process that published them: run the API as one
+process with threads (e.g. `gunicorn -w 1 --threads 32`) so every stream sees every
+write. Event ids are "<process epoch>-<sequence>"; an id from another process run,
+or one older than the replay buffer, cannot be resumed and the stream tells the
+client to reload instead.
+"""
+import json
+import threading
+import time
+from collections import deque
+from backend.config import EVENTS
+
+
+# event -> data key naming the agent who may see it as well as the admins; None: admins only.
+# Events missing here are admin-only.
+EVENT_AUDIENCES = {
+    'agent_status': 'agent_number',
+    'call_updated': 'agent_number',
+    'customer_updated': None,
+    'calls_uploaded': None,
+}
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def audience(event: str, data) -> str:
+    """Agent number that may see this event besides the admins, or None for admins only."""
+    key = EVENT_AUDIENCES.get(event)
+    if key is None or not isinstance(data, dict) or data.get(key) in (None, ''):
+        return None
+    return str(data[key])
+
+
+def visible_to(agent_number, event_audience) -> bool:
+    """Whether a stream (agent_number None for admins) receives an event with this audience."""
+    return agent_number is None or event_audience == str(agent_number)
+
+
+class _Channel:
+    __slots__ = ('events', 'next_seq', 'cond', 'subscribers')
+
+    def __init__(self, replay_size):
+        self.events = deque(maxlen=replay_size)  # (seq, event, data_json, audience)
+        self.next_seq = 1
+        self.cond = threading.Condition()
+        self.subscribers = 0
+
+
+class Subscription:
+    """One open stream's position in its company's channel."""
+
+    def __init__(self, bus, channel):
+        self._bus = bus
+        self._channel = channel
+        self.last_seq = channel.next_seq - 1
+        self.closed = False
+
+    def resume(self, last_event_id):
+        """Events published after `last_event_id`, or None when they are no longer
+        all in the replay buffer (or the id belongs to another process run)."""
+        epoch, _, seq = (last_event_id or '').partition('-')
+        if epoch != self._bus.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        channel = self._channel
+        with channel.cond:
+            oldest = channel.events[0][0] if channel.events else channel.next_seq
+            if seq + 1 < oldest or seq >= channel.next_seq:
+                return None
+            self.last_seq = channel.next_seq - 1
+            return [e for e in channel.events if e[0] > seq]
+
+    def wait(self, timeout: float) -> list:
+        """Block until events newer than the last one returned arrive, or `timeout` passes."""
+        channel = self._channel
+        with channel.cond:
+            if channel.next_seq - 1 <= self.last_seq:
+                channel.cond.wait(timeout)
+            if channel.events and channel.events[0][0] > self.last_seq + 1:
+                # Fell further behind than the buffer holds; skip to what is left
+                self.last_seq = channel.events[0][0] - 1
+            events = [e for e in channel.events if e[0] > self.last_seq]
+            if events:
+                self.last_seq = events[-1][0]
+            return events
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            with self._channel.cond:
+                self._channel.subscribers -= 1
+            self._bus._released()
+
+
+class EventBus:
+    def __init__(self, replay_size: int, max_subscribers: int, max_total: int):
+        self.replay_size = replay_size
+        self.max_subscribers = max_subscribers
+        self.max_total = max_total
+        self.total = 0
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, company_id) -> _Channel:
+        key = int(company_id or 0)  # 0: users of the shared (non-tenant) tables
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = self._channels[key] = _Channel(self.replay_size)
+            return channel
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def publish(self, company_id, event: str, data) -> str:
+        channel = self._channel(company_id)
+        payload = json.dumps(data, default=str, separators=(',', ':'))
+        event_audience = audience(event, data)
+        with channel.cond:
+            seq = channel.next_seq
+            channel.next_seq += 1
+            channel.events.append((seq, event, payload, event_audience))
+            channel.cond.notify_all()
+        return self.event_id(seq)
+
+    def subscribe(self, company_id) -> Subscription:
+        channel = self._channel(company_id)
+        # Every stream holds a worker thread: the process-wide cap keeps some for the API
+        with self._lock:
+            if self.total >= self.max_total:
+                raise TooManySubscribers('Too many open event streams on this server')
+            self.total += 1
+        try:
+            with channel.cond:
+                if channel.subscribers >= self.max_subscribers:
+                    raise TooManySubscribers(f'At most {self.max_subscribers} event streams per company')
+                channel.subscribers += 1
+                return Subscription(self, channel)
+        except TooManySubscribers:
+            self._released()
+            raise
+
+    def _released(self) -> None:
+        with self._lock:
+            self.total -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            channels = dict(self._channels)
+        return {
+            'epoch': self.epoch,
+            'streams': self.total,
+            'max_streams': self.max_total,
+            'companies': {
+                key: {'subscribers': c.subscribers, 'last_event': c.next_seq - 1, 'buffered': len(c.events)}
+                for key, c in channels.items()
+            },
+        }
+
+
+bus = EventBus(EVENTS['replay_size'], EVENTS['max_streams_per_company'], EVENTS['max_streams'])
+
+
+def publish(company_id, event: str, data) -> None:
+    """Publish to the company's streams. Never raises: a write that has already
+    committed must not fail because of its notification."""
+    try:
+        bus.publish(company_id, event, data)
+    except Exception as e:
+        print(f"Warning: could not publish {event} event: {e}")
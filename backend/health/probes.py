@@ -0,0 +1,223 @@
+"""Cached health probes behind /api/health/ready, /api/health/cdr and /api/test-cdr.
+
+A probe never queries a database itself. It reads the latest snapshot, which a
+background thread refreshes every HEALTH['refresh_interval'] seconds. The thread
+starts with the first probe and stops after HEALTH['idle_stop'] seconds without
+one. Only the very first probe of a process waits for a refresh.
+
+A snapshot holds:
+- main: ping round trip to the application database, and how far the CDR sync
+  watermark trails the clock
+- cdr: ping, replication lag (SHOW REPLICA STATUS, when the CDR database is a
+  replica) and the approximate row count of the CDR table from information_schema
+  (table statistics, not COUNT(*))
+- pools: saturation of each connection pool of this process (computed per probe,
+  as it is only in-memory counters)
+"""
+import datetime
+import os
+import threading
+import time
+from mysql.connector import Error
+from backend.config import CDR_SYNC, HEALTH
+from backend.db.connection import get_cdr_db_pool, get_db_pool, get_pool_stats
+
+
+def _ping_ms(connection) -> float:
+    cursor = connection.cursor()
+    try:
+        started = time.perf_counter()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        return round((time.perf_counter() - started) * 1000.0, 2)
+    finally:
+        cursor.close()
+
+
+def _replication_lag(connection):
+    """(is_replica, lag seconds or None). Lag is None while replication is stopped."""
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Error:
+            cursor.execute("SHOW SLAVE STATUS")  # MySQL before 8.0.22
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return False, None
+    row = rows[0]
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return True, None if lag is None else int(lag)
+
+
+def _approx_rows(connection, table: str):
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+    finally:
+        cursor.close()
+
+
+def _sync_lag(connection):
+    """Seconds between now and the newest CDR row the sync has copied, or None."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT MAX(last_timestamp) FROM cdr_sync_state")
+        row = cursor.fetchone()
+    except Error:
+        return None  # sync never set up
+    finally:
+        cursor.close()
+    if not row or row[0] is None:
+        return None
+    return max(0, int((datetime.datetime.now() - row[0]).total_seconds()))
+
+
+def check_main() -> dict:
+    try:
+        connection = get_db_pool().acquire()
+    except Error as e:
+        return {'ok': False, 'error': str(e)}
+    try:
+        result = {'ok': True, 'ping_ms': _ping_ms(connection)}
+        result['cdr_sync_lag_seconds'] = _sync_lag(connection)
+        return result
+    except Error as e:
+        return {'ok': False, 'error': str(e)}
+    finally:
+        connection.close()
+
+
+def check_cdr() -> dict:
+    table = CDR_SYNC['source_table']
+    try:
+        connection = get_cdr_db_pool().acquire()
+    except Error as e:
+        return {'ok': False, 'error': str(e)}
+    try:
+        result = {'ok': True, 'ping_ms': _ping_ms(connection), 'table': table}
+        try:
+            result['replica'], result['replication_lag_seconds'] = _replication_lag(connection)
+        except Error:
+            # The CDR user may lack REPLICATION CLIENT; that is not an outage
+            result['replica'], result['replication_lag_seconds'] = None, None
+        lag = result['replication_lag_seconds']
+        result['degraded'] = bool(result['replica']) and (lag is None or lag > HEALTH['max_replication_lag'])
+        result['approx_rows'] = _approx_rows(connection, table)
+        return result
+    except Error as e:
+        return {'ok': False, 'error': str(e)}
+    finally:
+        connection.close()
+
+
+def pool_saturation() -> dict:
+    """Per pool: checked-out share of its capacity (pool_size + max_overflow) and wait counters."""
+    out = {}
+    for name, stats in get_pool_stats().items():
+        capacity = stats['pool_size'] + stats['max_overflow']
+        out[name] = {
+            'in_use': stats['in_use'],
+            'capacity': capacity,
+            'saturation': round(stats['in_use'] / capacity, 3) if capacity else 1.0,
+            'waits': stats['waits'],
+            'timeouts': stats['timeouts'],
+        }
+    return out
+
+
+def collect() -> dict:
+    started = time.perf_counter()
+    snapshot = {'main': check_main(), 'cdr': check_cdr()}
+    snapshot['checked_at'] = datetime.datetime.now().isoformat(timespec='seconds')
+    snapshot['elapsed_ms'] = round((time.perf_counter() - started) * 1000.0, 1)
+    return snapshot
+
+
+class HealthCache:
+    """Latest probe snapshot plus the thread that keeps it fresh."""
+
+    def __init__(self, collect_fn, refresh_interval: float, idle_stop: float):
+        self._collect = collect_fn
+        self.refresh_interval = refresh_interval
+        self.idle_stop = idle_stop
+        self._snapshot = None
+        self._taken = 0.0
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+        self._first = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def refresh(self) -> None:
+        try:
+            snapshot = self._collect()
+        except Exception as e:
+            error = {'ok': False, 'error': f'probe failed: {e}'}
+            snapshot = {'main': error, 'cdr': error,
+                        'checked_at': datetime.datetime.now().isoformat(timespec='seconds')}
+        with self._lock:
+            self._snapshot, self._taken = snapshot, time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if time.monotonic() - self._last_probe > self.idle_stop:
+                    self._thread = None
+                    return
+                due = self._taken + self.refresh_interval - time.monotonic()
+            if due > 0:
+                time.sleep(due)
+            else:
+                self.refresh()
+
+    def get(self):
+        """(snapshot, age in seconds). Starts the refresher if it is not running."""
+        with self._lock:
+            self._last_probe = time.monotonic()
+            # A thread started before a gunicorn fork does not exist in the child
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='health-refresh', daemon=True)
+                self._thread.start()
+            snapshot = self._snapshot
+        if snapshot is None:
+            with self._first:  # first probe of the process refreshes once itself
+                if self._snapshot is None:
+                    self.refresh()
+        with self._lock:
+            return self._snapshot, time.monotonic() - self._taken
+
+
+cache = HealthCache(collect, HEALTH['refresh_interval'], HEALTH['idle_stop'])
+
+
+def readiness() -> dict:
+    """Readiness verdict from the cached snapshot plus live pool saturation."""
+    snapshot, age = cache.get()
+    pools = pool_saturation()
+    reasons = []
+    if not snapshot['main']['ok']:
+        reasons.append('database unreachable')
+    main_pool = pools.get('main')
+    if main_pool and main_pool['saturation'] > HEALTH['max_pool_saturation']:
+        reasons.append(f"connection pool {main_pool['saturation']:.0%} saturated")
+    if HEALTH['cdr_required'] and not snapshot['cdr']['ok']:
+        reasons.append('CDR database unreachable')
+    if age > max(3 * HEALTH['ttl'], 3 * HEALTH['refresh_interval']):
+        reasons.append(f'health snapshot is {age:.0f}s old')
+    return {
+        'ready': not reasons,
+        'reasons': reasons,
+        'stale': age > HEALTH['ttl'],
+        'age_seconds': round(age, 1),
+        **snapshot,
+        'pools': pools,
+    }
@@ -0,0 +1,222 @@
+"""Streaming bulk ingest of uploaded call rows into calls_<company_id>.
+
+Rows arrive as an iterator of tuples (header first), so a sheet is never held in
+memory. They are validated in batches against agent numbers loaded once up front,
+normalized a column at a time, and written with one executemany per batch. Each batch
+is its own transaction: a failing batch is rolled back and reported while the rest
+of the file still loads.
+"""
+import time
+from mysql.connector import Error
+from openpyxl import load_workbook
+from backend.db.company_tables import get_company_table_name
+from backend.db.call_rollups import record_calls
+from backend.db.customers import upsert_customer_names
+from backend.ingest.phones import normalize_mobile_batch
+
+INGEST_BATCH_SIZE = 1000  # rows per executemany and per transaction
+MAX_REPORTED_ERRORS = 1000  # row errors listed in the response; error_count stays exact
+
+
+class IngestReport:
+    """Outcome of one ingest: counters, row-level errors and per-batch results."""
+
+    __slots__ = ('inserted', 'error_count', 'errors', 'batches', 'rows_read', 'started', 'error_sink')
+
+    def __init__(self, error_sink=None):
+        # error_sink(error_dict) receives every row error, including those past the cap
+        self.error_sink = error_sink
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.batches = []
+        self.rows_read = 0
+        self.started = time.perf_counter()
+
+    def add_error(self, error: dict) -> None:
+        self.error_count += 1
+        if self.error_sink is not None:
+            self.error_sink(error)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    def to_dict(self) -> dict:
+        return {
+            'message': f'Processed file: {self.inserted} success, {self.error_count} errors',
+            'success_count': self.inserted,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'batches': self.batches,
+            'elapsed_ms': round((time.perf_counter() - self.started) * 1000.0, 1),
+        }
+
+
+def read_xlsx_rows(stream):
+    """Yield the active sheet's rows as value tuples, header first, in read-only mode."""
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def column_indices(header_row) -> dict:
+    """Map the columns we load to their positions (case-insensitive, with synonyms).
+
+    Missing columns fall back to positions 0/1/2 for customer/name/remarks, matching
+    the layout of the downloadable template.
+    """
+    header_to_index = {}
+    for idx, header in enumerate(header_row or ()):
+        key = str(header or '').strip().lower()
+        if key and key not in header_to_index:
+            header_to_index[key] = idx
+    customer = header_to_index.get('customer')
+    if customer is None:
+        customer = header_to_index.get('customer_number')
+    return {
+        'agent': header_to_index.get('agent_number'),
+        'customer': 0 if customer is None else customer,
+        'name': header_to_index.get('name', 1),
+        'remarks': header_to_index.get('remarks', 2),
+    }
+
+
+def _cell_text(row, index) -> str:
+    if index is None or index >= len(row):
+        return ''
+    value = row[index]
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # numeric phone cells come back as floats from some writers
+    return str(value or '').strip()
+
+
+def load_agent_numbers(cursor, company_id: int) -> set:
+    cursor.execute(f"SELECT agent_number FROM `{get_company_table_name('agents', company_id)}`")
+    return {str(row[0]) for row in cursor.fetchall()}
+
+
+def _row_error(row_number, agent_number, customer_number, name, remarks, reason) -> dict:
+    return {
+        'row': row_number,
+        'agent_number': agent_number,
+        'customer_number': customer_number,
+        'name': name,
+        'remarks': remarks,
+        'reason': reason,
+    }
+
+
+def _prepare_batch(batch, columns, fallback_agent, agent_numbers, report) -> list:
+    """Turn (row_number, row) pairs into (agent, digits, remarks, name, row_number) tuples,
+    reporting bad rows."""
+    idx_agent, idx_customer = columns['agent'], columns['customer']
+    idx_name, idx_remarks = columns['name'], columns['remarks']
+    cells = []
+    for row_number, row in batch:
+        agent = (_cell_text(row, idx_agent) if idx_agent is not None else '') or fallback_agent
+        cells.append((row_number, agent, _cell_text(row, idx_customer),
+                      _cell_text(row, idx_name), _cell_text(row, idx_remarks)))
+
+    normalized = normalize_mobile_batch([c[2] for c in cells])
+    params = []
+    for (row_number, agent, customer, name, remarks), digits in zip(cells, normalized):
+        if not agent or not customer:
+            reason = 'Missing required agent_number or customer_number'
+        elif digits is None:
+            reason = 'Invalid Indian mobile number'
+        elif agent not in agent_numbers:
+            reason = 'Agent number not found in this organization'
+        else:
+            params.append((agent, digits, remarks, name, row_number))
+            continue
+        report.add_error(_row_error(row_number, agent, customer, name, remarks, reason))
+    return params
+
+
+def _flush(connection, cursor, company_id, insert_sql, batch, params, report) -> None:
+    first_row, last_row = batch[0][0], batch[-1][0]
+    result = {'batch': len(report.batches) + 1, 'first_row': first_row, 'last_row': last_row,
+              'rows': len(batch), 'inserted': 0}
+    t0 = time.perf_counter()
+    if params:
+        try:
+            # One explicit timestamp per batch, so the rollups bucket exactly what was inserted
+            cursor.execute("SELECT NOW()")
+            now = cursor.fetchone()[0]
+            cursor.executemany(insert_sql, [(agent, digits, now, remarks, name)
+                                            for agent, digits, remarks, name, _ in params])
+            upsert_customer_names(cursor, company_id, ((p[1], p[3]) for p in params))
+            # Leads have no duration; None keeps them out of timed_calls and the average
+            record_calls(cursor, company_id, ((p[0], p[1], 'Uploaded', now, None) for p in params))
+            connection.commit()
+            result['inserted'] = len(params)
+            report.inserted += len(params)
+        except Error as e:
+            connection.rollback()
+            result['error'] = str(e)
+            # Every row of the batch goes to the error report, so it can be corrected and re-sent
+            for agent, digits, remarks, name, row_number in params:
+                report.add_error(_row_error(row_number, agent, digits, name, remarks, f'Database error: {e}'))
+    result['elapsed_ms'] = round((time.perf_counter() - t0) * 1000.0, 1)
+    report.batches.append(result)
+
+
+def ingest_calls(connection, company_id: int, rows, fallback_agent_number: str = '',
+                 batch_size: int = INGEST_BATCH_SIZE, first_row_number: int = 1,
+                 report: IngestReport = None, on_batch=None) -> IngestReport:
+    """Insert uploaded call rows into the company's calls table as 'Uploaded' calls.
+
+    `rows` yields the header row first, then data rows, each a tuple of cell values;
+    `first_row_number` is the sheet row of the header (for error messages). Rows in
+    which every cell is empty are skipped; rows carrying a `reason` (unparseable
+    source lines) are reported as errors. `on_batch(report)` runs after each committed
+    batch; an exception it raises (e.g. a job cancellation) stops the ingest there.
+    """
+    if report is None:
+        report = IngestReport()
+    company_id = int(company_id)
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return report
+    columns = column_indices(header)
+    fallback_agent = (fallback_agent_number or '').strip()
+    insert_sql = (
+        f"INSERT INTO `{get_company_table_name('calls', company_id)}` "
+        "(agent_number, customer_number, duration, call_status, timestamp, remarks, name, remarks_status) "
+        "VALUES (%s, %s, 0, 'Uploaded', %s, %s, %s, '')"
+    )
+
+    cursor = connection.cursor(buffered=True)
+    try:
+        agent_numbers = load_agent_numbers(cursor, company_id)
+        batch = []
+        for row_number, row in enumerate(rows, start=first_row_number + 1):
+            reason = getattr(row, 'reason', None)
+            if reason is not None:
+                # The reader could not parse this row (see backend.ingest.formats.BadRow)
+                report.rows_read += 1
+                report.add_error(_row_error(row_number, '', row.raw, '', '', reason))
+                continue
+            if not row or all(v is None or v == '' for v in row):
+                continue
+            report.rows_read += 1
+            batch.append((row_number, row))
+            if len(batch) >= batch_size:
+                _flush(connection, cursor, company_id, insert_sql, batch,
+                       _prepare_batch(batch, columns, fallback_agent, agent_numbers, report), report)
+                batch = []
+                if on_batch is not None:
+                    on_batch(report)
+        if batch:
+            _flush(connection, cursor, company_id, insert_sql, batch,
+                   _prepare_batch(batch, columns, fallback_agent, agent_numbers, report), report)
+            if on_batch is not None:
+                on_batch(report)
+    finally:
+        cursor.close()
+    return report
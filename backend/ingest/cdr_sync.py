@@ -0,0 +1,306 @@
+"""Incremental sync of CDR rows from the Asterisk database into calls_<company_id>.
+
+Each run reads the CDR table in id order past the watermark stored in
+`cdr_sync_state`, a bounded batch at a time (`WHERE id > %s ORDER BY id LIMIT n`, a
+primary-key range read), so the CDR table is never scanned. A row goes to the
+company whose agent has the row's extension (resolved through login_directory) and
+is upserted on `calls_<id>.cdr_id`, so re-reading a row never duplicates it. The
+batch's writes and the advanced watermark commit in one transaction: a crash
+between batches resumes exactly where the last commit left off.
+
+Rows younger than CDR_SYNC['settle_seconds'] wait for the next run, so a CDR insert
+that commits after a higher id is not skipped. Rows whose extension belongs to no
+company (or to several) are counted in the checkpoint and passed over; after
+adding the agent, re-read them with --from-id.
+
+    python -m backend.ingest.cdr_sync [--once] [--from-id N] [--batch-size N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error, errorcode
+from backend.config import CDR_DB_CONFIG, CDR_SYNC
+from backend.db.agent_productivity import forget_days
+from backend.db.call_rollups import record_calls
+from backend.db.company_tables import get_company_table_name
+from backend.ingest.phones import normalize_mobile_batch
+
+SYNC_LOCK_NAME = 'call_center_cdr_sync'
+
+CREATE_SYNC_STATE = """
+    CREATE TABLE IF NOT EXISTS cdr_sync_state (
+        source VARCHAR(200) NOT NULL PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        last_timestamp DATETIME NULL,
+        synced_rows BIGINT NOT NULL DEFAULT 0,
+        unmapped_rows BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+_CALL_COLUMNS = ('agent_number', 'customer_number', 'duration', 'call_status', 'timestamp')
+
+
+def source_key(source_table: str = None) -> str:
+    """Checkpoint key of a CDR table: host/database.table."""
+    table = source_table or CDR_SYNC['source_table']
+    return f"{CDR_DB_CONFIG['host']}/{CDR_DB_CONFIG['database']}.{table}"
+
+
+def read_checkpoint(cursor, source: str) -> int:
+    """Last CDR id synced from `source` (0 before the first run)."""
+    cursor.execute("SELECT last_id FROM cdr_sync_state WHERE source = %s", (source,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def set_checkpoint(cursor, source: str, last_id: int, last_timestamp=None, synced: int = 0,
+                   unmapped: int = 0) -> None:
+    """Move the watermark and add to the counters. Does not commit."""
+    cursor.execute(
+        """
+        INSERT INTO cdr_sync_state (source, last_id, last_timestamp, synced_rows, unmapped_rows)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_id = VALUES(last_id),
+                                last_timestamp = COALESCE(VALUES(last_timestamp), last_timestamp),
+                                synced_rows = synced_rows + VALUES(synced_rows),
+                                unmapped_rows = unmapped_rows + VALUES(unmapped_rows)
+        """,
+        (source, int(last_id), last_timestamp, synced, unmapped)
+    )
+
+
+def fetch_batch(cdr_cursor, after_id: int, limit: int, source_table: str = None, columns: dict = None) -> list:
+    """Up to `limit` CDR rows with id > after_id, in id order, as
+    (id, agent_number, customer_number, duration, call_status, timestamp) tuples."""
+    columns = columns or CDR_SYNC['columns']
+    table = source_table or CDR_SYNC['source_table']
+    select = ', '.join(f"`{columns[c]}`" for c in ('id',) + _CALL_COLUMNS)
+    cdr_cursor.execute(
+        f"SELECT {select} FROM `{table}` WHERE `{columns['id']}` > %s ORDER BY `{columns['id']}` LIMIT %s",
+        (int(after_id), int(limit))
+    )
+    return cdr_cursor.fetchall()
+
+
+def tenant_map(cursor, extensions) -> tuple:
+    """(extension -> company_id, extensions claimed by more than one company)."""
+    extensions = sorted({str(e) for e in extensions})
+    if not extensions:
+        return {}, set()
+    cursor.execute(
+        f"SELECT login_id, company_id FROM login_directory "
+        f"WHERE login_id IN ({', '.join(['%s'] * len(extensions))})",
+        extensions
+    )
+    mapping, ambiguous = {}, set()
+    for login_id, company_id in cursor.fetchall():
+        if login_id in mapping:
+            ambiguous.add(login_id)
+        mapping[login_id] = int(company_id)
+    for login_id in ambiguous:
+        del mapping[login_id]
+    return mapping, ambiguous
+
+
+def _call_rows(rows) -> list:
+    """CDR tuples -> (cdr_id, agent_number, customer_number, duration, call_status, timestamp)."""
+    status_map = CDR_SYNC['status_map']
+    numbers = normalize_mobile_batch([r[2] for r in rows])
+    out = []
+    for (cdr_id, agent, customer, duration, status, ts), digits in zip(rows, numbers):
+        # Keep numbers that are not Indian mobiles (landlines, short codes) as dialled
+        customer = digits or ('' if customer is None else str(customer).strip()[:20])
+        status = status_map.get(str(status).upper(), status) if status is not None else None
+        out.append((int(cdr_id), str(agent).strip(), customer, duration, status, ts))
+    return out
+
+
+def upsert_calls(cursor, company_id: int, rows: list) -> None:
+    """Insert CDR calls into calls_<company_id>, updating the ones already synced. Does not commit."""
+    table = get_company_table_name('calls', int(company_id))
+    cursor.executemany(
+        f"""
+        INSERT INTO `{table}` (cdr_id, agent_number, customer_number, duration, call_status, timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE agent_number = VALUES(agent_number), customer_number = VALUES(customer_number),
+                                duration = VALUES(duration), call_status = VALUES(call_status),
+                                timestamp = VALUES(timestamp)
+        """,
+        rows
+    )
+
+
+def _synced_calls(cursor, company_id: int, cdr_ids: list) -> list:
+    """Current rollup-relevant values of calls already synced from these CDR ids."""
+    cursor.execute(
+        f"SELECT agent_number, customer_number, call_status, timestamp, duration "
+        f"FROM `{get_company_table_name('calls', int(company_id))}` "
+        f"WHERE cdr_id IN ({', '.join(['%s'] * len(cdr_ids))})",
+        cdr_ids
+    )
+    return cursor.fetchall()
+
+
+def apply_batch(connection, source: str, rows: list) -> dict:
+    """Write one batch of CDR rows to their companies and advance the watermark past
+    it, in one transaction. Returns per-batch counts."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        calls = _call_rows(rows)
+        mapping, ambiguous = tenant_map(cursor, (c[1] for c in calls))
+        by_company = {}
+        unmapped = 0
+        for call in calls:
+            company_id = mapping.get(call[1])
+            if company_id is None:
+                unmapped += 1
+            else:
+                by_company.setdefault(company_id, []).append(call)
+        synced = 0
+        for company_id, company_calls in by_company.items():
+            try:
+                # Re-read rows replace their earlier values in the rollups
+                previous = _synced_calls(cursor, company_id, [c[0] for c in company_calls])
+                upsert_calls(cursor, company_id, company_calls)
+                record_calls(cursor, company_id, previous, sign=-1)
+                record_calls(cursor, company_id, ((c[1], c[2], c[4], c[5], c[3]) for c in company_calls))
+                # Late CDR rows change closed days of the productivity report
+                forget_days(cursor, company_id, [(p[0], p[3].date()) for p in previous if p[3] is not None]
+                            + [(c[1], c[5].date()) for c in company_calls if c[5] is not None])
+                synced += len(company_calls)
+            except Error as e:
+                if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                # Company removed since its agents were listed; nothing to write to
+                unmapped += len(company_calls)
+        set_checkpoint(cursor, source, rows[-1][0], rows[-1][5], synced, unmapped)
+        connection.commit()
+        return {'rows': len(rows), 'synced': synced, 'unmapped': unmapped, 'ambiguous': sorted(ambiguous),
+                'companies': sorted(by_company), 'last_id': int(rows[-1][0])}
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def sync_once(connection, cdr_connection, batch_size: int = None, max_batches: int = None,
+              settle_seconds: int = None, source_table: str = None, columns: dict = None) -> dict:
+    """Run one bounded sync pass. Returns totals plus the per-batch results.
+
+    Stops at the first row younger than `settle_seconds` (measured on the CDR server's
+    clock), at a short batch, or after `max_batches`.
+    """
+    batch_size = batch_size or CDR_SYNC['batch_size']
+    max_batches = max_batches or CDR_SYNC['max_batches']
+    settle_seconds = CDR_SYNC['settle_seconds'] if settle_seconds is None else settle_seconds
+    source = source_key(source_table)
+    started = time.perf_counter()
+
+    cursor = connection.cursor(buffered=True)
+    try:
+        after_id = read_checkpoint(cursor, source)
+    finally:
+        cursor.close()
+
+    cdr_cursor = cdr_connection.cursor(buffered=True)
+    batches = []
+    try:
+        cdr_cursor.execute("SELECT NOW() - INTERVAL %s SECOND", (int(settle_seconds),))
+        settled_before = cdr_cursor.fetchone()[0]
+        while len(batches) < max_batches:
+            rows = fetch_batch(cdr_cursor, after_id, batch_size, source_table, columns)
+            full = len(rows) == batch_size
+            for i, row in enumerate(rows):
+                if row[5] is not None and row[5] > settled_before:
+                    rows, full = rows[:i], False
+                    break
+            if not rows:
+                break
+            result = apply_batch(connection, source, rows)
+            batches.append(result)
+            after_id = result['last_id']
+            if not full:
+                break
+    finally:
+        cdr_cursor.close()
+
+    return {
+        'source': source,
+        'last_id': after_id,
+        'rows': sum(b['rows'] for b in batches),
+        'synced': sum(b['synced'] for b in batches),
+        'unmapped': sum(b['unmapped'] for b in batches),
+        'batches': batches,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 1),
+    }
+
+
+def _acquire_lock(connection) -> bool:
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (SYNC_LOCK_NAME,))
+        return cursor.fetchone()[0] == 1
+    finally:
+        cursor.close()
+
+
+def _release_lock(connection) -> None:
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (SYNC_LOCK_NAME,))
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Sync new CDR rows into the per-company calls tables')
+    ap.add_argument('--once', action='store_true', help='run a single pass instead of looping')
+    ap.add_argument('--from-id', type=int, help='move the watermark to this CDR id first (re-reads later rows)')
+    ap.add_argument('--batch-size', type=int, default=CDR_SYNC['batch_size'])
+    ap.add_argument('--max-batches', type=int, default=CDR_SYNC['max_batches'])
+    ap.add_argument('--interval', type=float, default=CDR_SYNC['interval'], help='seconds between passes')
+    args = ap.parse_args()
+
+    from backend.db.connection import get_cdr_db_connection, get_db_connection
+    while True:
+        connection = get_db_connection()
+        cdr_connection = get_cdr_db_connection()
+        try:
+            if connection is None or cdr_connection is None:
+                print('CDR sync: database connection failed')
+            elif not _acquire_lock(connection):
+                print('CDR sync: another sync is running; skipping this pass')
+            else:
+                try:
+                    if args.from_id is not None:
+                        cursor = connection.cursor()
+                        set_checkpoint(cursor, source_key(), args.from_id)
+                        connection.commit()
+                        cursor.close()
+                        args.from_id = None
+                    result = sync_once(connection, cdr_connection, args.batch_size, args.max_batches)
+                    print(f"CDR sync: {result['rows']} rows read, {result['synced']} synced, "
+                          f"{result['unmapped']} unmapped, watermark {result['last_id']} "
+                          f"({result['elapsed_ms']} ms)")
+                finally:
+                    _release_lock(connection)
+        except Error as e:
+            print(f"CDR sync failed: {e}")
+        finally:
+            if cdr_connection is not None:
+                cdr_connection.close()
+            if connection is not None:
+                connection.close()
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Corrected call rows re-submitted from the upload error report (/api/calls/upload-corrections).
+
+The payload is handled as a set: every row is validated and normalized up front,
+duplicate (agent_number, customer_number) pairs are collapsed, and the survivors are
+written with one executemany per chunk, each chunk its own transaction. With
+`upsert=True` a correction replaces the name/remarks of the pair's existing
+'Uploaded' call instead of adding a second one; on a call that already has a remark
+history the remark is appended to it instead (see backend.db.call_remarks). A blank
+name or remark in a correction keeps the call's current value.
+"""
+import time
+from mysql.connector import Error
+from backend.db.company_tables import get_company_table_name
+from backend.db.call_remarks import record_remark
+from backend.db.call_rollups import record_calls
+from backend.db.customers import upsert_customer_names
+from backend.ingest.phones import normalize_mobile_batch
+
+CORRECTIONS_CHUNK_SIZE = 500  # rows per executemany and per transaction
+FIRST_ROW_NUMBER = 2  # rows are numbered like the sheet they were corrected from
+
+
+def _text(item, key) -> str:
+    value = item.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _error(row_number, agent_number, customer_number, name, remarks, reason) -> dict:
+    return {
+        'row': row_number,
+        'agent_number': agent_number,
+        'customer_number': customer_number,
+        'name': name,
+        'remarks': remarks,
+        'reason': reason,
+    }
+
+
+def validate_corrections(rows: list):
+    """Validate and deduplicate a whole payload before anything is written.
+
+    Returns (accepted, errors, duplicates). `accepted` holds one
+    (row_number, agent_number, digits, name, remarks) tuple per distinct pair, in
+    payload order; later rows repeating a pair are reported as errors pointing at
+    the row that was kept.
+    """
+    items = []
+    errors = []
+    for row_number, item in enumerate(rows, start=FIRST_ROW_NUMBER):
+        if not isinstance(item, dict):
+            errors.append(_error(row_number, '', '', '', '', 'Row must be a JSON object'))
+            continue
+        items.append((row_number, _text(item, 'agent_number'), _text(item, 'customer_number'),
+                      _text(item, 'name'), _text(item, 'remarks')))
+
+    normalized = normalize_mobile_batch([i[2] for i in items])
+    accepted = []
+    first_seen = {}
+    duplicates = 0
+    for (row_number, agent, customer, name, remarks), digits in zip(items, normalized):
+        if not agent or not customer:
+            reason = 'Missing required agent_number or customer_number'
+        elif digits is None:
+            reason = 'Invalid Indian mobile number'
+        elif (agent, digits) in first_seen:
+            duplicates += 1
+            reason = f'Duplicate of row {first_seen[(agent, digits)]} (same agent and customer number)'
+        else:
+            first_seen[(agent, digits)] = row_number
+            accepted.append((row_number, agent, digits, name, remarks))
+            continue
+        errors.append(_error(row_number, agent, customer, name, remarks, reason))
+    errors.sort(key=lambda e: e['row'])
+    return accepted, errors, duplicates
+
+
+def _existing_upload_ids(cursor, calls_table, chunk) -> dict:
+    """(agent_number, customer_number) -> id of the newest 'Uploaded' call for each pair in chunk."""
+    agents = sorted({c[1] for c in chunk})
+    customers = sorted({c[2] for c in chunk})
+    cursor.execute(
+        f"SELECT agent_number, customer_number, MAX(id) FROM `{calls_table}` "
+        f"WHERE call_status = 'Uploaded' "
+        f"AND agent_number IN ({', '.join(['%s'] * len(agents))}) "
+        f"AND customer_number IN ({', '.join(['%s'] * len(customers))}) "
+        "GROUP BY agent_number, customer_number",
+        agents + customers,
+    )
+    return {(a, c): call_id for a, c, call_id in cursor.fetchall()}
+
+
+def _calls_with_history(cursor, calls_table, call_ids) -> dict:
+    """id -> calls row for those of `call_ids` that already have remark history."""
+    if not call_ids:
+        return {}
+    cursor.execute(
+        f"SELECT id, timestamp, remarks, remarks_status, remarks_count FROM `{calls_table}` "
+        f"WHERE id IN ({', '.join(['%s'] * len(call_ids))}) AND remarks_count > 0",
+        list(call_ids),
+    )
+    columns = ('id', 'timestamp', 'remarks', 'remarks_status', 'remarks_count')
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+def _append_remarks(cursor, company_id, calls_table, history, params) -> list:
+    """Write corrections of calls in `history` through their remark history, so the row
+    keeps holding the latest entry. Returns the params left for the plain upsert."""
+    rest, updates = [], []
+    for p in params:
+        call = history.get(p[0])
+        if call is None:
+            rest.append(p)
+            continue
+        remark, name = p[4], p[5]
+        added, latest = 0, call['remarks'] or ''
+        if remark:
+            result = record_remark(cursor, company_id, call, remark, None)
+            added, latest = result['added'], result['remarks']
+        updates.append((latest, added, name, name, p[0]))
+    if updates:
+        cursor.executemany(
+            f"UPDATE `{calls_table}` SET remarks = %s, remarks_count = remarks_count + %s, "
+            f"name = IF(%s = '', name, %s) WHERE id = %s",
+            updates
+        )
+    return rest
+
+
+def apply_corrections(connection, company_id: int, rows: list, upsert: bool = False,
+                      chunk_size: int = CORRECTIONS_CHUNK_SIZE, on_chunk=None) -> dict:
+    """Insert (or with `upsert`, update) corrected rows as 'Uploaded' calls.
+
+    Each item must include: agent_number, customer_number, name, remarks. Returns the
+    response body: counts plus one error entry per rejected row, per-chunk results
+    and phase timings in milliseconds. A failing chunk is rolled back and its rows
+    are reported; the other chunks still commit.
+
+    `on_chunk(done)` runs after each chunk with the number of payload rows handled so
+    far. An exception it raises stops the run; the chunks committed before it stay,
+    and the exception carries their response body as `result`.
+    """
+    started = time.perf_counter()
+    accepted, errors, duplicates = validate_corrections(rows)
+    validated = time.perf_counter()
+
+    calls_table = get_company_table_name('calls', int(company_id))
+    columns = ('agent_number, customer_number, duration, call_status, timestamp, '
+               'remarks, name, remarks_status')
+    if upsert:
+        insert_sql = (
+            f"INSERT INTO `{calls_table}` (id, {columns}) "
+            "VALUES (%s, %s, %s, 0, 'Uploaded', %s, %s, %s, '') "
+            "ON DUPLICATE KEY UPDATE remarks = IF(VALUES(remarks) = '', remarks, VALUES(remarks)), "
+            "name = IF(VALUES(name) = '', name, VALUES(name))"
+        )
+    else:
+        insert_sql = (
+            f"INSERT INTO `{calls_table}` ({columns}) "
+            "VALUES (%s, %s, 0, 'Uploaded', %s, %s, %s, '')"
+        )
+
+    inserted = updated = 0
+    chunks = []
+    lookup_ms = 0.0
+
+    def summary():
+        finished = time.perf_counter()
+        success = inserted + updated
+        return {
+            'message': f'Processed corrections: {success} success, {len(errors)} errors',
+            'success_count': success,
+            'error_count': len(errors),
+            'errors': errors,
+            'inserted': inserted,
+            'updated': updated,
+            'duplicates': duplicates,
+            'chunks': chunks,
+            'timings': {
+                'validate_ms': round((validated - started) * 1000.0, 1),
+                'lookup_ms': round(lookup_ms, 1),
+                'write_ms': round((finished - validated) * 1000.0 - lookup_ms, 1),
+                'total_ms': round((finished - started) * 1000.0, 1),
+            },
+        }
+
+    rejected = len(rows) - len(accepted)
+    cursor = connection.cursor(buffered=True)
+    try:
+        for start in range(0, len(accepted), chunk_size):
+            chunk = accepted[start:start + chunk_size]
+            result = {'chunk': len(chunks) + 1, 'first_row': chunk[0][0], 'last_row': chunk[-1][0],
+                      'rows': len(chunk), 'inserted': 0, 'updated': 0}
+            t0 = time.perf_counter()
+            try:
+                cursor.execute("SELECT NOW()")
+                now = cursor.fetchone()[0]
+                if upsert:
+                    existing = _existing_upload_ids(cursor, calls_table, chunk)
+                    lookup_ms += (time.perf_counter() - t0) * 1000.0
+                    params = [(existing.get((agent, digits)), agent, digits, now, remarks, name)
+                              for _, agent, digits, name, remarks in chunk]
+                else:
+                    params = [(None, agent, digits, now, remarks, name) for _, agent, digits, name, remarks in chunk]
+                matched = sum(1 for p in params if p[0] is not None)
+                if upsert:
+                    history = _calls_with_history(cursor, calls_table, [p[0] for p in params if p[0] is not None])
+                    upserts = _append_remarks(cursor, company_id, calls_table, history, params)
+                    if upserts:
+                        cursor.executemany(insert_sql, upserts)
+                else:
+                    cursor.executemany(insert_sql, [p[1:] for p in params])
+                upsert_customer_names(cursor, company_id, ((digits, name) for _, _, digits, name, _ in chunk))
+                # Updated calls keep their status, time and duration; only new ones count.
+                # Leads have no duration, so they stay out of timed_calls.
+                record_calls(cursor, company_id,
+                             ((p[1], p[2], 'Uploaded', now, None) for p in params if p[0] is None))
+                connection.commit()
+                result['inserted'], result['updated'] = len(chunk) - matched, matched
+                inserted += len(chunk) - matched
+                updated += matched
+            except Error as e:
+                connection.rollback()
+                result['error'] = str(e)
+                errors.extend(_error(row_number, agent, digits, name, remarks, f'Database error: {e}')
+                              for row_number, agent, digits, name, remarks in chunk)
+            result['elapsed_ms'] = round((time.perf_counter() - t0) * 1000.0, 1)
+            chunks.append(result)
+            if on_chunk is not None:
+                try:
+                    on_chunk(rejected + start + len(chunk))
+                except Exception as e:
+                    e.result = summary()
+                    raise
+    finally:
+        cursor.close()
+    return summary()
@@ -0,0 +1,125 @@
+"""Streaming row readers for the bulk call upload formats.
+
+Every reader yields the header row first, then one tuple of cell values per data
+row, which is what backend.ingest.calls.ingest_calls consumes. Nothing is read
+ahead beyond the decompressor's and csv module's buffers.
+
+    .xlsx                     openpyxl read-only mode
+    .csv / .tsv               csv module (UTF-8, BOM tolerated)
+    .ndjson / .jsonl          one JSON object per line
+    any of the last two + .gz gzip-compressed, decompressed on the fly
+"""
+import csv
+import gzip
+import io
+import json
+from backend.ingest.calls import read_xlsx_rows
+
+GZIP_MAGIC = b'\x1f\x8b'
+NDJSON_COLUMNS = ('agent_number', 'customer_number', 'name', 'remarks')
+# Bytes of a malformed NDJSON line echoed back in the error report
+BAD_LINE_PREVIEW = 200
+
+_EXTENSIONS = {
+    '.xlsx': 'xlsx',
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.tab': 'tsv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+class BadRow(tuple):
+    """A source row that could not be parsed; ingest reports it with `reason`."""
+
+    def __new__(cls, raw, reason):
+        row = super().__new__(cls, ())
+        row.raw = raw
+        row.reason = reason
+        return row
+
+
+def detect_format(filename: str):
+    """Return (format, gzipped) for an upload's file name, e.g. ('csv', True) for x.csv.gz."""
+    name = (filename or '').lower()
+    gzipped = name.endswith('.gz')
+    if gzipped:
+        name = name[:-3]
+    for ext, fmt in _EXTENSIONS.items():
+        if name.endswith(ext):
+            if gzipped and fmt == 'xlsx':
+                raise UnsupportedFormat('.xlsx files are already compressed; upload them without .gz')
+            return fmt, gzipped
+    raise UnsupportedFormat('Please upload an .xlsx, .csv, .tsv or .ndjson file (optionally .gz)')
+
+
+def _binary(stream, gzipped):
+    if gzipped:
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    return stream
+
+
+def _text(stream):
+    # utf-8-sig drops the BOM Excel puts on "CSV UTF-8" exports
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def read_delimited_rows(stream, delimiter=','):
+    yield from csv.reader(_text(stream), delimiter=delimiter)
+
+
+def read_ndjson_rows(stream):
+    """Header NDJSON_COLUMNS, then one tuple per object line ('customer' is accepted
+    for 'customer_number'). Blank lines are skipped; malformed ones become BadRow."""
+    yield NDJSON_COLUMNS
+    for raw in stream:
+        line = raw.decode('utf-8', 'replace').strip()
+        if not line:
+            yield ()
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield BadRow(line[:BAD_LINE_PREVIEW], 'Malformed JSON line')
+            continue
+        if not isinstance(obj, dict):
+            yield BadRow(line[:BAD_LINE_PREVIEW], 'Line is not a JSON object')
+            continue
+        customer = obj.get('customer_number')
+        if customer is None:
+            customer = obj.get('customer')
+        yield (obj.get('agent_number'), customer, obj.get('name'), obj.get('remarks'))
+
+
+def open_rows(stream, fmt: str, gzipped: bool = False):
+    """Return (rows, header_row_number) for a binary upload stream in the given format.
+
+    `rows` yields the header first; header_row_number is what error reports count it
+    as (row 1 for sheets and CSV; 0 for NDJSON, whose header is implied, so data rows
+    are reported by line number).
+    """
+    if fmt == 'xlsx':
+        return read_xlsx_rows(stream), 1
+    if not gzipped and stream.seekable():
+        gzipped = looks_gzipped(stream)
+    stream = _binary(stream, gzipped)
+    if fmt == 'csv':
+        return read_delimited_rows(stream, ','), 1
+    if fmt == 'tsv':
+        return read_delimited_rows(stream, '\t'), 1
+    if fmt == 'ndjson':
+        return read_ndjson_rows(stream), 0
+    raise UnsupportedFormat(f'Unsupported upload format: {fmt}')
+
+
+def looks_gzipped(stream) -> bool:
+    """Peek at a seekable stream for the gzip magic number."""
+    pos = stream.tell()
+    head = stream.read(2)
+    stream.seek(pos)
+    return head == GZIP_MAGIC
@@ -0,0 +1,70 @@
+import re
+
+_NON_DIGITS = re.compile(r'\D')
+# Every byte except ASCII digits and newline, for bytes.translate deletion
+_NON_DIGIT_BYTES = bytes(c for c in range(256) if not (48 <= c <= 57 or c == 10))
+_VALID_FIRST_DIGITS = frozenset('6789')
+
+
+# Helpers to normalize and validate Indian mobile numbers
+def normalize_indian_mobile(raw: str) -> str:
+    """Return a 10-digit Indian mobile number by removing optional prefixes and non-digits.
+    Accepts formats like +91XXXXXXXXXX, 0XXXXXXXXXX, 91XXXXXXXXXX, and plain 10 digits.
+    """
+    if raw is None:
+        return ''
+    digits = _NON_DIGITS.sub('', str(raw))
+    # Strip leading 0 (0 + 10 digits)
+    if len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    # Strip country code 91 (91 + 10 digits)
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    return digits
+
+
+def is_valid_indian_mobile(ten_digits: str) -> bool:
+    """Basic validation: exactly 10 digits and starts with 6/7/8/9."""
+    return len(ten_digits) == 10 and ten_digits[0] in ('6', '7', '8', '9') and ten_digits.isdigit()
+
+
+def normalize_mobile_batch(values) -> list:
+    """Normalize and validate a whole column of raw numbers at once.
+
+    Returns one entry per input: the 10-digit number, or None when it is not a valid
+    Indian mobile (same rules as normalize_indian_mobile + is_valid_indian_mobile).
+    The column is joined into one buffer and stripped of non-digits in a single
+    bytes.translate pass, so the per-value work left in Python is a length check.
+    """
+    texts = [v if isinstance(v, str) else ('' if v is None else str(v)) for v in values]
+    if not texts:
+        return []
+    joined = '\n'.join(texts)
+    if joined.count('\n') != len(texts) - 1:
+        # A value contains a newline itself; fall back to one value at a time
+        return [_normalize_one(t) for t in texts]
+    digits = joined.encode('utf-8', 'surrogatepass').translate(None, _NON_DIGIT_BYTES).decode('ascii')
+    first_ok = _VALID_FIRST_DIGITS
+    out = []
+    append = out.append
+    for d in digits.split('\n'):
+        n = len(d)
+        if n == 10:
+            append(d if d[0] in first_ok else None)
+        elif n == 11 and d[0] == '0' and d[1] in first_ok:
+            append(d[1:])
+        elif n == 12 and d[0] == '9' and d[1] == '1' and d[2] in first_ok:
+            append(d[2:])
+        else:
+            append(None)
+    if not joined.isascii():
+        # \D keeps non-ASCII digits (e.g. Devanagari); redo just those values the scalar way
+        for i, t in enumerate(texts):
+            if not t.isascii():
+                out[i] = _normalize_one(t)
+    return out
+
+
+def _normalize_one(raw):
+    digits = normalize_indian_mobile(raw)
+    return digits if is_valid_indian_mobile(digits) else None
@@ -0,0 +1,95 @@
+"""What each job kind does. A handler receives (connection, job, progress) and returns
+the result dict stored on the job; `progress(done, total)` records progress and raises
+JobCancelled when the job should stop."""
+import csv
+import json
+from openpyxl import load_workbook
+from backend.ingest.calls import IngestReport, ingest_calls
+from backend.ingest.formats import open_rows
+from backend.ingest.corrections import apply_corrections
+from backend.jobs.queue import JobCancelled, error_report_path, input_path
+
+ERROR_REPORT_FIELDS = ('row', 'agent_number', 'customer_number', 'name', 'remarks', 'reason')
+
+
+class ErrorReportWriter:
+    """Appends row errors to the job's CSV error report, creating it on first use."""
+
+    def __init__(self, job_id):
+        self.path = error_report_path(job_id)
+        self._fh = None
+        self._writer = None
+
+    def __call__(self, error: dict) -> None:
+        if self._writer is None:
+            self._fh = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._fh, fieldnames=ERROR_REPORT_FIELDS, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(error)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+
+
+def _xlsx_row_estimate(path):
+    """Data rows declared by the sheet's dimension record (None if the writer omitted it)."""
+    # Pass a file object: openpyxl rejects paths without an Excel extension
+    with open(path, 'rb') as fh:
+        wb = load_workbook(fh, read_only=True)
+        try:
+            max_row = wb.active.max_row
+            return max_row - 1 if max_row else None
+        finally:
+            wb.close()
+
+
+def run_calls_upload(connection, job, progress) -> dict:
+    payload = json.loads(job['payload'] or '{}')
+    fmt = payload.get('format', 'xlsx')
+    path = input_path(job['id'])
+    total = _xlsx_row_estimate(path) if fmt == 'xlsx' else None
+    errors = ErrorReportWriter(job['id'])
+    report = IngestReport(error_sink=errors)
+    progress(0, total)
+    try:
+        with open(path, 'rb') as fh:
+            rows, header_row = open_rows(fh, fmt, payload.get('gzip', False))
+            ingest_calls(connection, job['company_id'], rows, payload.get('agent_number', ''),
+                         first_row_number=header_row, report=report,
+                         on_batch=lambda r: progress(r.rows_read, total))
+    except JobCancelled as e:
+        # Batches committed before the cancellation stay; report them
+        e.result = report.to_dict()
+        raise
+    finally:
+        errors.close()
+    return report.to_dict()
+
+
+def run_calls_corrections(connection, job, progress) -> dict:
+    with open(input_path(job['id']), 'rb') as fh:
+        data = json.load(fh)
+    rows = data.get('rows', [])
+    progress(0, len(rows))
+    errors = ErrorReportWriter(job['id'])
+    try:
+        result = apply_corrections(connection, job['company_id'], rows, upsert=bool(data.get('upsert')),
+                                   on_chunk=lambda done: progress(done, len(rows)))
+    except JobCancelled as e:
+        # Chunks committed before the cancellation stay; report them
+        for error in e.result['errors']:
+            errors(error)
+        raise
+    else:
+        for error in result['errors']:
+            errors(error)
+    finally:
+        errors.close()
+    return result
+
+
+HANDLERS = {
+    'calls_upload': run_calls_upload,
+    'calls_corrections': run_calls_corrections,
+}
@@ -0,0 +1,275 @@
+"""MySQL-backed job queue for work too slow to run inside a request.
+
+A job is a row in `jobs` plus files under JOBS['work_dir']: `<id>.input` (the upload
+the job consumes) and `<id>.errors.csv` (the full row-level error report). Web
+handlers `submit_job` and return 202; `backend.jobs.worker` processes claim queued
+jobs, report progress through `heartbeat`, and record the outcome with `finish_job`.
+"""
+import json
+import os
+import time
+import uuid
+from backend.config import JOBS
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+CLAIM_LOCK_NAME = 'call_center_jobs_claim'
+
+_JOB_COLUMNS = (
+    "id, company_id, kind, status, payload, progress_done, progress_total, result, error, "
+    "cancel_requested, worker_id, created_by, created_at, started_at, heartbeat_at, finished_at"
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested."""
+
+
+def _work_dir() -> str:
+    os.makedirs(JOBS['work_dir'], exist_ok=True)
+    return JOBS['work_dir']
+
+
+def input_path(job_id: str) -> str:
+    return os.path.join(_work_dir(), f"{uuid.UUID(job_id).hex}.input")
+
+
+def error_report_path(job_id: str) -> str:
+    return os.path.join(_work_dir(), f"{uuid.UUID(job_id).hex}.errors.csv")
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def job_to_dict(row: dict) -> dict:
+    """Public representation of a job row (as returned by GET /api/jobs/<id>)."""
+    payload = json.loads(row['payload']) if row.get('payload') else {}
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'filename': payload.get('filename'),
+        'progress': {'done': row['progress_done'], 'total': row['progress_total']},
+        'result': json.loads(row['result']) if row.get('result') else None,
+        'error': row.get('error'),
+        'cancel_requested': bool(row.get('cancel_requested')),
+        'has_error_report': os.path.exists(error_report_path(row['id'])),
+        'created_at': _iso(row.get('created_at')),
+        'started_at': _iso(row.get('started_at')),
+        'finished_at': _iso(row.get('finished_at')),
+    }
+
+
+def submit_job(connection, company_id: int, kind: str, payload: dict = None,
+               upload=None, data: bytes = None, created_by=None) -> dict:
+    """Queue a job and return its row. The input is saved first so a worker that
+    claims the job always finds it: `upload` is a werkzeug FileStorage (streamed to
+    disk), `data` raw bytes."""
+    job_id = uuid.uuid4().hex
+    path = input_path(job_id)
+    if upload is not None:
+        upload.save(path)
+    elif data is not None:
+        with open(path, 'wb') as fh:
+            fh.write(data)
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            "INSERT INTO jobs (id, company_id, kind, payload, created_by) VALUES (%s, %s, %s, %s, %s)",
+            (job_id, int(company_id), kind, json.dumps(payload or {}), created_by)
+        )
+        connection.commit()
+    except Exception:
+        _remove(path)
+        raise
+    finally:
+        cursor.close()
+    return get_job(connection, job_id)
+
+
+def get_job(connection, job_id: str, company_id: int = None):
+    """Job row as a dict, or None. With `company_id`, other tenants' jobs are invisible."""
+    try:
+        job_id = uuid.UUID(str(job_id)).hex
+    except ValueError:
+        return None
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        if company_id is None:
+            cursor.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,))
+        else:
+            cursor.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s AND company_id = %s",
+                           (job_id, int(company_id)))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def list_jobs(connection, company_id: int, limit: int = 20) -> list:
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE company_id = %s ORDER BY created_at DESC LIMIT %s",
+            (int(company_id), int(limit))
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def cancel_job(connection, job_id: str, company_id: int):
+    """Cancel a job: queued jobs stop at once, running ones at their next checkpoint.
+
+    Returns the updated row, or None if the job does not exist for this company.
+    """
+    job = get_job(connection, job_id, company_id)
+    if job is None or job['status'] in FINISHED_STATUSES:
+        return job
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            """
+            UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = NOW()
+            WHERE id = %s AND status = 'queued'
+            """,
+            (job['id'],)
+        )
+        # A worker may have claimed the job since get_job; only a job cancelled while
+        # still queued has an input file nobody is reading
+        cancelled_queued = cursor.rowcount > 0
+        if not cancelled_queued:
+            cursor.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = %s AND status = 'running'", (job['id'],))
+        connection.commit()
+    finally:
+        cursor.close()
+    if cancelled_queued:
+        _remove(input_path(job['id']))
+    return get_job(connection, job['id'], company_id)
+
+
+def claim_next_job(connection, worker_id: str):
+    """Atomically move the oldest eligible queued job to 'running' and return it.
+
+    A job is eligible while its company has fewer than JOBS['per_company_limit'] jobs
+    running. Claims are serialised with a MySQL advisory lock so concurrent workers
+    cannot both take a company's last free slot.
+    """
+    cursor = connection.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 5) AS locked", (CLAIM_LOCK_NAME,))
+        if cursor.fetchone()['locked'] != 1:
+            return None
+        try:
+            cursor.execute(
+                """
+                SELECT j.id FROM jobs j
+                WHERE j.status = 'queued'
+                  AND (SELECT COUNT(*) FROM jobs r
+                       WHERE r.company_id = j.company_id AND r.status = 'running') < %s
+                ORDER BY j.created_at, j.id
+                LIMIT 1
+                """,
+                (JOBS['per_company_limit'],)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                connection.commit()
+                return None
+            cursor.execute(
+                """
+                UPDATE jobs SET status = 'running', worker_id = %s, started_at = NOW(), heartbeat_at = NOW()
+                WHERE id = %s AND status = 'queued'
+                """,
+                (worker_id, row['id'])
+            )
+            claimed = cursor.rowcount == 1
+            connection.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (CLAIM_LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+    return get_job(connection, row['id']) if claimed else None
+
+
+def heartbeat(connection, job_id: str, done: int, total: int = None) -> None:
+    """Record progress and liveness; raises JobCancelled if cancellation was requested."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            """
+            UPDATE jobs SET progress_done = %s, progress_total = COALESCE(%s, progress_total), heartbeat_at = NOW()
+            WHERE id = %s
+            """,
+            (int(done), total, job_id)
+        )
+        cursor.execute("SELECT cancel_requested FROM jobs WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+        connection.commit()
+    finally:
+        cursor.close()
+    if row and row[0]:
+        raise JobCancelled()
+
+
+def finish_job(connection, job_id: str, status: str, result: dict = None, error: str = None) -> None:
+    if status not in FINISHED_STATUSES:
+        raise ValueError(f"Invalid final job status: {status}")
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            """
+            UPDATE jobs SET status = %s, result = %s, error = %s, finished_at = NOW(), heartbeat_at = NOW()
+            WHERE id = %s
+            """,
+            (status, json.dumps(result, default=str) if result is not None else None, error, job_id)
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+    _remove(input_path(job_id))
+
+
+def fail_stale_jobs(connection) -> int:
+    """Mark running jobs whose worker stopped sending heartbeats as failed.
+
+    They are not retried: batches already committed would be inserted twice.
+    """
+    cursor = connection.cursor(buffered=True)
+    try:
+        cursor.execute(
+            """
+            UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = NOW()
+            WHERE status = 'running' AND heartbeat_at < NOW() - INTERVAL %s SECOND
+            """,
+            (int(JOBS['heartbeat_timeout']),)
+        )
+        count = cursor.rowcount
+        connection.commit()
+        return count
+    finally:
+        cursor.close()
+
+
+def purge_old_files() -> int:
+    """Delete job input files and error reports older than JOBS['retention']."""
+    removed = 0
+    cutoff = time.time() - JOBS['retention']
+    directory = _work_dir()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,117 @@
+"""Worker pool for background jobs.
+
+    python -m backend.jobs.worker [--workers N]
+
+Starts N worker processes (JOBS['workers'] by default). Each one claims a queued job,
+runs it with its own database connections and records the outcome; idle workers
+poll every JOBS['poll_interval'] seconds. SIGINT/SIGTERM let running jobs finish
+before the processes exit. Run it alongside the web server (e.g. as a systemd unit).
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from mysql.connector import Error
+from backend.config import JOBS
+from backend.db.connection import db_connection
+from backend.jobs.handlers import HANDLERS
+from backend.jobs.queue import (
+    JobCancelled, claim_next_job, fail_stale_jobs, finish_job, heartbeat, purge_old_files,
+)
+from backend.storage.uploads import purge_stale_uploads
+
+MAINTENANCE_INTERVAL = 60  # seconds between stale-job sweeps, file purges and upload purges
+
+
+def execute_job(job) -> str:
+    """Run one claimed job to completion and return its final status."""
+    handler = HANDLERS.get(job['kind'])
+    if handler is None:
+        with db_connection() as connection:
+            finish_job(connection, job['id'], 'failed', error=f"Unknown job kind: {job['kind']}")
+        return 'failed'
+
+    def progress(done, total=None):
+        with db_connection() as status_connection:
+            heartbeat(status_connection, job['id'], done, total)
+
+    status, result, error = 'succeeded', None, None
+    try:
+        # Data writes use their own connection so progress commits never touch them
+        with db_connection() as connection:
+            result = handler(connection, job, progress)
+    except JobCancelled as e:
+        status, result = 'cancelled', getattr(e, 'result', None)
+    except Exception as e:
+        traceback.print_exc()
+        status, error = 'failed', str(e)
+    with db_connection() as connection:
+        finish_job(connection, job['id'], status, result=result, error=error)
+    return status
+
+
+def run_worker(worker_id: str, stop) -> None:
+    last_maintenance = 0.0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL:
+                last_maintenance = time.monotonic()
+                with db_connection() as connection:
+                    if fail_stale_jobs(connection):
+                        print(f"[{worker_id}] marked stale jobs as failed")
+                purge_old_files()
+                try:
+                    if purge_stale_uploads():
+                        print(f"[{worker_id}] purged stale recording uploads")
+                except OSError as e:
+                    print(f"[{worker_id}] recording upload purge failed: {e}")
+            with db_connection() as connection:
+                job = claim_next_job(connection, worker_id)
+        except Error as e:
+            print(f"[{worker_id}] database error: {e}")
+            job = None
+        if job is None:
+            stop.wait(JOBS['poll_interval'])
+            continue
+        print(f"[{worker_id}] job {job['id']} ({job['kind']}, company {job['company_id']}) started")
+        status = execute_job(job)
+        print(f"[{worker_id}] job {job['id']} {status}")
+
+
+def _worker_main(index, stop):
+    # The parent handles signals and sets `stop`; children just finish their job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}", stop)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Run background job workers')
+    ap.add_argument('--workers', type=int, default=JOBS['workers'])
+    args = ap.parse_args()
+
+    stop = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=_worker_main, args=(i, stop), daemon=False)
+                 for i in range(max(1, args.workers))]
+    for p in processes:
+        p.start()
+    print(f"Started {len(processes)} job workers")
+
+    def shutdown(signum, frame):
+        print("Stopping job workers after their current jobs...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    for p in processes:
+        p.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify ,current_app
+from flask import Blueprint, request, jsonify
 from backend.db.connection import get_db_connection
 from backend.db.company_tables import get_company_table_name
-from backend.auth.jwt_utils import token_required
+from backend.db.tenant_cache import is_company_blocked
+from backend.db.login_directory import sync_login
+from backend.db.break_history import (
+    DEFAULT_PAGE_DAYS, MAX_PAGE_DAYS, SEARCH_MODES, day_aggregates, latest_open_break, list_breaks, page_days,
+    search_agents,
+)
+from backend.db.agent_productivity import forget_span
+from backend.db.agent_state import agent_status, current_status_sql, record_break, record_break_closed
+from backend.auth.jwt_utils import token_required, current_auth
+from backend.events.bus import publish
 from mysql.connector import Error, errorcode
-from datetime import datetime
-from backend.db.company_tables import ensure_agents_mapping_index
+from datetime import datetime, timedelta
 import re
 
 agents_bp = Blueprint('agents', __name__)
@@ -18,24 +26,13 @@ def get_agents(current_user_id):
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
         # Company isolation
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        company_id = data.get('company_id')
+        auth = current_auth()
+        role = auth.role
+        company_id = auth.company_id
         cursor = connection.cursor(dictionary=True)
         if role in ('admin', 'agent') and company_id:
             # Deny access if company is disabled or unpaid
-            st = connection.cursor(dictionary=True)
-            st.execute("SELECT status, payment_status FROM companies WHERE id = %s", (company_id,))
-            row = st.fetchone()
-            if row and (row.get('status') == 'Fully Close' or row.get('payment_status') == 'Unpaid'):
+            if is_company_blocked(connection, company_id):
                 return jsonify({'message': 'Access disabled for this company'}), 403
             table = get_company_table_name('agents', int(company_id))
             cursor.execute(f"SELECT id, agent_number, name, email, password, status, is_admin FROM `{table}` ORDER BY agent_number")
@@ -57,17 +54,9 @@ def add_agent(current_user_id):
     # ... (move the full add_agent logic here from app.py)
     try:
         # Check admin
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        company_id = data.get('company_id')
+        auth = current_auth()
+        role = auth.role
+        company_id = auth.company_id
         if role != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
         
@@ -89,15 +78,6 @@ def add_agent(current_user_id):
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor()
-        # Attach company_id to the created agent (scopes to logged-in admin's company)
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agents' AND COLUMN_NAME = 'company_id'
-            """)
-            has_company = cursor.fetchone()[0] > 0
-        except Exception:
-            has_company = False
         # Insert into per-company table first
         table = get_company_table_name('agents', int(company_id))
         cursor.execute(
@@ -107,6 +87,7 @@ def add_agent(current_user_id):
             """,
             (agent_number, name, email, password, status, is_admin)
         )
+        sync_login(cursor, int(company_id), agent_number)
 
         # Do not write to shared 'agents' mapping to avoid index conflicts
         connection.commit()
@@ -142,18 +123,10 @@ def add_agent(current_user_id):
 def edit_agent(current_user_id, agent_number):
     try:
         # Auth context
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        company_id = data.get('company_id')
-        token_agent_number = data.get('agent_number')
+        auth = current_auth()
+        role = auth.role
+        company_id = auth.company_id
+        token_agent_number = auth.agent_number
 
         req = request.get_json()
         name = req.get('name')
@@ -194,6 +167,7 @@ def edit_agent(current_user_id, agent_number):
             table = get_company_table_name('agents', int(company_id))
             sql_per = f"UPDATE `{table}` SET {', '.join(update_fields)} WHERE agent_number = %s"
             cursor.execute(sql_per, tuple(params_per))
+            sync_login(cursor, int(company_id), agent_number)
 
             # No shared 'agents' update
             connection.commit()
@@ -225,17 +199,9 @@ def delete_agent(current_user_id, agent_number):
     # ... (move the full delete_agent logic here from app.py)
     try:
         # Check admin
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        company_id = data.get('company_id')
+        auth = current_auth()
+        role = auth.role
+        company_id = auth.company_id
         if role != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
         connection = get_db_connection()
@@ -245,6 +211,7 @@ def delete_agent(current_user_id, agent_number):
         # Delete from per-company table first
         table = get_company_table_name('agents', int(company_id))
         cursor.execute(f"DELETE FROM `{table}` WHERE agent_number = %s", (agent_number,))
+        sync_login(cursor, int(company_id), agent_number)
 
         # No shared 'agents' delete
         connection.commit()
@@ -278,16 +245,8 @@ def add_agent_break(current_user_id):
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor()
         # Resolve company_id from JWT
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
+        auth = current_auth()
+        company_id = auth.company_id
 
         # Write to per-company breaks table when company_id is present; fallback to shared table
         if company_id:
@@ -307,7 +266,15 @@ def add_agent_break(current_user_id):
                 """,
                 (agent_number, status, break_start, break_end, duration_seconds, remark)
             )
+        record_id = cursor.lastrowid
+        record_break(cursor, company_id, record_id)
+        if company_id and break_start:
+            # A backdated record changes days the productivity report may have memoised
+            cursor.execute(f"SELECT started_at FROM `{table}` WHERE id = %s", (record_id,))
+            forget_span(cursor, company_id, agent_number, cursor.fetchall()[0][0])
+        state = agent_status(cursor, company_id, agent_number)
         connection.commit()
+        publish(company_id, 'agent_status', state)
         return jsonify({'message': 'Break/working status recorded successfully'}), 201
     except Error as e:
         return jsonify({'message': f'Database error: {str(e)}'}), 500
@@ -338,40 +305,13 @@ def close_latest_agent_break(current_user_id):
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor(dictionary=True)
         # Resolve company_id from JWT
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
+        auth = current_auth()
+        company_id = auth.company_id
 
         # Determine per-company table
         if company_id:
             table = get_company_table_name('agent_breaks', int(company_id))
-            cursor.execute(
-                f"""
-                SELECT id, break_start FROM `{table}`
-                WHERE agent_number = %s AND status = 'Break' AND break_end IS NULL
-                ORDER BY break_start DESC
-                LIMIT 1
-                """,
-                (agent_number,)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT id, break_start FROM agent_breaks
-                WHERE agent_number = %s AND status = 'Break' AND break_end IS NULL
-                ORDER BY break_start DESC
-                LIMIT 1
-                """,
-                (agent_number,)
-            )
-        row = cursor.fetchone()
+        row = latest_open_break(cursor, company_id, agent_number)
         if not row:
             return jsonify({'message': 'No ongoing break found'}), 404
         # Update with break_end and duration in seconds
@@ -396,7 +336,12 @@ def close_latest_agent_break(current_user_id):
                 """,
                 (break_end, break_end, row['id'])
             )
+        record_break_closed(cursor2, company_id, agent_number, row['id'], break_end)
+        if company_id:
+            forget_span(cursor2, company_id, agent_number, row['started_at'])
+        state = agent_status(cursor2, company_id, agent_number)
         connection.commit()
+        publish(company_id, 'agent_status', state)
         return jsonify({'message': 'Break closed successfully'}), 200
     except Error as e:
         return jsonify({'message': f'Database error: {str(e)}'}), 500
@@ -408,58 +353,94 @@ def close_latest_agent_break(current_user_id):
         if 'connection' in locals():
             connection.close()
 
+def _parse_day(raw):
+    """YYYY-MM-DD query parameter as midnight of that day; None when absent."""
+    if not raw:
+        return None
+    return datetime.strptime(raw, '%Y-%m-%d')
+
+
 @agents_bp.route('/api/agents/breaks', methods=['GET'])
 @token_required
 def get_agent_breaks(current_user_id):
-    """Admin gets all agent break/working status records, with optional search and grouping by date."""
+    """Admin gets agent break/working status records grouped by date, a page of days at a time.
+
+    Query parameters: from / to (YYYY-MM-DD, inclusive), days per page (default 7,
+    at most 62), before (the previous page's next_before), search with
+    search_mode=prefix|fulltext, agent_number, and aggregate=1 for per-day totals.
+    """
     try:
         # Only admin can view all
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
+        auth = current_auth()
+        role = auth.role
         if role != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
-        # Optional search params
-        search = request.args.get('search', '')
+        search = request.args.get('search', '').strip()
+        search_mode = request.args.get('search_mode', 'prefix')
+        if search_mode not in SEARCH_MODES:
+            return jsonify({'message': f"search_mode must be one of: {', '.join(SEARCH_MODES)}"}), 400
+        try:
+            date_from = _parse_day(request.args.get('from'))
+            date_to = _parse_day(request.args.get('to'))
+            before = _parse_day(request.args.get('before'))
+        except ValueError:
+            return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+        try:
+            days = max(1, min(int(request.args.get('days', DEFAULT_PAGE_DAYS)), MAX_PAGE_DAYS))
+        except ValueError:
+            return jsonify({'message': 'days must be a number'}), 400
+        aggregate = request.args.get('aggregate') in ('1', 'true')
+
+        # The page covers days strictly before `upper`
+        upper = date_to + timedelta(days=1) if date_to else datetime.now() + timedelta(days=1)
+        if before and before < upper:
+            upper = before
+
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
-        cursor = connection.cursor(dictionary=True)
-        # Build query once, using per-company tables when available
-        company_id = data.get('company_id', 0) or 0
-        params = []
-        if company_id:
-            breaks_table = get_company_table_name('agent_breaks', int(company_id))
-            agents_table = get_company_table_name('agents', int(company_id))
-            query = (
-                f"SELECT ab.*, a.name, a.email FROM `{breaks_table}` ab "
-                f"JOIN `{agents_table}` a ON ab.agent_number = a.agent_number"
-            )
-        else:
-            query = (
-                "SELECT ab.*, a.name, a.email FROM agent_breaks ab "
-                "JOIN agents a ON ab.agent_number = a.agent_number"
-            )
+        cursor = connection.cursor(buffered=True)
+        company_id = auth.company_id or 0
+        result = {'breaks': {}, 'days': [], 'next_before': None}
+        if aggregate:
+            result['aggregates'] = {}
+
+        agent_numbers = None
+        if request.args.get('agent_number'):
+            agent_numbers = [request.args['agent_number']]
         if search:
-            query += " WHERE a.name LIKE %s OR ab.agent_number LIKE %s"
-            params.extend([f"%{search}%", f"%{search}%"])
-        query += " ORDER BY ab.break_start DESC"
-        cursor.execute(query, tuple(params))
-        breaks = cursor.fetchall()
-        # Group by date
-        from collections import defaultdict
-        grouped = defaultdict(list)
-        for b in breaks:
-            date_key = b['break_start'].date() if b['break_start'] else b['created_at'].date()
-            grouped[str(date_key)].append(b)
-        return jsonify({'breaks': grouped}), 200
+            matched = search_agents(cursor, company_id, search, search_mode)
+            agent_numbers = [a for a in matched if agent_numbers is None or a in agent_numbers]
+        if agent_numbers == []:
+            return jsonify(result), 200
+
+        found = page_days(cursor, company_id, upper, days, date_from, agent_numbers)
+        if not found:
+            return jsonify(result), 200
+        if len(found) > days:
+            found = found[:days]
+            result['next_before'] = str(found[-1])
+        lower = datetime.combine(found[-1], datetime.min.time())
+        result['days'] = [str(d) for d in found]
+
+        cursor.close()
+        cursor = connection.cursor(dictionary=True)
+        grouped = {day: [] for day in result['days']}
+        for b in list_breaks(cursor, company_id, lower, upper, agent_numbers):
+            grouped[str(b.pop('started_at').date())].append(b)
+        result['breaks'] = grouped
+        if aggregate:
+            totals = {day: [] for day in result['days']}
+            for row in day_aggregates(cursor, company_id, lower, upper, agent_numbers):
+                totals[str(row.pop('day'))].append({
+                    'agent_number': row['agent_number'],
+                    'records': int(row['records']),
+                    'breaks': int(row['breaks'] or 0),
+                    'break_seconds': int(row['break_seconds'] or 0),
+                    'open_breaks': int(row['open_breaks'] or 0),
+                })
+            result['aggregates'] = totals
+        return jsonify(result), 200
     except Error as e:
         return jsonify({'message': f'Database error: {str(e)}'}), 500
     except Exception as e:
@@ -473,81 +454,31 @@ def get_agent_breaks(current_user_id):
 @agents_bp.route('/api/agents/current-status', methods=['GET'])
 @token_required
 def get_agents_current_status(current_user_id):
-    """Return the current working status for each agent based on the latest agent_breaks row.
-    Admins see all agents; agents see only their own status.
+    """Return the current working status for each agent based on the latest agent_breaks row
+    (kept in the agent_state table). Admins see all agents; agents see only their own status.
     """
     try:
         # Auth context
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        token_agent_number = data.get('agent_number')
+        auth = current_auth()
+        role = auth.role
+        token_agent_number = auth.agent_number
 
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor(dictionary=True)
 
-        # If tenant context, read from per-company tables
-        if role in ('admin', 'agent') and data.get('company_id'):
-            company_id = data.get('company_id')
-            agents_table = get_company_table_name('agents', int(company_id))
-            breaks_table = get_company_table_name('agent_breaks', int(company_id))
-            base = f"""
-                SELECT a.agent_number,
-                       CASE WHEN ab.status = 'Break' AND ab.break_end IS NULL THEN 'Break' ELSE 'Working' END AS current_status,
-                       ab.break_start,
-                       ab.break_end
-                FROM `{agents_table}` a
-                LEFT JOIN (
-                    SELECT x.* FROM `{breaks_table}` x
-                    JOIN (
-                        SELECT agent_number, MAX(COALESCE(break_start, created_at)) AS max_dt
-                        FROM `{breaks_table}`
-                        GROUP BY agent_number
-                    ) m ON m.agent_number = x.agent_number AND COALESCE(x.break_start, x.created_at) = m.max_dt
-                ) ab ON ab.agent_number = a.agent_number
-            """
-            params = []
-            if role == 'agent' and token_agent_number:
-                base += " WHERE a.agent_number = %s"
-                params.append(token_agent_number)
-            elif role == 'admin':
-                base += " WHERE a.status = 'Active' AND a.is_admin = 0"
-            base += " ORDER BY a.agent_number"
-            cursor.execute(base, tuple(params))
-        else:
-            # Fallback to shared tables
-            base = """
-                SELECT a.agent_number,
-                       CASE WHEN ab.status = 'Break' AND ab.break_end IS NULL THEN 'Break' ELSE 'Working' END AS current_status,
-                       ab.break_start,
-                       ab.break_end
-                FROM agents a
-                LEFT JOIN (
-                    SELECT x.* FROM agent_breaks x
-                    JOIN (
-                        SELECT agent_number, MAX(COALESCE(break_start, created_at)) AS max_dt
-                        FROM agent_breaks
-                        GROUP BY agent_number
-                    ) m ON m.agent_number = x.agent_number AND COALESCE(x.break_start, x.created_at) = m.max_dt
-                ) ab ON ab.agent_number = a.agent_number
-            """
-            params = []
-            if role == 'agent' and token_agent_number:
-                base += " WHERE a.agent_number = %s"
-                params.append(token_agent_number)
-            elif role == 'admin':
-                base += " WHERE a.status = 'Active' AND a.is_admin = 0"
-            base += " ORDER BY a.agent_number"
-            cursor.execute(base, tuple(params))
+        # One primary-key lookup per agent in the materialized state table
+        company_id = auth.company_id if role in ('admin', 'agent') else None
+        base = current_status_sql(company_id)
+        params = []
+        if role == 'agent' and token_agent_number:
+            base += " WHERE a.agent_number = %s"
+            params.append(token_agent_number)
+        elif role == 'admin':
+            base += " WHERE a.status = 'Active' AND a.is_admin = 0"
+        base += " ORDER BY a.agent_number"
+        cursor.execute(base, tuple(params))
         rows = cursor.fetchall()
         # Return as mapping agent_number -> status
         mapping = {row['agent_number']: row['current_status'] for row in rows}
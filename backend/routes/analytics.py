@@ -0,0 +1,109 @@
+import datetime
+from flask import Blueprint, jsonify, request
+from mysql.connector import Error
+from backend.auth.jwt_utils import token_required, current_auth
+from backend.db.agent_productivity import productivity_report, roster
+from backend.db.call_rollups import call_analytics
+from backend.db.connection import get_db_connection
+from backend.db.tenant_cache import is_company_blocked
+
+analytics_bp = Blueprint('analytics', __name__)
+
+DEFAULT_RANGE_DAYS = 30
+MAX_HOURLY_RANGE_DAYS = 31  # hourly series longer than this should use granularity=day
+MAX_TOP_CUSTOMERS = 100
+MAX_PRODUCTIVITY_RANGE_DAYS = 366
+
+
+@analytics_bp.route('/api/analytics/calls', methods=['GET'])
+@token_required
+def get_call_analytics(current_user_id):
+    """Call volume and duration over a date range, read from the rollup tables.
+
+    Query parameters: from / to (YYYY-MM-DD, inclusive; the last 30 days by default),
+    granularity=day|hour, agent_number, top (busiest customers, default 10). Agents
+    only see their own calls and get no customer ranking.
+    """
+    auth = current_auth()
+    if not auth.is_tenant:
+        return jsonify({'message': 'Analytics are available to company users only'}), 403
+    try:
+        today = datetime.date.today()
+        day_to = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        day_from = (datetime.date.fromisoformat(request.args['from']) if request.args.get('from')
+                    else day_to - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+    if day_from > day_to:
+        return jsonify({'message': 'from must not be after to'}), 400
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'hour'):
+        return jsonify({'message': 'granularity must be day or hour'}), 400
+    if granularity == 'hour' and (day_to - day_from).days >= MAX_HOURLY_RANGE_DAYS:
+        return jsonify({'message': f'Hourly analytics cover at most {MAX_HOURLY_RANGE_DAYS} days'}), 400
+    try:
+        top = max(1, min(int(request.args.get('top', 10)), MAX_TOP_CUSTOMERS))
+    except ValueError:
+        return jsonify({'message': 'top must be a number'}), 400
+    agent_number = auth.agent_number if auth.role == 'agent' else (request.args.get('agent_number') or None)
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({'message': 'Database connection failed'}), 500
+    try:
+        if is_company_blocked(connection, auth.company_id):
+            return jsonify({'message': 'Access disabled for this company'}), 403
+        cursor = connection.cursor(buffered=True)
+        result = call_analytics(cursor, auth.company_id, day_from, day_to, granularity, agent_number, top)
+        return jsonify({'from': str(day_from), 'to': str(day_to), 'granularity': granularity,
+                        'agent_number': agent_number, **result}), 200
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        connection.close()
+
+
+@analytics_bp.route('/api/analytics/agents', methods=['GET'])
+@token_required
+def get_agent_productivity(current_user_id):
+    """Talk, break, working and idle time and calls per working hour for each agent.
+
+    Query parameters: from / to (YYYY-MM-DD, inclusive; the last 30 days by default),
+    agent_number, per_day=1 for a per-day breakdown. Agents only see themselves.
+    """
+    auth = current_auth()
+    if not auth.is_tenant:
+        return jsonify({'message': 'Analytics are available to company users only'}), 403
+    try:
+        today = datetime.date.today()
+        day_to = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        day_from = (datetime.date.fromisoformat(request.args['from']) if request.args.get('from')
+                    else day_to - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+    if day_from > day_to:
+        return jsonify({'message': 'from must not be after to'}), 400
+    if (day_to - day_from).days >= MAX_PRODUCTIVITY_RANGE_DAYS:
+        return jsonify({'message': f'Productivity reports cover at most {MAX_PRODUCTIVITY_RANGE_DAYS} days'}), 400
+    agent_number = auth.agent_number if auth.role == 'agent' else (request.args.get('agent_number') or None)
+    per_day = request.args.get('per_day') in ('1', 'true')
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({'message': 'Database connection failed'}), 500
+    try:
+        if is_company_blocked(connection, auth.company_id):
+            return jsonify({'message': 'Access disabled for this company'}), 403
+        cursor = connection.cursor(buffered=True)
+        agents = roster(cursor, auth.company_id, agent_number)
+        report = productivity_report(connection, auth.company_id, agents, day_from, day_to, per_day)
+        return jsonify({'from': str(day_from), 'to': str(day_to), 'agent_number': agent_number,
+                        'agents': report}), 200
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        connection.close()
@@ -10,6 +10,8 @@ import os
 # Fix relative import error when running directly
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from backend.db.connection import get_db_connection
+from backend.db.agent_state import agent_status, record_break
+from backend.events.bus import publish
 
 breaks_bp = Blueprint('breaks', __name__, url_prefix='/api/breaks')
 
@@ -45,8 +47,11 @@ def insert_agent_break():
             INSERT INTO agent_breaks (agent_number, status, break_start, break_end, duration_seconds, remark)
             VALUES (%s, %s, %s, %s, %s, %s)
         """, (agent_number, 'Break', break_start, break_end, duration_seconds, remark))
+        record_break(cursor, None, cursor.lastrowid)
+        state = agent_status(cursor, None, agent_number)
 
         connection.commit()
+        publish(None, 'agent_status', state)
         return jsonify({'message': 'Break inserted successfully'})
 
     except Error as db_err:
@@ -1,37 +1,332 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response
 from backend.db.connection import get_db_connection
 from backend.db.company_tables import get_company_table_name
-from backend.auth.jwt_utils import token_required
+from backend.db.tenant_cache import is_company_blocked
+from backend.auth.jwt_utils import token_required, current_auth
 from mysql.connector import Error
 import datetime
-from flask import current_app
 import io
 import csv
 import tempfile
-from openpyxl import load_workbook, Workbook
-import re
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from backend.storage.recordings import get_recording_store, sniff_audio_mime, ref_to_digest
+from backend.storage.delivery import RecordingSource, send_recording, local_last_modified
+from backend.storage.uploads import (
+    UploadError, detect_audio_mime, create_upload, upload_status, append_chunk, finalize_upload, abort_upload,
+)
+from backend.config import RECORDING_UPLOAD, JOBS
+from backend.ingest.calls import ingest_calls
+from backend.ingest.formats import UnsupportedFormat, detect_format, open_rows
+from backend.ingest.corrections import apply_corrections
+from backend.jobs.queue import submit_job, job_to_dict
+from backend.events.bus import publish
+from backend.db.customers import (
+    customer_columns_sql, customer_join_sql, set_alternative_numbers, set_customer_name,
+)
+from backend.db.call_remarks import (
+    REMARKS_PAGE_DEFAULT_LIMIT, REMARKS_PAGE_MAX_LIMIT, legacy_entries, list_remarks, record_remark,
+)
+import hashlib
+import os
+import json
+import base64
+import time
 
 calls_bp = Blueprint('calls', __name__)
 
-# Helpers to normalize and validate Indian mobile numbers
-def normalize_indian_mobile(raw: str) -> str:
-    """Return a 10-digit Indian mobile number by removing optional prefixes and non-digits.
-    Accepts formats like +91XXXXXXXXXX, 0XXXXXXXXXX, 91XXXXXXXXXX, and plain 10 digits.
+# Keyset pagination settings for GET /api/calls
+CALLS_PAGE_DEFAULT_LIMIT = 100
+CALLS_PAGE_MAX_LIMIT = 500
+CALLS_TOTAL_CACHE_TTL = 60  # seconds a cached total is reused
+
+# (table, where_sql, params) -> (expires_at, total, is_estimate)
+_calls_total_cache = {}
+
+# Rows pulled per fetchmany() round-trip when streaming GET /api/calls
+CALLS_STREAM_BATCH = 1000
+
+# GET /api/calls/export
+CALLS_EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+CALLS_EXPORT_SPOOL_BYTES = 8 * 1024 * 1024  # XLSX/Parquet files stay in memory up to this size, then go to disk
+CALLS_XLSX_MAX_ROWS = 1048575  # sheet row limit, less the header
+CALLS_PARQUET_ROW_GROUP = 50000
+
+def encode_calls_cursor(timestamp, call_id) -> str:
+    """Opaque cursor pointing just past the (timestamp, id) of the last row on a page."""
+    if isinstance(timestamp, datetime.datetime):
+        timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    raw = json.dumps({'ts': timestamp, 'id': int(call_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_calls_cursor(cursor_str: str):
+    """Return (timestamp_str, id) from a cursor produced by encode_calls_cursor.
+
+    Raises ValueError on anything malformed.
+    """
+    try:
+        padded = cursor_str + '=' * (-len(cursor_str) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        ts = data['ts']
+        call_id = int(data['id'])
+        if ts is not None:
+            datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S')
+        return ts, call_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_calls_limit(raw) -> int:
+    """Clamp a client supplied page size to [1, CALLS_PAGE_MAX_LIMIT]."""
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        return CALLS_PAGE_DEFAULT_LIMIT
+    return max(1, min(limit, CALLS_PAGE_MAX_LIMIT))
+
+def keyset_after(alias: str, cursor_ts, cursor_id):
+    """WHERE fragment selecting rows strictly after the cursor in (timestamp DESC, id DESC) order."""
+    if cursor_ts is None:
+        # NULL timestamps sort last in DESC order; only the id breaks ties among them
+        return f"({alias}.timestamp IS NULL AND {alias}.id < %s)", [cursor_id]
+    return (
+        f"({alias}.timestamp < %s OR ({alias}.timestamp = %s AND {alias}.id < %s) OR {alias}.timestamp IS NULL)",
+        [cursor_ts, cursor_ts, cursor_id],
+    )
+
+def estimate_calls_total(connection, table: str, where_sql: str, params) -> tuple:
+    """Return (total, is_estimate) for a calls listing, cached for CALLS_TOTAL_CACHE_TTL.
+
+    Unfiltered listings use InnoDB's table statistics (approximate, no scan); filtered
+    listings run one COUNT(*) whose result is then reused until the TTL expires.
     """
-    if raw is None:
-        return ''
-    digits = re.sub(r'\D', '', str(raw))
-    # Strip leading 0 (0 + 10 digits)
-    if len(digits) == 11 and digits.startswith('0'):
-        digits = digits[1:]
-    # Strip country code 91 (91 + 10 digits)
-    if len(digits) == 12 and digits.startswith('91'):
-        digits = digits[2:]
-    return digits
-
-def is_valid_indian_mobile(ten_digits: str) -> bool:
-    """Basic validation: exactly 10 digits and starts with 6/7/8/9."""
-    return len(ten_digits) == 10 and ten_digits[0] in ('6', '7', '8', '9') and ten_digits.isdigit()
+    key = (table, where_sql, tuple(params))
+    now = time.monotonic()
+    hit = _calls_total_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1], hit[2]
+    cur = connection.cursor()
+    try:
+        if not where_sql:
+            cur.execute(
+                """
+                SELECT TABLE_ROWS FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                """,
+                (table,)
+            )
+            row = cur.fetchone()
+            total, is_estimate = int(row[0] or 0) if row else 0, True
+        else:
+            cur.execute(f"SELECT COUNT(*) FROM `{table}` c WHERE {where_sql}", tuple(params))
+            total, is_estimate = int(cur.fetchone()[0]), False
+    finally:
+        cur.close()
+    if len(_calls_total_cache) > 1024:
+        _calls_total_cache.clear()
+    _calls_total_cache[key] = (now + CALLS_TOTAL_CACHE_TTL, total, is_estimate)
+    return total, is_estimate
+
+def format_call_row(call: dict) -> dict:
+    """Render datetime columns of a calls row as 'YYYY-MM-DD HH:MM:SS' strings in place."""
+    if call.get('timestamp'):
+        call['timestamp'] = call['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+    if call.get('meeting_datetime'):
+        try:
+            call['meeting_datetime'] = call['meeting_datetime'].strftime('%Y-%m-%d %H:%M:%S')
+        except Exception:
+            pass
+    return call
+
+def calls_listing_query(role, agent_number, company_id, from_date, to_date, table_alias: str = 'c'):
+    """SELECT of GET /api/calls and its filters: (base_query, where_clauses, params, calls_table).
+
+    Uses the per-company calls table when company_id is present; agents only see their
+    own calls; from/to (YYYY-MM-DD) bound the timestamp inclusively.
+    """
+    where_clauses = []
+    params = []
+    if role in ('admin', 'agent') and company_id:
+        calls_table = get_company_table_name('calls', int(company_id))
+        join = customer_join_sql(int(company_id), table_alias)
+    else:
+        calls_table = 'calls'
+        join = customer_join_sql(None, table_alias)
+    base_query = (
+        f"SELECT {table_alias}.id, {table_alias}.agent_number, {table_alias}.customer_number, {table_alias}.duration, {table_alias}.call_status, {table_alias}.timestamp, "
+        f"{table_alias}.remarks, {customer_columns_sql(table_alias)}, {table_alias}.remarks_status, {table_alias}.remarks_count, ({table_alias}.recording_ref IS NOT NULL OR {table_alias}.recordings IS NOT NULL) AS has_recording, "
+        f"{table_alias}.meeting_datetime, {table_alias}.meeting_description FROM `{calls_table}` {table_alias}"
+        + join
+    )
+    if role == 'agent' and agent_number:
+        where_clauses.append(f'{table_alias}.agent_number = %s')
+        params.append(agent_number)
+    if from_date:
+        where_clauses.append(f'{table_alias}.timestamp >= %s')
+        params.append(from_date + ' 00:00:00')
+    if to_date:
+        where_clauses.append(f'{table_alias}.timestamp <= %s')
+        params.append(to_date + ' 23:59:59')
+    return base_query, where_clauses, params, calls_table
+
+def stream_calls(connection, cursor, fmt: str):
+    """Yield an executed calls query as NDJSON lines or as a chunked {"calls": [...]} document.
+
+    Rows are read from the (unbuffered) cursor CALLS_STREAM_BATCH at a time, so memory
+    stays flat regardless of result size. Owns and releases the cursor and connection.
+    """
+    finished = False
+    try:
+        if fmt == 'json':
+            yield '{"calls":['
+        first = True
+        while True:
+            rows = cursor.fetchmany(CALLS_STREAM_BATCH)
+            if not rows:
+                break
+            parts = []
+            for row in rows:
+                encoded = json.dumps(format_call_row(row), default=str)
+                if fmt == 'json':
+                    parts.append(encoded if first else ',' + encoded)
+                    first = False
+                else:
+                    parts.append(encoded + '\n')
+            yield ''.join(parts)
+        if fmt == 'json':
+            yield ']}'
+        finished = True
+    finally:
+        release_stream(connection, cursor, finished)
+
+def release_stream(connection, cursor, finished: bool) -> None:
+    """Close a streamed query's cursor and connection, or drop the connection when rows were left unread."""
+    if finished:
+        cursor.close()
+        connection.close()
+    else:
+        # Client went away mid-stream: draining the rest of the result set would
+        # cost more than a reconnect, so drop the connection instead of pooling it
+        try:
+            connection.discard()
+        except AttributeError:
+            connection.close()
+
+def _export_cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+def stream_calls_csv(connection, cursor):
+    """Yield an executed calls query as CSV, header first, CALLS_STREAM_BATCH rows per chunk.
+
+    Owns and releases the cursor and connection, like stream_calls.
+    """
+    finished = False
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(cursor.column_names)
+        while True:
+            rows = cursor.fetchmany(CALLS_STREAM_BATCH)
+            if not rows:
+                break
+            writer.writerows([_export_cell(v) for v in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        finished = True
+    finally:
+        release_stream(connection, cursor, finished)
+
+def write_calls_xlsx(cursor, out) -> bool:
+    """Write an executed calls query to `out` as an XLSX workbook in write-only mode.
+
+    Returns False when the sheet's row limit cut the export short (rows are left unread).
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Calls')
+    ws.append(list(cursor.column_names))
+    written = 0
+    complete = True
+    while complete:
+        rows = cursor.fetchmany(CALLS_STREAM_BATCH)
+        if not rows:
+            break
+        for row in rows:
+            if written >= CALLS_XLSX_MAX_ROWS:
+                complete = False
+                break
+            # Control characters are not allowed in XLSX cells
+            ws.append([ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v for v in row])
+            written += 1
+    wb.save(out)
+    return complete
+
+def _arrow_schema(pa, names):
+    types = {
+        'id': pa.int64(), 'duration': pa.int64(), 'remarks_count': pa.int64(), 'has_recording': pa.bool_(),
+        'timestamp': pa.timestamp('s'), 'meeting_datetime': pa.timestamp('s'),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in names])
+
+def _arrow_batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.type == pa.bool_():
+            values = [None if v is None else bool(v) for v in values]
+        elif field.type == pa.string():
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.record_batch(arrays, schema=schema)
+
+def write_calls_parquet(cursor, out) -> None:
+    """Write an executed calls query to `out` as Parquet, one row group per CALLS_PARQUET_ROW_GROUP rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(pa, cursor.column_names)
+    with pq.ParquetWriter(out, schema) as writer:
+        pending, pending_rows = [], 0
+        while True:
+            rows = cursor.fetchmany(CALLS_STREAM_BATCH)
+            if rows:
+                pending.append(_arrow_batch(pa, schema, rows))
+                pending_rows += len(rows)
+            if pending and (not rows or pending_rows >= CALLS_PARQUET_ROW_GROUP):
+                writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                pending, pending_rows = [], 0
+            if not rows:
+                break
+
+def stream_calls_arrow(connection, cursor):
+    """Yield an executed calls query as an Arrow IPC stream, one record batch per fetch.
+
+    Owns and releases the cursor and connection, like stream_calls.
+    """
+    import pyarrow as pa
+    finished = False
+    try:
+        schema = _arrow_schema(pa, cursor.column_names)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            while True:
+                rows = cursor.fetchmany(CALLS_STREAM_BATCH)
+                if not rows:
+                    break
+                writer.write_batch(_arrow_batch(pa, schema, rows))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        yield sink.getvalue()
+        finished = True
+    finally:
+        release_stream(connection, cursor, finished)
 
 @calls_bp.route('/api/calls', methods=['GET'])
 @token_required
@@ -40,18 +335,10 @@ def get_calls(current_user_id):
     try:
         print("=== DEBUG: Calls endpoint called ===")
         # Get role and agent_number from JWT
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        agent_number = data.get('agent_number', None)
-        company_id = data.get('company_id', None)
+        auth = current_auth()
+        role = auth.role
+        agent_number = auth.agent_number
+        company_id = auth.company_id
 
         # Date filter
         from_date = request.args.get('from')
@@ -63,90 +350,68 @@ def get_calls(current_user_id):
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor(dictionary=True)
 
-        # Ensure recordings column is LONGBLOB
-        try:
-            check_cursor = connection.cursor(dictionary=True)
-            check_cursor.execute(
-                """
-                SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'calls' AND COLUMN_NAME = 'recordings'
-                """
-            )
-            col = check_cursor.fetchone()
-            if col and col.get('DATA_TYPE', '').lower() != 'longblob':
-                fix_cursor = connection.cursor()
-                fix_cursor.execute("ALTER TABLE calls MODIFY recordings LONGBLOB")
-                connection.commit()
-        except Exception:
-            pass
-
         # Enforce company isolation and status restrictions
         # If admin/agent, ensure company is Active for inbound; block outbound/export based on status on frontend via flags
-        company_status = 'Active'
-        payment_status = 'Paid'
         if company_id and role in ('admin', 'agent'):
-            st = connection.cursor(dictionary=True)
-            st.execute("SELECT status, payment_status FROM companies WHERE id = %s", (company_id,))
-            row = st.fetchone()
-            if row:
-                company_status = row.get('status', 'Active')
-                payment_status = row.get('payment_status', 'Paid')
-            # If Fully Close, deny access entirely
-            if company_status == 'Fully Close' or payment_status == 'Unpaid':
+            # If Fully Close or Unpaid, deny access entirely (cached; no query on a hit)
+            if is_company_blocked(connection, company_id):
                 return jsonify({'message': 'Access disabled for this company'}), 403
 
-        # Build base query, using per-company calls table when company_id is present
-        where_clauses = []
-        params = []
         table_alias = 'c'
-        if role in ('admin', 'agent') and company_id:
-            calls_table = get_company_table_name('calls', int(company_id))
-            base_query = (
-                f"SELECT {table_alias}.id, {table_alias}.agent_number, {table_alias}.customer_number, {table_alias}.duration, {table_alias}.call_status, {table_alias}.timestamp, "
-                f"{table_alias}.remarks, {table_alias}.name, {table_alias}.remarks_status, ({table_alias}.recordings IS NOT NULL) AS has_recording, {table_alias}.alternative_numbers, "
-                f"{table_alias}.meeting_datetime, {table_alias}.meeting_description FROM `{calls_table}` {table_alias}"
-            )
-        else:
-            base_query = (
-                f"SELECT {table_alias}.id, {table_alias}.agent_number, {table_alias}.customer_number, {table_alias}.duration, {table_alias}.call_status, {table_alias}.timestamp, "
-                f"{table_alias}.remarks, {table_alias}.name, {table_alias}.remarks_status, ({table_alias}.recordings IS NOT NULL) AS has_recording, {table_alias}.alternative_numbers, "
-                f"{table_alias}.meeting_datetime, {table_alias}.meeting_description FROM calls {table_alias}"
-            )
-        if role == 'agent' and agent_number:
-            where_clauses.append(f'{table_alias}.agent_number = %s')
-            params.append(agent_number)
-        if from_date:
-            where_clauses.append(f'{table_alias}.timestamp >= %s')
-            params.append(from_date + ' 00:00:00')
-        if to_date:
-            where_clauses.append(f'{table_alias}.timestamp <= %s')
-            params.append(to_date + ' 23:59:59')
+        base_query, where_clauses, params, calls_table = calls_listing_query(
+            role, agent_number, company_id, from_date, to_date, table_alias)
+        # Streaming mode (?stream=ndjson or ?stream=json) returns every matching row
+        stream_fmt = (request.args.get('stream') or '').lower()
+        if stream_fmt and stream_fmt not in ('ndjson', 'json'):
+            return jsonify({'message': 'stream must be ndjson or json'}), 400
+        # Keyset pagination is opt-in: requested via ?limit= or ?cursor=
+        paginate = not stream_fmt and ('limit' in request.args or 'cursor' in request.args)
+        filter_sql = ' AND '.join(where_clauses)
+        filter_params = list(params)
+        if paginate:
+            limit = parse_calls_limit(request.args.get('limit'))
+            cursor_param = request.args.get('cursor')
+            if cursor_param:
+                try:
+                    cursor_ts, cursor_id = decode_calls_cursor(cursor_param)
+                except ValueError:
+                    return jsonify({'message': 'Invalid cursor'}), 400
+                after_sql, after_params = keyset_after(table_alias, cursor_ts, cursor_id)
+                where_clauses.append(after_sql)
+                params.extend(after_params)
         if where_clauses:
             base_query += ' WHERE ' + ' AND '.join(where_clauses)
-        base_query += f' ORDER BY {table_alias}.timestamp DESC'
+        if paginate:
+            base_query += f' ORDER BY {table_alias}.timestamp DESC, {table_alias}.id DESC LIMIT %s'
+            params.append(limit + 1)
+        elif stream_fmt:
+            base_query += f' ORDER BY {table_alias}.timestamp DESC, {table_alias}.id DESC'
+        else:
+            base_query += f' ORDER BY {table_alias}.timestamp DESC'
         cursor.execute(base_query, tuple(params))
+        if stream_fmt:
+            mimetype = 'application/x-ndjson' if stream_fmt == 'ndjson' else 'application/json'
+            response = Response(stream_calls(connection, cursor, stream_fmt), mimetype=mimetype)
+            # The generator now owns the cursor and connection
+            cursor = connection = None
+            return response, 200
         calls = cursor.fetchall()
-        # Normalize timestamps and unify customer names within the same customer_number group
-        latest_name_by_customer = {}
-        for call in calls:
-            if call['timestamp']:
-                call['timestamp'] = call['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            if call.get('meeting_datetime'):
-                try:
-                    call['meeting_datetime'] = call['meeting_datetime'].strftime('%Y-%m-%d %H:%M:%S')
-                except Exception:
-                    pass
-            cust = call.get('customer_number')
-            name = (call.get('name') or '').strip()
-            if cust:
-                # Because we ordered DESC by timestamp, the first seen name per customer is the latest
-                if cust not in latest_name_by_customer and name:
-                    latest_name_by_customer[cust] = name
+        next_cursor = None
+        if paginate and len(calls) > limit:
+            calls = calls[:limit]
+            last = calls[-1]
+            next_cursor = encode_calls_cursor(last['timestamp'], last['id'])
+        # Names come from the joined customers record, so only timestamps need formatting
         for call in calls:
-            cust = call.get('customer_number')
-            if cust and latest_name_by_customer.get(cust):
-                call['name'] = latest_name_by_customer[cust]
-        return jsonify({'calls': calls}), 200
+            format_call_row(call)
+        if not paginate:
+            return jsonify({'calls': calls}), 200
+        result = {'calls': calls, 'next_cursor': next_cursor, 'limit': limit}
+        if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+            total, is_estimate = estimate_calls_total(connection, calls_table, filter_sql, filter_params)
+            result['total'] = total
+            result['total_is_estimate'] = is_estimate
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
     finally:
@@ -158,6 +423,77 @@ def get_calls(current_user_id):
         except Exception as e:
             print(f"Error closing resources: {e}")
 
+@calls_bp.route('/api/calls/export', methods=['GET'])
+@token_required
+def export_calls(current_user_id):
+    """Download every call matching the GET /api/calls filters (from, to; agents get their own).
+
+    format=csv (default) and format=arrow (Arrow IPC stream) are streamed from the
+    cursor as they are read. xlsx and parquet are written to a spooled temp file first,
+    as neither format can be sent before it is complete. parquet and arrow need pyarrow.
+    """
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in CALLS_EXPORT_FORMATS:
+        return jsonify({'message': f"format must be one of {', '.join(CALLS_EXPORT_FORMATS)}"}), 400
+    if fmt in ('parquet', 'arrow'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({'message': f'{fmt} export requires pyarrow on the server'}), 501
+    auth = current_auth()
+    from_date = request.args.get('from')
+    to_date = request.args.get('to')
+    try:
+        for raw in (from_date, to_date):
+            if raw:
+                datetime.datetime.strptime(raw, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'message': 'Dates must be YYYY-MM-DD'}), 400
+    filename = 'calls' + (f'_{from_date}' if from_date else '') + (f'_{to_date}' if to_date else '') + '.' + fmt
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({'message': 'Database connection failed'}), 500
+    cursor = None
+    try:
+        if auth.company_id and auth.role in ('admin', 'agent') and is_company_blocked(connection, auth.company_id):
+            return jsonify({'message': 'Access disabled for this company'}), 403
+        base_query, where_clauses, params, _ = calls_listing_query(
+            auth.role, auth.agent_number, auth.company_id, from_date, to_date)
+        if where_clauses:
+            base_query += ' WHERE ' + ' AND '.join(where_clauses)
+        base_query += ' ORDER BY c.timestamp DESC, c.id DESC'
+        # Unbuffered: rows come off the socket as they are fetched, never all at once
+        cursor = connection.cursor()
+        cursor.execute(base_query, tuple(params))
+        headers = {'Content-Disposition': f'attachment; filename={filename}'}
+        if fmt in ('csv', 'arrow'):
+            stream = stream_calls_csv if fmt == 'csv' else stream_calls_arrow
+            response = Response(stream(connection, cursor), mimetype=CALLS_EXPORT_FORMATS[fmt], headers=headers)
+            # The generator now owns the cursor and connection
+            cursor = connection = None
+            return response, 200
+        spool = tempfile.SpooledTemporaryFile(max_size=CALLS_EXPORT_SPOOL_BYTES)
+        complete = True
+        if fmt == 'xlsx':
+            complete = write_calls_xlsx(cursor, spool)
+        else:
+            write_calls_parquet(cursor, spool)
+        release_stream(connection, cursor, complete)
+        cursor = connection = None
+        spool.seek(0)
+        response = send_file(spool, mimetype=CALLS_EXPORT_FORMATS[fmt], as_attachment=True, download_name=filename)
+        if not complete:
+            response.headers['X-Export-Truncated'] = 'true'
+        return response
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if cursor is not None:
+            release_stream(connection, cursor, False)
+        elif connection is not None:
+            connection.close()
+
 @calls_bp.route('/api/calls/<int:call_id>/custom', methods=['PUT'])
 @token_required
 def update_call_custom_fields(current_user_id, call_id):
@@ -180,51 +516,43 @@ def update_call_custom_fields(current_user_id, call_id):
 
         # Fetch current values
         # Determine per-company table from token
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
+        auth = current_auth()
+        company_id = auth.company_id
         if company_id:
             calls_table = get_company_table_name('calls', int(company_id))
-            cursor.execute(f"SELECT customer_number, remarks, name, remarks_status, alternative_numbers FROM `{calls_table}` WHERE id = %s", (call_id,))
+            cursor.execute(f"SELECT id, agent_number, customer_number, timestamp, remarks, name, remarks_status, remarks_count, alternative_numbers FROM `{calls_table}` WHERE id = %s", (call_id,))
         else:
-            cursor.execute("SELECT customer_number, remarks, name, remarks_status, alternative_numbers FROM calls WHERE id = %s", (call_id,))
+            cursor.execute("SELECT id, agent_number, customer_number, timestamp, remarks, name, remarks_status, remarks_count, alternative_numbers FROM calls WHERE id = %s", (call_id,))
         call = cursor.fetchone()
         if not call:
             return jsonify({'message': 'Call not found'}), 404
 
-        now = datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-        def concat(old, new):
-            old = old or ''
-            if new:
-                return (old + ' | ' if old else '') + f"{new} <span style='font-size:10px;color:gray;'>[{now}]</span>"
-            return old
-
-        updated_remarks = concat(call.get('remarks', ''), remarks)
+        # New remarks/statuses are appended to the call's history; the row keeps only the latest
+        updated_remarks = call.get('remarks') or ''
+        updated_remarks_status = call.get('remarks_status') or ''
+        remarks_added = 0
+        if (remarks or '').strip() or (remarks_status or '').strip():
+            latest = record_remark(cursor, company_id, call, remarks, remarks_status, created_by=current_user_id)
+            updated_remarks, updated_remarks_status = latest['remarks'], latest['remarks_status']
+            remarks_added = latest['added']
         # For name: single canonical value per customer. If provided, replace and propagate to all calls for this customer.
         updated_name = call.get('name', '')
         if name and name.strip():
             updated_name = name.strip()
-        updated_remarks_status = concat(call.get('remarks_status', ''), remarks_status)
         updated_alternative_numbers = alternative_numbers if alternative_numbers else call.get('alternative_numbers', '')
         
         if company_id:
             cursor.execute(
                 f"""
-                UPDATE `{calls_table}` SET remarks=%s, name=%s, remarks_status=%s, alternative_numbers=%s,
-                       meeting_datetime=%s, meeting_description=%s
+                UPDATE `{calls_table}` SET remarks=%s, name=%s, remarks_status=%s, remarks_count=remarks_count+%s,
+                       alternative_numbers=%s, meeting_datetime=%s, meeting_description=%s
                 WHERE id=%s
                 """,
                 (
                     updated_remarks,
                     updated_name,
                     updated_remarks_status,
+                    remarks_added,
                     updated_alternative_numbers,
                     meeting_datetime,
                     meeting_description,
@@ -234,34 +562,41 @@ def update_call_custom_fields(current_user_id, call_id):
         else:
             cursor.execute(
                 """
-                UPDATE calls SET remarks=%s, name=%s, remarks_status=%s, alternative_numbers=%s,
-                       meeting_datetime=%s, meeting_description=%s
+                UPDATE calls SET remarks=%s, name=%s, remarks_status=%s, remarks_count=remarks_count+%s,
+                       alternative_numbers=%s, meeting_datetime=%s, meeting_description=%s
                 WHERE id=%s
                 """,
                 (
                     updated_remarks,
                     updated_name,
                     updated_remarks_status,
+                    remarks_added,
                     updated_alternative_numbers,
                     meeting_datetime,
                     meeting_description,
                     call_id,
                 ),
             )
-        # If name changed, propagate to all rows for that customer
+        # Name and alternative numbers belong to the customer; listings read them from there
         if name and name.strip():
-            if company_id:
-                cursor.execute(
-                    f"UPDATE `{calls_table}` SET name=%s WHERE customer_number=%s",
-                    (updated_name, call['customer_number']),
-                )
-            else:
-                cursor.execute(
-                    "UPDATE calls SET name=%s WHERE customer_number=%s",
-                    (updated_name, call['customer_number']),
-                )
+            set_customer_name(cursor, company_id, call['customer_number'], updated_name)
+        if alternative_numbers:
+            set_alternative_numbers(cursor, company_id, call['customer_number'], alternative_numbers)
         connection.commit()
-        return jsonify({'message': 'Custom fields updated successfully'}), 200
+        remarks_count = (call.get('remarks_count') or 0) + remarks_added
+        publish(company_id, 'call_updated', {
+            'id': call_id,
+            'agent_number': call['agent_number'],
+            'customer_number': call['customer_number'],
+            'remarks': updated_remarks,
+            'remarks_status': updated_remarks_status,
+            'remarks_count': remarks_count,
+            'name': updated_name,
+            'alternative_numbers': updated_alternative_numbers,
+            'meeting_datetime': meeting_datetime,
+            'meeting_description': meeting_description,
+        })
+        return jsonify({'message': 'Custom fields updated successfully', 'remarks_count': remarks_count}), 200
     except Exception as e:
         import traceback
         traceback.print_exc()  # Print full stack trace to console
@@ -279,6 +614,55 @@ def update_call_custom_fields(current_user_id, call_id):
         if 'connection' in locals():
             connection.close()
 
+@calls_bp.route('/api/calls/<int:call_id>/remarks', methods=['GET'])
+@token_required
+def get_call_remarks(current_user_id, call_id):
+    """Remark history of one call, newest first.
+
+    Pagination: ?limit= (capped at REMARKS_PAGE_MAX_LIMIT), then ?before=<next_before>.
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', REMARKS_PAGE_DEFAULT_LIMIT)), REMARKS_PAGE_MAX_LIMIT))
+        before = request.args.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return jsonify({'message': 'limit and before must be integers'}), 400
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        auth = current_auth()
+        company_id = auth.company_id
+        calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+        cursor.execute(
+            f"SELECT id, agent_number, timestamp, remarks, remarks_status, remarks_count FROM `{calls_table}` WHERE id = %s",
+            (call_id,)
+        )
+        call = cursor.fetchone()
+        if not call or (auth.role == 'agent' and call['agent_number'] != auth.agent_number):
+            return jsonify({'message': 'Call not found'}), 404
+        if call['remarks_count']:
+            remarks, next_before = list_remarks(cursor, company_id, call_id, limit, before)
+        elif before is None:
+            # Not edited yet: the uploaded remark (if any) is the whole history
+            remarks = [{'id': None, 'remark': r, 'remark_status': st, 'created_by': None, 'created_at': at}
+                       for at, r, st in reversed(legacy_entries(call['remarks'], call['remarks_status'], call['timestamp']))]
+            next_before = None
+        else:
+            remarks, next_before = [], None
+        for entry in remarks:
+            if entry.get('created_at'):
+                entry['created_at'] = entry['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({'remarks': remarks, 'next_before': next_before, 'limit': limit}), 200
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        if 'connection' in locals() and connection is not None:
+            connection.close()
+
 @calls_bp.route('/api/calls/<int:call_id>/recording', methods=['GET'])
 @token_required
 def download_call_recording(current_user_id, call_id):
@@ -286,45 +670,43 @@ def download_call_recording(current_user_id, call_id):
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
-        cursor = connection.cursor()
+        cursor = connection.cursor(buffered=True)
         # Determine company
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
-        if company_id:
-            calls_table = get_company_table_name('calls', int(company_id))
-            cursor.execute(f"SELECT recordings FROM `{calls_table}` WHERE id=%s", (call_id,))
-        else:
-            cursor.execute("SELECT recordings FROM calls WHERE id=%s", (call_id,))
+        auth = current_auth()
+        company_id = auth.company_id
+        calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+        cursor.execute(
+            f"SELECT recording_ref, recording_mime, recording_size, (recordings IS NOT NULL) "
+            f"FROM `{calls_table}` WHERE id=%s",
+            (call_id,)
+        )
         row = cursor.fetchone()
-        if not row or row[0] is None:
+        if not row or (row[0] is None and not row[3]):
             return jsonify({'message': 'Recording not found'}), 404
-        blob = row[0]
-        # Try to infer audio MIME type from file header
-        mime = 'audio/mpeg'
-        try:
-            header = bytes(blob[:4]) if isinstance(blob, (bytes, bytearray)) else b''
-            if header.startswith(b'RIFF'):
-                mime = 'audio/wav'
-            elif header.startswith(b'OggS'):
-                mime = 'audio/ogg'
-            elif header[:3] == b'ID3' or header[:2] == b'\xff\xfb':
-                mime = 'audio/mpeg'
-        except Exception:
-            pass
-        resp = send_file(io.BytesIO(blob), mimetype=mime)
-        try:
-            resp.headers['Accept-Ranges'] = 'bytes'
-        except Exception:
-            pass
-        return resp
+        ref, mime, size, has_blob = row
+        if ref:
+            store = get_recording_store()
+            path = store.local_path(ref)
+            # Content-addressed: the digest is a perfect strong validator
+            etag = ref_to_digest(ref)
+            if path:
+                source = RecordingSource(
+                    os.path.getsize(path), mime or 'audio/mpeg', etag=etag,
+                    last_modified=local_last_modified(path), path=path,
+                )
+            else:
+                source = RecordingSource(
+                    size if size is not None else store.size(ref), mime or 'audio/mpeg', etag=etag,
+                    iter_range=lambda start, length: store.iter_chunks(ref, start, length),
+                )
+        else:
+            # Legacy row whose audio is still inline; served until migrate_recordings moves it
+            cursor.execute(f"SELECT recordings FROM `{calls_table}` WHERE id=%s", (call_id,))
+            blob = bytes(cursor.fetchone()[0])
+            source = RecordingSource(
+                len(blob), sniff_audio_mime(blob[:4]), etag=hashlib.sha256(blob).hexdigest(), data=blob,
+            )
+        return send_recording(source)
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
     finally:
@@ -334,89 +716,49 @@ def download_call_recording(current_user_id, call_id):
             connection.close()
 
 
+def _job_accepted(job, message):
+    """202 response for an upload handed to the background job queue."""
+    response = jsonify({'message': message, 'job': job_to_dict(job)})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response
+
 @calls_bp.route('/api/calls/upload-corrections', methods=['POST'])
 @token_required
 def upload_call_corrections(current_user_id):
     """Accept JSON list of corrected rows and insert them.
-    Each item must include: agent_number, customer_number, name, remarks
+    Each item must include: agent_number, customer_number, name, remarks.
+    With "upsert": true, a row updates the existing 'Uploaded' call for its
+    agent/customer pair instead of adding another one.
     """
     try:
         body = request.get_json() or {}
         rows = body.get('rows', [])
-        # Decode token to get company_id
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
+        upsert = bool(body.get('upsert', False))
+        auth = current_auth()
+        company_id = auth.company_id
         if not isinstance(rows, list) or not rows:
             return jsonify({'message': 'No rows provided'}), 400
 
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
-        cursor = connection.cursor()
 
-        inserted = 0
-        errors = []
-        row_number = 1
-        for item in rows:
-            row_number += 1
-            effective_agent_number = str(item.get('agent_number', '')).strip()
-            customer_number_raw = str(item.get('customer_number', '')).strip()
-            name = str(item.get('name', '')).strip()
-            remarks = str(item.get('remarks', '')).strip()
-
-            if not effective_agent_number or not customer_number_raw:
-                errors.append({
-                    'row': row_number,
-                    'agent_number': effective_agent_number,
-                    'customer_number': customer_number_raw,
-                    'name': name,
-                    'remarks': remarks,
-                    'reason': 'Missing required agent_number or customer_number'
-                })
-                continue
-
-            digits_only = normalize_indian_mobile(customer_number_raw)
-            if not is_valid_indian_mobile(digits_only):
-                errors.append({
-                    'row': row_number,
-                    'agent_number': effective_agent_number,
-                    'customer_number': customer_number_raw,
-                    'name': name,
-                    'remarks': remarks,
-                    'reason': 'Invalid Indian mobile number'
-                })
-                continue
+        # Jobs are only visible to company admins (GET /api/jobs), so other callers run inline
+        if auth.role == 'admin' and JOBS['async_uploads'] and len(rows) > JOBS['inline_max_rows']:
+            job = submit_job(connection, int(company_id), 'calls_corrections',
+                             data=json.dumps({'rows': rows, 'upsert': upsert}).encode('utf-8'),
+                             created_by=current_user_id)
+            return _job_accepted(job, 'Corrections queued')
 
-            calls_table = get_company_table_name('calls', int(company_id))
-            cursor.execute(
-                f"""
-                INSERT INTO `{calls_table}` (agent_number, customer_number, duration, call_status, timestamp, remarks, name, remarks_status)
-                VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s)
-                """,
-                (effective_agent_number, digits_only, 0, 'Uploaded', remarks, name, '')
-            )
-            inserted += 1
-
-        connection.commit()
-        return jsonify({
-            'message': f'Processed corrections: {inserted} success, {len(errors)} errors',
-            'success_count': inserted,
-            'error_count': len(errors),
-            'errors': errors
-        }), 200
+        result = apply_corrections(connection, int(company_id), rows, upsert=upsert)
+        if result['success_count']:
+            publish(company_id, 'calls_uploaded', {'source': 'corrections', 'inserted': result['inserted'],
+                                                    'updated': result['updated']})
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
     finally:
-        if 'cursor' in locals():
-            cursor.close()
         if 'connection' in locals():
             connection.close()
 
@@ -427,38 +769,29 @@ def upload_call_recording(current_user_id, call_id):
         if 'file' not in request.files:
             return jsonify({'message': 'No file provided'}), 400
         f = request.files['file']
-        data = f.read()
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor()
         # Determine company
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
-        if company_id:
-            calls_table = get_company_table_name('calls', int(company_id))
-            # Ensure column type
-            try:
-                cursor.execute(f"ALTER TABLE `{calls_table}` MODIFY recordings LONGBLOB")
-                connection.commit()
-            except Exception:
-                pass
-            cursor.execute(f"UPDATE `{calls_table}` SET recordings=%s WHERE id=%s", (data, call_id))
-        else:
-            try:
-                cursor.execute("ALTER TABLE calls MODIFY recordings LONGBLOB")
-                connection.commit()
-            except Exception:
-                pass
-            cursor.execute("UPDATE calls SET recordings=%s WHERE id=%s", (data, call_id))
+        auth = current_auth()
+        company_id = auth.company_id
+        calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+        if request.content_length and request.content_length > RECORDING_UPLOAD['max_size'] + 64 * 1024:
+            return jsonify({'message': 'Recording too large; use the chunked upload API'}), 413
+        if detect_audio_mime(f.stream.read(16)) is None:
+            return jsonify({'message': 'File is not a supported audio format'}), 415
+        f.stream.seek(0)
+        # Stream the upload into the blob store (hashing as it goes); the row keeps only a reference
+        stored = get_recording_store().put_stream(f.stream)
+        cursor.execute(
+            f"""
+            UPDATE `{calls_table}`
+            SET recording_ref=%s, recording_size=%s, recording_mime=%s, recordings=NULL
+            WHERE id=%s
+            """,
+            (stored.ref, stored.size, stored.mime, call_id)
+        )
         connection.commit()
         return jsonify({'message': 'Recording uploaded'}), 200
     except Exception as e:
@@ -469,6 +802,117 @@ def upload_call_recording(current_user_id, call_id):
         if 'connection' in locals():
             connection.close()
 
+def _recording_upload_context():
+    """Resolve (company_id, calls_table) from the JWT for the chunked upload endpoints."""
+    company_id = current_auth().company_id or 0
+    calls_table = get_company_table_name('calls', company_id) if company_id else 'calls'
+    return company_id, calls_table
+
+def _upload_error_response(e: UploadError):
+    body = {'message': e.message}
+    body.update(e.extra)
+    return jsonify(body), e.status
+
+@calls_bp.route('/api/calls/<int:call_id>/recording/uploads', methods=['POST'])
+@token_required
+def init_recording_upload(current_user_id, call_id):
+    """Start a resumable recording upload.
+
+    JSON body: size (bytes, required), content_type, sha256 (optional hex digest to verify).
+    Returns upload_id, offset and the maximum chunk_size.
+    """
+    try:
+        company_id, calls_table = _recording_upload_context()
+        body = request.get_json(silent=True) or {}
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT id FROM `{calls_table}` WHERE id=%s", (call_id,))
+        if cursor.fetchone() is None:
+            return jsonify({'message': 'Call not found'}), 404
+        upload = create_upload(company_id, call_id, body.get('size'), body.get('content_type'), body.get('sha256'))
+        return jsonify(upload), 201
+    except UploadError as e:
+        return _upload_error_response(e)
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        if 'connection' in locals() and connection:
+            connection.close()
+
+@calls_bp.route('/api/calls/<int:call_id>/recording/uploads/<upload_id>', methods=['GET'])
+@token_required
+def get_recording_upload(current_user_id, call_id, upload_id):
+    """Report how many bytes of an upload have been received (for resuming)."""
+    try:
+        company_id, _ = _recording_upload_context()
+        return jsonify(upload_status(upload_id, company_id, call_id)), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+
+@calls_bp.route('/api/calls/<int:call_id>/recording/uploads/<upload_id>', methods=['PUT'])
+@token_required
+def put_recording_upload_chunk(current_user_id, call_id, upload_id):
+    """Append the raw request body at ?offset=N. A 409 reply carries the offset to resume from."""
+    try:
+        company_id, _ = _recording_upload_context()
+        result = append_chunk(
+            upload_id, company_id, call_id, request.args.get('offset'), request.stream, request.content_length,
+        )
+        return jsonify(result), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+
+@calls_bp.route('/api/calls/<int:call_id>/recording/uploads/<upload_id>/commit', methods=['POST'])
+@token_required
+def commit_recording_upload(current_user_id, call_id, upload_id):
+    """Verify a finished upload, move it into the recording store and attach it to the call."""
+    try:
+        company_id, calls_table = _recording_upload_context()
+        stored = finalize_upload(upload_id, company_id, call_id)
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        cursor = connection.cursor()
+        cursor.execute(
+            f"""
+            UPDATE `{calls_table}`
+            SET recording_ref=%s, recording_size=%s, recording_mime=%s, recordings=NULL
+            WHERE id=%s
+            """,
+            (stored.ref, stored.size, stored.mime, call_id)
+        )
+        connection.commit()
+        return jsonify({'message': 'Recording uploaded', 'size': stored.size, 'sha256': stored.ref.split(':', 1)[1]}), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        if 'connection' in locals() and connection:
+            connection.close()
+
+@calls_bp.route('/api/calls/<int:call_id>/recording/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+def abort_recording_upload(current_user_id, call_id, upload_id):
+    try:
+        company_id, _ = _recording_upload_context()
+        abort_upload(upload_id, company_id, call_id)
+        return jsonify({'message': 'Upload aborted'}), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+    except Exception as e:
+        return jsonify({'message': f'Server error: {str(e)}'}), 500
+
 @calls_bp.route('/api/calls/upload-template', methods=['GET'])
 @token_required
 def download_calls_template(current_user_id):
@@ -497,23 +941,16 @@ def download_calls_template(current_user_id):
 @token_required
 def upload_calls_excel(current_user_id):
     """Admin uploads calls; rows are created with status 'Uploaded'.
-    Expected form fields: file (Excel .xlsx). Optional 'agent_number' for fallback.
+    Expected form fields: file (.xlsx, .csv, .tsv or .ndjson; the text formats may be
+    gzip-compressed as .gz). Optional 'agent_number' for fallback.
     Accepts spreadsheet columns: agent_number (per row), customer/customer_number, name, remarks.
     If per-row agent_number is present, it overrides the form agent_number for that row.
     """
     try:
         # Ensure admin
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        role = data.get('role', 'admin')
-        company_id = data.get('company_id')
+        auth = current_auth()
+        role = auth.role
+        company_id = auth.company_id
         if role != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
 
@@ -522,124 +959,32 @@ def upload_calls_excel(current_user_id):
         if 'file' not in request.files:
             return jsonify({'message': 'Excel file is required'}), 400
         f = request.files['file']
-        if not f.filename.lower().endswith('.xlsx'):
-            return jsonify({'message': 'Please upload an .xlsx Excel file'}), 400
-
-        wb = load_workbook(filename=io.BytesIO(f.read()))
-        ws = wb.active
+        try:
+            fmt, gzipped = detect_format(f.filename)
+        except UnsupportedFormat as e:
+            return jsonify({'message': str(e)}), 400
 
         connection = get_db_connection()
         if connection is None:
             return jsonify({'message': 'Database connection failed'}), 500
-        cursor = connection.cursor()
 
-        inserted = 0
-        errors = []
-
-        # Build header index mapping (case-insensitive)
-        header_row = next(ws.iter_rows(values_only=True))
-        header_to_index = {}
-        if header_row:
-            for idx, header in enumerate(header_row):
-                key = str(header or '').strip().lower()
-                if key:
-                    header_to_index[key] = idx
-
-        # Resolve column indices with synonyms
-        idx_agent = header_to_index.get('agent_number')
-        idx_customer = (
-            header_to_index.get('customer')
-            if 'customer' in header_to_index
-            else header_to_index.get('customer_number')
-        )
-        idx_name = header_to_index.get('name')
-        idx_remarks = header_to_index.get('remarks')
+        if JOBS['async_uploads'] and (request.content_length or 0) > JOBS['inline_max_bytes']:
+            # Hand the file to a background worker; poll GET /api/jobs/<id> for the result
+            job = submit_job(connection, int(company_id), 'calls_upload',
+                             payload={'agent_number': agent_number, 'filename': f.filename,
+                                      'format': fmt, 'gzip': gzipped},
+                             upload=f, created_by=current_user_id)
+            return _job_accepted(job, 'Upload queued')
 
-        # Iterate data rows
-        # Iterate from second row to keep the header reference intact
-        first = True
-        row_number = 1
-        for row in ws.iter_rows(values_only=True):
-            row_number += 1
-            if first:
-                first = False
-                continue
-            if not row:
-                continue
-
-            # Helper to safely get and normalize cell text
-            def cell_text(index):
-                if index is None or index >= len(row):
-                    return ''
-                value = row[index]
-                return (value or '').strip() if isinstance(value, str) else str(value or '').strip()
-
-            row_agent_number = cell_text(idx_agent) if idx_agent is not None else ''
-            effective_agent_number = row_agent_number or agent_number
-            customer_number = cell_text(idx_customer) if idx_customer is not None else cell_text(0)
-            name = cell_text(idx_name) if idx_name is not None else cell_text(1)
-            remarks = cell_text(idx_remarks) if idx_remarks is not None else cell_text(2)
-
-            # Validate required fields
-            if not effective_agent_number or not customer_number:
-                errors.append({
-                    'row': row_number,
-                    'agent_number': effective_agent_number,
-                    'customer_number': customer_number,
-                    'name': name,
-                    'remarks': remarks,
-                    'reason': 'Missing required agent_number or customer_number'
-                })
-                continue
-
-            # Normalize and validate Indian mobile number (10 digits, allow +91/0 prefixes)
-            digits_only = normalize_indian_mobile(customer_number)
-            if not is_valid_indian_mobile(digits_only):
-                errors.append({
-                    'row': row_number,
-                    'agent_number': effective_agent_number,
-                    'customer_number': customer_number,
-                    'name': name,
-                    'remarks': remarks,
-                    'reason': 'Invalid Indian mobile number'
-                })
-                continue
-
-            # Ensure agent exists in this organization
-            agents_table = get_company_table_name('agents', int(company_id))
-            cursor.execute(f"SELECT 1 FROM `{agents_table}` WHERE agent_number = %s", (effective_agent_number,))
-            if cursor.fetchone() is None:
-                errors.append({
-                    'row': row_number,
-                    'agent_number': effective_agent_number,
-                    'customer_number': customer_number,
-                    'name': name,
-                    'remarks': remarks,
-                    'reason': 'Agent number not found in this organization'
-                })
-                continue
-
-            calls_table = get_company_table_name('calls', int(company_id))
-            cursor.execute(
-                f"""
-                INSERT INTO `{calls_table}` (agent_number, customer_number, duration, call_status, timestamp, remarks, name, remarks_status)
-                VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s)
-                """,
-                (effective_agent_number, digits_only, 0, 'Uploaded', remarks, name, '')
-            )
-            inserted += 1
-        connection.commit()
-        return jsonify({
-            'message': f'Processed file: {inserted} success, {len(errors)} errors',
-            'success_count': inserted,
-            'error_count': len(errors),
-            'errors': errors
-        }), 201
+        # Stream the file straight into batched inserts
+        rows, header_row = open_rows(f.stream, fmt, gzipped)
+        report = ingest_calls(connection, int(company_id), rows, agent_number, first_row_number=header_row)
+        if report.inserted:
+            publish(company_id, 'calls_uploaded', {'source': 'upload', 'inserted': report.inserted, 'updated': 0})
+        return jsonify(report.to_dict()), 201
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
     finally:
-        if 'cursor' in locals():
-            cursor.close()
         if 'connection' in locals():
             connection.close()
 
@@ -656,34 +1001,20 @@ def update_alternative_numbers(current_user_id, call_id):
             return jsonify({'message': 'Database connection failed'}), 500
         cursor = connection.cursor(dictionary=True)
 
-        # Update alternative numbers
+        # Alternative numbers are stored on the call's customer record
         # Determine company
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token format invalid'}), 401
-        import jwt
-        jwt_data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = jwt_data.get('company_id')
-        if company_id:
-            calls_table = get_company_table_name('calls', int(company_id))
-            cursor.execute(
-                f"""
-                UPDATE `{calls_table}` SET alternative_numbers=%s WHERE id=%s
-                """,
-                (alternative_numbers, call_id)
-            )
-        else:
-            cursor.execute(
-                """
-                UPDATE calls SET alternative_numbers=%s WHERE id=%s
-                """,
-                (alternative_numbers, call_id)
-            )
+        auth = current_auth()
+        company_id = auth.company_id
+        calls_table = get_company_table_name('calls', int(company_id)) if company_id else 'calls'
+        cursor.execute(f"SELECT customer_number FROM `{calls_table}` WHERE id=%s", (call_id,))
+        call = cursor.fetchone()
+        if not call:
+            return jsonify({'message': 'Call not found'}), 404
+        set_alternative_numbers(cursor, company_id, call['customer_number'], alternative_numbers)
         connection.commit()
+        # Every call of the customer shows the new numbers, so this is not a single-call event
+        publish(company_id, 'customer_updated', {'customer_number': call['customer_number'],
+                                                 'alternative_numbers': alternative_numbers})
         return jsonify({'message': 'Alternative numbers updated successfully'}), 200
     except Exception as e:
         return jsonify({'message': f'Server error: {str(e)}'}), 500
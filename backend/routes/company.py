@@ -1,8 +1,7 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, jsonify
 from backend.db.connection import get_db_connection
-from backend.auth.jwt_utils import token_required
+from backend.auth.jwt_utils import token_required, current_auth
 from mysql.connector import Error
-import jwt
 
 company_bp = Blueprint('company', __name__)
 
@@ -11,11 +10,9 @@ company_bp = Blueprint('company', __name__)
 @token_required
 def get_current_company(current_user_id):
     try:
-        auth_header = request.headers.get('Authorization', '')
-        token_str = auth_header.split(' ')[1] if ' ' in auth_header else ''
-        data = jwt.decode(token_str, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        company_id = data.get('company_id')
-        role = data.get('role')
+        auth = current_auth()
+        company_id = auth.company_id
+        role = auth.role
         if role not in ('admin', 'agent') or not company_id:
             return jsonify({'company': None}), 200
         connection = get_db_connection()
@@ -0,0 +1,94 @@
+import jwt
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context
+from backend.auth.jwt_utils import decode_token
+from backend.config import EVENTS
+from backend.db.connection import get_db_connection
+from backend.db.tenant_cache import is_company_blocked
+from backend.events.bus import TooManySubscribers, bus, visible_to
+
+events_bp = Blueprint('events', __name__)
+
+
+def _format(event_id, event, data) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def _stream_token():
+    # EventSource cannot set headers, so browsers pass the token as ?access_token=
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[7:]
+    return request.args.get('access_token')
+
+
+def event_stream(subscription, last_event_id, agent_number=None):
+    """SSE body: replay from Last-Event-ID, then live events with heartbeat comments.
+
+    Agents (`agent_number` set) only receive the events whose audience is them (see
+    backend.events.bus.EVENT_AUDIENCES). The subscription is released when the client
+    goes away, which the next heartbeat write detects at the latest.
+    """
+    try:
+        yield f"retry: {EVENTS['retry_ms']}\n\n"
+        if last_event_id:
+            missed = subscription.resume(last_event_id)
+            if missed is None:
+                # Too old to replay (or from before a restart): the client must reload its data
+                yield _format(bus.event_id(subscription.last_seq), 'resync', '{}')
+            else:
+                yield ''.join(_format(bus.event_id(seq), event, data)
+                              for seq, event, data, audience in missed if visible_to(agent_number, audience))
+        while True:
+            events = subscription.wait(EVENTS['heartbeat'])
+            chunk = ''.join(_format(bus.event_id(seq), event, data)
+                            for seq, event, data, audience in events if visible_to(agent_number, audience))
+            yield chunk or ': heartbeat\n\n'
+    finally:
+        subscription.close()
+
+
+@events_bp.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-sent events for the caller's company.
+
+    Events: agent_status (break/working transitions), call_updated (fields of one
+    call), customer_updated (alternative numbers of a customer) and calls_uploaded (an
+    inline upload or corrections request committed rows; queued jobs are followed
+    through GET /api/jobs/<id>, as the worker runs in its own process). Agents get
+    agent_status and call_updated about themselves only; the others go to admins.
+    Authenticate with the usual Bearer header or ?access_token=<jwt>. Reconnecting
+    clients send Last-Event-ID (or ?last_event_id=) to receive what they missed.
+    """
+    token = _stream_token()
+    if not token:
+        return jsonify({'message': 'Token missing'}), 401
+    try:
+        auth = decode_token(token)
+    except jwt.ExpiredSignatureError:
+        return jsonify({'message': 'Token expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'message': 'Token invalid'}), 401
+    g.auth = auth
+
+    company_id = auth.company_id if auth.is_tenant else None
+    if company_id:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        try:
+            if is_company_blocked(connection, company_id):
+                return jsonify({'message': 'Access disabled for this company'}), 403
+        finally:
+            connection.close()
+
+    try:
+        subscription = bus.subscribe(company_id)
+    except TooManySubscribers as e:
+        return jsonify({'message': str(e)}), 429
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    agent_number = auth.agent_number if auth.role == 'agent' else None
+    response = Response(stream_with_context(event_stream(subscription, last_event_id, agent_number)),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
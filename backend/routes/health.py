@@ -1,40 +1,58 @@
 from flask import Blueprint, jsonify
-from backend.db.connection import get_cdr_db_connection
+from backend.db.connection import get_pool_stats
+from backend.health.probes import cache as probe_cache, readiness
+from backend.events.bus import bus
 
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route('/api/health', methods=['GET'])
 def health_check():
+    """Liveness: the process is serving requests. Touches no database."""
     return jsonify({'status': 'ok'}), 200
 
+@health_bp.route('/api/health/pools', methods=['GET'])
+def pool_stats():
+    """Connection pool counters for this worker process."""
+    return jsonify({'status': 'ok', 'pools': get_pool_stats()}), 200
+
+@health_bp.route('/api/health/events', methods=['GET'])
+def event_stats():
+    """Open event streams and buffered events per company in this process."""
+    return jsonify({'status': 'ok', 'events': bus.stats()}), 200
+
+@health_bp.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness for load balancers: 503 while the database is unreachable or the pool is saturated.
+
+    Served from the cached health snapshot, so a probe does not touch the database.
+    """
+    result = readiness()
+    return jsonify({'status': 'ok' if result['ready'] else 'unavailable', **result}), 200 if result['ready'] else 503
+
+@health_bp.route('/api/health/cdr', methods=['GET'])
+def cdr_health():
+    """Cached CDR database health: ping, replication lag and approximate row count."""
+    snapshot, age = probe_cache.get()
+    cdr = snapshot['cdr']
+    status = 'ok' if cdr['ok'] and not cdr.get('degraded') else ('degraded' if cdr['ok'] else 'unavailable')
+    return jsonify({'status': status, 'age_seconds': round(age, 1), 'checked_at': snapshot['checked_at'],
+                    'cdr': cdr}), 200 if cdr['ok'] else 503
+
 @health_bp.route('/api/test-cdr', methods=['GET'])
 def test_cdr_connection():
-    try:
-        print("=== TESTING CDR CONNECTION ===")
-        connection = get_cdr_db_connection()
-        if connection is None:
-            return jsonify({'status': 'ERROR', 'message': 'CDR Database connection failed'}), 500
-        
-        cursor = connection.cursor(dictionary=True)
-        
-        # Test basic query
-        cursor.execute("SELECT COUNT(*) as total FROM calls")
-        result = cursor.fetchone()
-        total_calls = result['total'] if result else 0
-        
-        # Test sample data
-        cursor.execute("SELECT * FROM calls LIMIT 3")
-        sample_calls = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        
-        return jsonify({
-            'status': 'SUCCESS',
-            'message': 'CDR Database connection successful',
-            'total_calls': total_calls,
-            'sample_calls': sample_calls
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'status': 'ERROR', 'message': f'CDR Test failed: {str(e)}'}), 500
+    """Former CDR connection test, now answered from the cached probe.
+
+    total_calls is the table-statistics estimate, not an exact count.
+    """
+    snapshot, _ = probe_cache.get()
+    cdr = snapshot['cdr']
+    if not cdr['ok']:
+        return jsonify({'status': 'ERROR', 'message': f"CDR Database connection failed: {cdr['error']}"}), 500
+    return jsonify({
+        'status': 'SUCCESS',
+        'message': 'CDR Database connection successful',
+        'total_calls': cdr['approx_rows'],
+        'total_calls_approximate': True,
+        'replication_lag_seconds': cdr['replication_lag_seconds'],
+        'checked_at': snapshot['checked_at'],
+    }), 200
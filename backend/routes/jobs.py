@@ -0,0 +1,113 @@
+import os
+from flask import Blueprint, jsonify, request, send_file
+from mysql.connector import Error
+from backend.auth.jwt_utils import token_required, current_auth
+from backend.db.connection import get_db_connection
+from backend.jobs.queue import cancel_job, error_report_path, get_job, job_to_dict, list_jobs
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _job_company_id():
+    """Tenant whose jobs the caller may see, or None for callers without one.
+
+    Only company admins: jobs are admin uploads, and their error reports hold
+    customer numbers and names.
+    """
+    auth = current_auth()
+    if auth.role != 'admin' or not auth.company_id:
+        return None
+    return auth.company_id
+
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+@token_required
+def get_jobs(current_user_id):
+    """Most recent jobs of the caller's company."""
+    company_id = _job_company_id()
+    if company_id is None:
+        return jsonify({'jobs': []}), 200
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        return jsonify({'jobs': [job_to_dict(row) for row in list_jobs(connection, company_id, limit)]}), 200
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'connection' in locals() and connection is not None:
+            connection.close()
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job_status(current_user_id, job_id):
+    """Status, progress and (once finished) result of one job."""
+    company_id = _job_company_id()
+    if company_id is None:
+        return jsonify({'message': 'Job not found'}), 404
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        job = get_job(connection, job_id, company_id)
+        if job is None:
+            return jsonify({'message': 'Job not found'}), 404
+        return jsonify({'job': job_to_dict(job)}), 200
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'connection' in locals() and connection is not None:
+            connection.close()
+
+
+@jobs_bp.route('/api/jobs/<job_id>/errors', methods=['GET'])
+@token_required
+def download_job_errors(current_user_id, job_id):
+    """Every rejected row of a job as CSV (row, agent_number, customer_number, name, remarks, reason)."""
+    company_id = _job_company_id()
+    if company_id is None:
+        return jsonify({'message': 'Job not found'}), 404
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        job = get_job(connection, job_id, company_id)
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'connection' in locals() and connection is not None:
+            connection.close()
+    if job is None:
+        return jsonify({'message': 'Job not found'}), 404
+    path = error_report_path(job['id'])
+    if not os.path.exists(path):
+        return jsonify({'message': 'No error report for this job'}), 404
+    return send_file(path, mimetype='text/csv', as_attachment=True,
+                     download_name=f"job_{job['id']}_errors.csv")
+
+
+@jobs_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_job_route(current_user_id, job_id):
+    """Cancel a queued job, or ask a running one to stop after its current batch."""
+    company_id = _job_company_id()
+    if company_id is None:
+        return jsonify({'message': 'Unauthorized'}), 403
+    try:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({'message': 'Database connection failed'}), 500
+        job = cancel_job(connection, job_id, company_id)
+        if job is None:
+            return jsonify({'message': 'Job not found'}), 404
+        return jsonify({'job': job_to_dict(job)}), 202 if job['status'] == 'running' else 200
+    except Error as e:
+        return jsonify({'message': f'Database error: {str(e)}'}), 500
+    finally:
+        if 'connection' in locals() and connection is not None:
+            connection.close()
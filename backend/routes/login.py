@@ -3,6 +3,7 @@ import jwt
 import datetime
 from backend.db.connection import get_db_connection
 from backend.db.company_tables import get_company_table_name
+from backend.db.login_directory import companies_for_login
 from mysql.connector import Error
 import re
 
@@ -17,7 +18,7 @@ def login():
         agent_number = data.get('agentNumber')
         login_type = data.get('loginType', 'admin_or_agent')  # 'master' or default
         
-        print("Login attempt:", user_id, agent_number, password)
+        print("Login attempt:", user_id, agent_number)
 
         if not password or (not user_id and not agent_number):
             return jsonify({'message': 'User ID/Agent Number and password required'}), 400
@@ -124,50 +125,11 @@ def login():
                         }
                     }), 200
 
-        # If not an admin username, try resolve company via shared agents mapping
+        # If not an admin username, resolve the company through the login directory
+        # (one indexed lookup, then one query per company that has this login id)
         if user_id and not resolved_company_id:
-            cursor.execute(
-                """
-                SELECT id, agent_number, name, email, is_admin, status, company_id
-                FROM agents
-                WHERE agent_number = %s AND password = %s
-                """,
-                (user_id, password)
-            )
-            agent = cursor.fetchone()
-            if agent and agent.get('company_id'):
-                resolved_company_id = agent['company_id']
-                row = try_login_in_company(resolved_company_id, user_id, password)
-                if row:
-                    if row.get('status') == 'Removed':
-                        return jsonify({'message': 'You are no longer an agent.'}), 403
-                    role = 'admin' if row['is_admin'] else 'agent'
-                    token = jwt.encode({
-                        'user_id': row['id'],
-                        'agent_number': row['agent_number'],
-                        'role': role,
-                        'company_id': resolved_company_id,
-                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-                    }, current_app.config['SECRET_KEY'], algorithm='HS256')
-                    return jsonify({
-                        'message': 'Login successful',
-                        'token': token,
-                        'user': {
-                            'id': row['id'],
-                            'agent_number': row['agent_number'],
-                            'name': row['name'],
-                            'email': row['email'],
-                            'role': role,
-                            'company_id': resolved_company_id
-                        }
-                    }), 200
-
-        # As a final attempt, if user_id is present, try it as an agent_number across all companies
-        if user_id and not resolved_company_id:
-            cursor.execute("SELECT id FROM companies")
-            for comp in cursor.fetchall():
-                cid = comp['id'] if isinstance(comp, dict) else comp[0]
-                row = try_login_in_company(int(cid), user_id, password)
+            for cid in companies_for_login(cursor, user_id):
+                row = try_login_in_company(cid, user_id, password)
                 if row:
                     if row.get('status') == 'Removed':
                         return jsonify({'message': 'You are no longer an agent.'}), 403
@@ -178,7 +140,7 @@ def login():
                         'user_id': row['id'],
                         'agent_number': row['agent_number'],
                         'role': role,
-                        'company_id': int(cid),
+                        'company_id': cid,
                         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
                     }, current_app.config['SECRET_KEY'], algorithm='HS256')
                     return jsonify({
@@ -190,7 +152,7 @@ def login():
                             'name': row['name'],
                             'email': row['email'],
                             'role': role,
-                            'company_id': int(cid)
+                            'company_id': cid
                         }
                     }), 200
 
@@ -225,50 +187,8 @@ def login():
 
         # fallback: try agentNumber if provided
         if agent_number:
-            # Try resolve via shared mapping first
-            cursor.execute(
-                """
-                SELECT id, agent_number, name, email, is_admin, status, company_id
-                FROM agents
-                WHERE agent_number = %s AND password = %s
-                """,
-                (agent_number, password)
-            )
-            agent = cursor.fetchone()
-            if agent and agent.get('company_id'):
-                resolved_company_id = agent['company_id']
-                row = try_login_in_company(resolved_company_id, agent_number, password)
-                if row:
-                    if row.get('status') == 'Removed':
-                        return jsonify({'message': 'You are no longer an agent.'}), 403
-                    if row.get('status') != 'Active':
-                        return jsonify({'message': 'Your account is inactive. Please contact an administrator.'}), 403
-                    role = 'admin' if row['is_admin'] else 'agent'
-                    token = jwt.encode({
-                        'user_id': row['id'],
-                        'agent_number': row['agent_number'],
-                        'role': role,
-                        'company_id': resolved_company_id,
-                        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-                    }, current_app.config['SECRET_KEY'], algorithm='HS256')
-                    return jsonify({
-                        'message': 'Login successful',
-                        'token': token,
-                        'user': {
-                            'id': row['id'],
-                            'agent_number': row['agent_number'],
-                            'name': row['name'],
-                            'email': row['email'],
-                            'role': role,
-                            'company_id': resolved_company_id
-                        }
-                    }), 200
-
-            # Fallback: brute-force check across companies (lightweight approach)
-            cursor.execute("SELECT id FROM companies")
-            for comp in cursor.fetchall():
-                cid = comp['id'] if isinstance(comp, dict) else comp[0]
-                row = try_login_in_company(int(cid), agent_number, password)
+            for cid in companies_for_login(cursor, agent_number):
+                row = try_login_in_company(cid, agent_number, password)
                 if row:
                     if row.get('status') == 'Removed':
                         return jsonify({'message': 'You are no longer an agent.'}), 403
@@ -279,7 +199,7 @@ def login():
                         'user_id': row['id'],
                         'agent_number': row['agent_number'],
                         'role': role,
-                        'company_id': int(cid),
+                        'company_id': cid,
                         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
                     }, current_app.config['SECRET_KEY'], algorithm='HS256')
                     return jsonify({
@@ -291,7 +211,7 @@ def login():
                             'name': row['name'],
                             'email': row['email'],
                             'role': role,
-                            'company_id': int(cid)
+                            'company_id': cid
                         }
                     }), 200
 
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app
 from backend.db.connection import get_db_connection
-from backend.db.company_tables import create_company_tables, get_company_table_name
-from backend.auth.jwt_utils import token_required
+from backend.db.company_tables import get_company_table_name
+from backend.db.migrations import migrate_tenant
+from backend.db.tenant_cache import invalidate_company
+from backend.db.login_directory import sync_login
+from backend.auth.jwt_utils import token_required, current_auth
 from mysql.connector import Error
 import re
 import jwt
@@ -9,14 +12,11 @@ import jwt
 master_bp = Blueprint('master', __name__)
 
 
-def require_master(token_str):
-    try:
-        data = jwt.decode(token_str, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        if data.get('role') != 'master':
-            return None, jsonify({'message': 'Unauthorized'}), 403
-        return data, None, None
-    except Exception:
-        return None, jsonify({'message': 'Invalid token'}), 401
+def require_master():
+    auth = current_auth()
+    if auth.role != 'master':
+        return None, jsonify({'message': 'Unauthorized'}), 403
+    return auth, None, None
 
 
 @master_bp.route('/api/master/login', methods=['POST'])
@@ -71,9 +71,7 @@ def master_login():
 def list_companies(current_user_id):
     try:
         # Validate master
-        auth_header = request.headers.get('Authorization', '')
-        token_str = auth_header.split(' ')[1] if ' ' in auth_header else ''
-        data, err_resp, err_code = require_master(token_str)
+        data, err_resp, err_code = require_master()
         if err_resp:
             return err_resp, err_code
         connection = get_db_connection()
@@ -87,7 +85,7 @@ def list_companies(current_user_id):
             WHERE created_by_master_id = %s
             ORDER BY created_at DESC
             """,
-            (data['user_id'],)
+            (data.user_id,)
         )
         rows = cursor.fetchall()
         return jsonify({'companies': rows}), 200
@@ -105,9 +103,7 @@ def list_companies(current_user_id):
 def create_company(current_user_id):
     try:
         # Validate master
-        auth_header = request.headers.get('Authorization', '')
-        token_str = auth_header.split(' ')[1] if ' ' in auth_header else ''
-        data, err_resp, err_code = require_master(token_str)
+        data, err_resp, err_code = require_master()
         if err_resp:
             return err_resp, err_code
         body = request.get_json()
@@ -141,12 +137,13 @@ def create_company(current_user_id):
             INSERT INTO companies (name, admin_username, admin_password, email, contact_no, payment_status, status, created_by_master_id)
             VALUES (%s, %s, %s, %s, %s, %s, 'Active', %s)
             """,
-            (name, admin_username, admin_password, email, contact_no, payment_status, data['user_id'])
+            (name, admin_username, admin_password, email, contact_no, payment_status, data.user_id)
         )
         company_id = cursor.lastrowid
 
-        # Create per-company tables
-        create_company_tables(connection, company_id)
+        # Create per-company tables (recorded as applied tenant migrations)
+        connection.commit()
+        migrate_tenant(connection, company_id)
 
         # Seed admin user in both per-company agents_{company_id} and shared agents table (mapping)
         admin_name = f"Admin - {name}"
@@ -160,6 +157,7 @@ def create_company(current_user_id):
             """,
             (admin_username, admin_name, email, admin_password)
         )
+        sync_login(cursor, company_id, admin_username)
 
         # Do not write to shared 'agents' mapping to avoid unique/index conflicts
 
@@ -180,9 +178,7 @@ def create_company(current_user_id):
 @token_required
 def edit_company(current_user_id, company_id):
     try:
-        auth_header = request.headers.get('Authorization', '')
-        token_str = auth_header.split(' ')[1] if ' ' in auth_header else ''
-        data, err_resp, err_code = require_master(token_str)
+        data, err_resp, err_code = require_master()
         if err_resp:
             return err_resp, err_code
         body = request.get_json()
@@ -248,11 +244,19 @@ def edit_company(current_user_id, company_id):
             admin_updates.append("name = %s")
             admin_params.append(f"Admin - {body['name']}")
         if admin_updates:
+            login_ids = []
+            if 'admin_username' in body and body['admin_username'] is not None:
+                cursor.execute(f"SELECT agent_number FROM `{per_company_agents}` WHERE is_admin = TRUE")
+                login_ids = [row[0] for row in cursor.fetchall()] + [body['admin_username']]
             cursor.execute(
                 f"UPDATE `{per_company_agents}` SET {', '.join(admin_updates)} WHERE is_admin = TRUE",
                 tuple(admin_params)
             )
+            # A renamed admin logs in under the new number: drop the old entry, add the new one
+            for login_id in login_ids:
+                sync_login(cursor, company_id, login_id)
         connection.commit()
+        invalidate_company(company_id)
         return jsonify({'message': 'Company updated successfully'}), 200
     except Error as e:
         if 'connection' in locals():
@@ -269,9 +273,7 @@ def edit_company(current_user_id, company_id):
 @token_required
 def stop_company(current_user_id, company_id):
     try:
-        auth_header = request.headers.get('Authorization', '')
-        token_str = auth_header.split(' ')[1] if ' ' in auth_header else ''
-        data, err_resp, err_code = require_master(token_str)
+        data, err_resp, err_code = require_master()
         if err_resp:
             return err_resp, err_code
         connection = get_db_connection()
@@ -280,6 +282,7 @@ def stop_company(current_user_id, company_id):
         cursor = connection.cursor()
         cursor.execute("UPDATE companies SET status = 'Fully Close' WHERE id = %s", (company_id,))
         connection.commit()
+        invalidate_company(company_id)
         return jsonify({'message': 'Company service stopped (Fully Close)'}), 200
     except Error as e:
         if 'connection' in locals():
@@ -0,0 +1,209 @@
+import os
+import uuid
+from datetime import datetime, timezone
+from flask import request, Response
+from werkzeug.http import http_date
+from werkzeug.wsgi import wrap_file
+from backend.storage.recordings import CHUNK_SIZE
+
+# More ranges than this in one request are answered with the full body instead
+MAX_RANGES = 16
+
+
+class RecordingSource:
+    """Where the bytes of one recording come from.
+
+    Exactly one of `path` (local file, eligible for zero-copy), `data` (bytes already
+    in memory) or `iter_range` (callable(start, length) yielding chunks) is set.
+    """
+
+    __slots__ = ('size', 'mime', 'etag', 'last_modified', 'path', 'data', 'iter_range')
+
+    def __init__(self, size, mime, etag=None, last_modified=None, path=None, data=None, iter_range=None):
+        self.size = int(size)
+        self.mime = mime
+        self.etag = etag
+        self.last_modified = last_modified
+        self.path = path
+        self.data = data
+        self.iter_range = iter_range
+
+    def chunks(self, start, length):
+        """Yield `length` bytes from offset `start` in bounded chunks."""
+        if self.data is not None:
+            view = memoryview(self.data)
+            end = start + length
+            for pos in range(start, end, CHUNK_SIZE):
+                yield bytes(view[pos:min(pos + CHUNK_SIZE, end)])
+        elif self.path is not None:
+            with open(self.path, 'rb') as fh:
+                fh.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = fh.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+        else:
+            yield from self.iter_range(start, length)
+
+
+def _not_modified(source) -> bool:
+    if request.if_none_match:
+        return bool(source.etag) and request.if_none_match.contains(source.etag)
+    if request.if_modified_since and source.last_modified:
+        return source.last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _if_range_matches(source) -> bool:
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return bool(source.etag) and if_range == f'"{source.etag}"'
+    if source.last_modified:
+        return if_range == http_date(source.last_modified)
+    return False
+
+
+def _parse_byte_ranges(header):
+    """Parse 'bytes=a-b,c-,-n' into [(start, stop_exclusive_or_None, is_suffix)], None if malformed.
+
+    Written by hand because werkzeug's parser rejects overlapping or unordered spans,
+    which browsers and download managers do send.
+    """
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+    spans = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash:
+            return None
+        if not first:
+            if not last.isdigit():
+                return None
+            spans.append((int(last), None, True))
+        else:
+            if not first.isdigit() or (last and not last.isdigit()):
+                return None
+            start = int(first)
+            stop = int(last) + 1 if last else None
+            if stop is not None and stop <= start:
+                return None
+            spans.append((start, stop, False))
+    return spans or None
+
+
+def _resolve_ranges(size):
+    """Return a sorted, coalesced list of (start, end_exclusive) ranges, [] when the
+    header is unsatisfiable, or None when the full body should be sent."""
+    header = request.headers.get('Range')
+    if not header:
+        return None
+    parsed = _parse_byte_ranges(header)
+    if parsed is None:
+        return None
+    spans = []
+    for start, stop, is_suffix in parsed:
+        if is_suffix:
+            start, stop = max(size - start, 0), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            spans.append((start, stop))
+    if not spans:
+        return []
+    spans.sort()
+    merged = [spans[0]]
+    for start, stop in spans[1:]:
+        last_start, last_stop = merged[-1]
+        if start <= last_stop:
+            merged[-1] = (last_start, max(last_stop, stop))
+        else:
+            merged.append((start, stop))
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def _body(source, start, length):
+    """Response body for one contiguous span, zero-copy when the server supports it."""
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if source.path is not None and file_wrapper is not None:
+        # gunicorn/uwsgi turn wsgi.file_wrapper into sendfile(2) starting at the current
+        # offset and bounded by Content-Length, so the bytes never enter Python
+        fh = open(source.path, 'rb')
+        fh.seek(start)
+        return wrap_file(request.environ, fh, CHUNK_SIZE), True
+    return source.chunks(start, length), False
+
+
+def send_recording(source: RecordingSource) -> Response:
+    """Build a response for a recording honouring conditional and Range requests.
+
+    - If-None-Match / If-Modified-Since -> 304
+    - Range with one span -> 206 with Content-Range
+    - Range with several spans -> 206 multipart/byteranges
+    - Unsatisfiable Range -> 416
+    """
+    headers = {'Accept-Ranges': 'bytes', 'Cache-Control': 'private, no-cache'}
+    if source.etag:
+        headers['ETag'] = f'"{source.etag}"'
+    if source.last_modified:
+        headers['Last-Modified'] = http_date(source.last_modified)
+
+    if _not_modified(source):
+        return Response(status=304, headers=headers)
+
+    size = source.size
+    ranges = _resolve_ranges(size) if _if_range_matches(source) else None
+    if ranges == []:
+        headers['Content-Range'] = f'bytes */{size}'
+        return Response(status=416, headers=headers)
+
+    if ranges is None or (len(ranges) == 1 and ranges[0] == (0, size)):
+        body, passthrough = _body(source, 0, size)
+        headers['Content-Length'] = str(size)
+        return Response(body, status=200, mimetype=source.mime, headers=headers,
+                        direct_passthrough=passthrough)
+
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        body, passthrough = _body(source, start, stop - start)
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        headers['Content-Length'] = str(stop - start)
+        return Response(body, status=206, mimetype=source.mime, headers=headers,
+                        direct_passthrough=passthrough)
+
+    boundary = uuid.uuid4().hex
+    parts = []
+    for start, stop in ranges:
+        part_header = (
+            f'--{boundary}\r\nContent-Type: {source.mime}\r\n'
+            f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n'
+        ).encode('ascii')
+        parts.append((part_header, start, stop))
+    closing = f'--{boundary}--\r\n'.encode('ascii')
+    total = sum(len(h) + (stop - start) + 2 for h, start, stop in parts) + len(closing)
+
+    def generate():
+        for part_header, start, stop in parts:
+            yield part_header
+            yield from source.chunks(start, stop - start)
+            yield b'\r\n'
+        yield closing
+
+    headers['Content-Length'] = str(total)
+    return Response(generate(), status=206, headers=headers,
+                    content_type=f'multipart/byteranges; boundary={boundary}')
+
+
+def local_last_modified(path: str):
+    return datetime.fromtimestamp(os.stat(path).st_mtime, tz=timezone.utc)
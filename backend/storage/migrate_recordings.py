@@ -0,0 +1,102 @@
+"""Move inline LONGBLOB recordings out of calls tables into the recording store.
+
+    python -m backend.storage.migrate_recordings [--company-id N] [--batch-size 50] [--dry-run]
+
+Rows are processed in batches of ids; each blob is read on its own, written to the
+store and replaced by a reference, and every batch is committed separately, so the
+job can be stopped and re-run at any point.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.db.connection import get_db_connection
+from backend.db.company_tables import get_company_table_name
+from backend.storage.recordings import get_recording_store
+
+
+def migrate_table(connection, table: str, batch_size: int = 50, dry_run: bool = False) -> int:
+    """Move every inline recording in `table` to the store. Returns the number moved."""
+    store = get_recording_store()
+    moved = 0
+    last_id = 0
+    while True:
+        cursor = connection.cursor()
+        cursor.execute(
+            f"""
+            SELECT id FROM `{table}`
+            WHERE id > %s AND recordings IS NOT NULL AND recording_ref IS NULL
+            ORDER BY id
+            LIMIT %s
+            """,
+            (last_id, batch_size)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        if not ids:
+            break
+        last_id = ids[-1]
+        if dry_run:
+            moved += len(ids)
+            continue
+        cursor = connection.cursor(buffered=True)
+        try:
+            for call_id in ids:
+                # One blob in memory at a time
+                cursor.execute(f"SELECT recordings FROM `{table}` WHERE id = %s", (call_id,))
+                row = cursor.fetchone()
+                if not row or row[0] is None:
+                    continue
+                stored = store.put_bytes(bytes(row[0]))
+                cursor.execute(
+                    f"""
+                    UPDATE `{table}`
+                    SET recording_ref = %s, recording_size = %s, recording_mime = %s, recordings = NULL
+                    WHERE id = %s AND recording_ref IS NULL
+                    """,
+                    (stored.ref, stored.size, stored.mime, call_id)
+                )
+                moved += 1
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        print(f"{table}: moved {moved} recordings (last id {last_id})")
+    return moved
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Move inline call recordings into the recording store')
+    ap.add_argument('--company-id', type=int, help='only migrate this tenant')
+    ap.add_argument('--batch-size', type=int, default=50)
+    ap.add_argument('--dry-run', action='store_true', help='count rows that would move')
+    args = ap.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit('Database connection failed')
+    try:
+        if args.company_id:
+            tables = [get_company_table_name('calls', args.company_id)]
+        else:
+            cursor = connection.cursor()
+            cursor.execute("SELECT id FROM companies ORDER BY id")
+            tables = ['calls'] + [get_company_table_name('calls', int(r[0])) for r in cursor.fetchall()]
+            cursor.close()
+        total = 0
+        for table in tables:
+            try:
+                total += migrate_table(connection, table, args.batch_size, args.dry_run)
+            except Exception as e:
+                print(f"{table}: migration failed: {e}")
+        verb = 'would move' if args.dry_run else 'moved'
+        print(f"Done: {verb} {total} recordings")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+import abc
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from backend.config import RECORDING_STORAGE
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB read/write chunks when streaming recordings
+REF_PREFIX = 'sha256:'
+
+
+def sniff_audio_mime(header: bytes) -> str:
+    """Infer an audio MIME type from the first bytes of a file (defaults to audio/mpeg)."""
+    header = bytes(header or b'')
+    if header.startswith(b'RIFF'):
+        return 'audio/wav'
+    if header.startswith(b'OggS'):
+        return 'audio/ogg'
+    return 'audio/mpeg'
+
+
+def ref_to_digest(ref: str) -> str:
+    """Return the hex digest of a recording reference, validating its shape."""
+    if not isinstance(ref, str) or not ref.startswith(REF_PREFIX):
+        raise ValueError("Invalid recording reference")
+    digest = ref[len(REF_PREFIX):]
+    if len(digest) != 64 or any(ch not in '0123456789abcdef' for ch in digest):
+        raise ValueError("Invalid recording reference")
+    return digest
+
+
+def shard_key(digest: str) -> str:
+    """Sharded relative key for a digest: 'ab/cd/abcdef...'."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+class StoredRecording:
+    """Result of writing a recording: reference, size in bytes and sniffed MIME type."""
+
+    __slots__ = ('ref', 'size', 'mime')
+
+    def __init__(self, ref, size, mime):
+        self.ref = ref
+        self.size = size
+        self.mime = mime
+
+
+def _spool_and_hash(stream, directory=None):
+    """Copy a stream into a named temp file in CHUNK_SIZE pieces while hashing it.
+
+    Returns (temp_path, hex_digest, size, header_bytes). Memory use is one chunk.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    header = b''
+    fd, tmp_path = tempfile.mkstemp(prefix='rec-', suffix='.part', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(header) < 16:
+                    header += chunk[:16 - len(header)]
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, hasher.hexdigest(), size, header
+
+
+class RecordingStore(abc.ABC):
+    """Interface for content-addressed recording storage.
+
+    References are 'sha256:<hex digest>'; identical uploads share one stored object.
+    """
+
+    @abc.abstractmethod
+    def put_stream(self, stream) -> StoredRecording:
+        ...
+
+    @abc.abstractmethod
+    def put_file(self, path: str, digest: str, size: int, mime: str) -> StoredRecording:
+        """Store an already spooled and hashed file (the file is moved or consumed)."""
+        ...
+
+    def put_bytes(self, data: bytes) -> StoredRecording:
+        return self.put_stream(io.BytesIO(data))
+
+    @abc.abstractmethod
+    def open(self, ref: str):
+        """Return a binary file-like object positioned at the start of the recording."""
+        ...
+
+    @abc.abstractmethod
+    def size(self, ref: str) -> int:
+        ...
+
+    @abc.abstractmethod
+    def exists(self, ref: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, ref: str) -> None:
+        ...
+
+    def local_path(self, ref: str):
+        """Filesystem path of the recording when stored locally, else None."""
+        return None
+
+    def iter_chunks(self, ref: str, start: int = 0, length: int = None):
+        """Yield the recording (or a byte range of it) in CHUNK_SIZE pieces."""
+        with self.open(ref) as fh:
+            if start:
+                fh.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                want = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = fh.read(want)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+class LocalRecordingStore(RecordingStore):
+    """Recordings on the local filesystem under root/ab/cd/<sha256>."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.root, *shard_key(ref_to_digest(ref)).split('/'))
+
+    def put_stream(self, stream) -> StoredRecording:
+        tmp_path, digest, size, header = _spool_and_hash(stream, self.tmp_dir)
+        return self.put_file(tmp_path, digest, size, sniff_audio_mime(header))
+
+    def put_file(self, path, digest, size, mime) -> StoredRecording:
+        ref = REF_PREFIX + digest
+        final_path = self._path(ref)
+        if os.path.exists(final_path):
+            os.unlink(path)  # already stored: content addressing deduplicates
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            try:
+                os.replace(path, final_path)
+            except OSError:
+                # Different filesystem than the temp file; copy then rename atomically
+                staging = final_path + '.part'
+                shutil.copyfile(path, staging)
+                os.replace(staging, final_path)
+                os.unlink(path)
+        return StoredRecording(ref, size, mime)
+
+    def open(self, ref):
+        return open(self._path(ref), 'rb')
+
+    def size(self, ref):
+        return os.path.getsize(self._path(ref))
+
+    def exists(self, ref):
+        return os.path.exists(self._path(ref))
+
+    def delete(self, ref):
+        try:
+            os.unlink(self._path(ref))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, ref):
+        return self._path(ref)
+
+
+class S3RecordingStore(RecordingStore):
+    """Recordings in an S3-compatible bucket (AWS S3, MinIO or any local stand-in).
+
+    Requires boto3, which is only imported when this backend is configured.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None,
+                 region=None, prefix='recordings/', tmp_dir=None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("S3 recording storage requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix or ''
+        self.tmp_dir = tmp_dir
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+        )
+
+    def _key(self, ref):
+        return self.prefix + shard_key(ref_to_digest(ref))
+
+    def put_stream(self, stream) -> StoredRecording:
+        # Content addressing needs the digest before the key is known, so spool first
+        tmp_path, digest, size, header = _spool_and_hash(stream, self.tmp_dir)
+        return self.put_file(tmp_path, digest, size, sniff_audio_mime(header))
+
+    def put_file(self, path, digest, size, mime) -> StoredRecording:
+        ref = REF_PREFIX + digest
+        try:
+            if not self.exists(ref):
+                self.client.upload_file(path, self.bucket, self._key(ref), ExtraArgs={'ContentType': mime})
+        finally:
+            os.unlink(path)
+        return StoredRecording(ref, size, mime)
+
+    def open(self, ref):
+        return _S3ObjectReader(self.client, self.bucket, self._key(ref))
+
+    def size(self, ref):
+        head = self.client.head_object(Bucket=self.bucket, Key=self._key(ref))
+        return int(head['ContentLength'])
+
+    def exists(self, ref):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(ref))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, ref):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(ref))
+
+    def iter_chunks(self, ref, start=0, length=None):
+        kwargs = {'Bucket': self.bucket, 'Key': self._key(ref)}
+        if start or length is not None:
+            end = '' if length is None else str(start + length - 1)
+            kwargs['Range'] = f"bytes={start}-{end}"
+        body = self.client.get_object(**kwargs)['Body']
+        try:
+            for chunk in body.iter_chunks(CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+
+class _S3ObjectReader:
+    """Minimal seekable reader over an S3 object using ranged GETs."""
+
+    def __init__(self, client, bucket, key):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._pos = 0
+        self._body = None
+
+    def seek(self, offset, whence=0):
+        if whence != 0:
+            raise ValueError("Only absolute seeks are supported")
+        self._close_body()
+        self._pos = offset
+        return self._pos
+
+    def read(self, size=-1):
+        if self._body is None:
+            self._body = self._client.get_object(
+                Bucket=self._bucket, Key=self._key, Range=f"bytes={self._pos}-")['Body']
+        data = self._body.read() if size is None or size < 0 else self._body.read(size)
+        self._pos += len(data)
+        return data
+
+    def _close_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def close(self):
+        self._close_body()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_recording_store() -> RecordingStore:
+    """Process-wide recording store built from config.RECORDING_STORAGE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                cfg = dict(RECORDING_STORAGE)
+                backend = cfg.pop('backend', 'local')
+                if backend == 'local':
+                    _store = LocalRecordingStore(cfg['root'])
+                elif backend == 's3':
+                    _store = S3RecordingStore(**{k: v for k, v in cfg.items() if k != 'root'})
+                else:
+                    raise ValueError(f"Unknown recording storage backend: {backend}")
+    return _store
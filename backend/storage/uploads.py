@@ -0,0 +1,264 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from backend.config import RECORDING_UPLOAD
+from backend.storage.recordings import CHUNK_SIZE, get_recording_store
+
+# Magic numbers of the audio containers we accept, checked on the first chunk
+_AUDIO_SIGNATURES = (
+    (b'RIFF', 'audio/wav'),
+    (b'OggS', 'audio/ogg'),
+    (b'fLaC', 'audio/flac'),
+    (b'ID3', 'audio/mpeg'),
+    (b'\xff\xfb', 'audio/mpeg'),
+    (b'\xff\xf3', 'audio/mpeg'),
+    (b'\xff\xf2', 'audio/mpeg'),
+)
+
+# upload_id -> (offset, sha256 state) for chunks that arrived at this worker in order.
+# Another worker (or a restart) simply means the digest is recomputed from disk at commit.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Client-visible upload protocol error carrying an HTTP status code."""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+def detect_audio_mime(header: bytes):
+    """Return the audio MIME type for known container signatures, else None."""
+    for signature, mime in _AUDIO_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    if header[4:8] == b'ftyp':
+        return 'audio/mp4'
+    return None
+
+
+def _uploads_dir() -> str:
+    store = get_recording_store()
+    base = getattr(store, 'tmp_dir', None) or RECORDING_UPLOAD['spool_dir']
+    path = os.path.join(base, 'uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(upload_id: str):
+    try:
+        upload_id = uuid.UUID(upload_id).hex
+    except (ValueError, TypeError, AttributeError):
+        raise UploadError('Upload not found', 404)
+    base = os.path.join(_uploads_dir(), upload_id)
+    return base + '.json', base + '.part'
+
+
+def _load(upload_id, company_id, call_id):
+    meta_path, part_path = _paths(upload_id)
+    try:
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+    except FileNotFoundError:
+        raise UploadError('Upload not found', 404)
+    if meta['company_id'] != company_id or meta['call_id'] != call_id:
+        raise UploadError('Upload not found', 404)
+    if time.time() - meta['created_at'] > RECORDING_UPLOAD['session_ttl']:
+        _discard(meta['upload_id'])
+        raise UploadError('Upload expired', 410)
+    return meta, part_path
+
+
+def create_upload(company_id, call_id, size, content_type=None, sha256=None) -> dict:
+    """Start a resumable upload session and return its descriptor."""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('size is required')
+    if size <= 0:
+        raise UploadError('size must be positive')
+    if size > RECORDING_UPLOAD['max_size']:
+        raise UploadError(f"Recording exceeds the {RECORDING_UPLOAD['max_size']} byte limit", 413)
+    if content_type and content_type not in RECORDING_UPLOAD['allowed_types']:
+        raise UploadError(f'Unsupported content type: {content_type}', 415)
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path = _paths(upload_id)
+    meta = {
+        'upload_id': upload_id,
+        'company_id': company_id,
+        'call_id': call_id,
+        'size': size,
+        'content_type': content_type,
+        'sha256': (sha256 or '').lower() or None,
+        'created_at': time.time(),
+    }
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w') as fh:
+        json.dump(meta, fh)
+    _prune_hashers()
+    with _hashers_lock:
+        _hashers[upload_id] = (0, hashlib.sha256())
+    return {
+        'upload_id': upload_id,
+        'offset': 0,
+        'size': size,
+        'chunk_size': RECORDING_UPLOAD['chunk_size'],
+    }
+
+
+def upload_status(upload_id, company_id, call_id) -> dict:
+    meta, part_path = _load(upload_id, company_id, call_id)
+    return {'upload_id': meta['upload_id'], 'offset': os.path.getsize(part_path), 'size': meta['size']}
+
+
+def append_chunk(upload_id, company_id, call_id, offset, stream, content_length) -> dict:
+    """Append one chunk read from `stream` at `offset`; returns the new offset.
+
+    The chunk is copied to disk CHUNK_SIZE bytes at a time, so memory stays bounded
+    no matter how large the configured chunk size is.
+    """
+    meta, part_path = _load(upload_id, company_id, call_id)
+    upload_id = meta['upload_id']
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        raise UploadError('offset is required')
+    if content_length is None:
+        raise UploadError('Content-Length is required', 411)
+    if content_length > RECORDING_UPLOAD['chunk_size']:
+        raise UploadError(f"Chunk exceeds the {RECORDING_UPLOAD['chunk_size']} byte limit", 413)
+
+    written = 0
+    with open(part_path, 'ab') as out:
+        # One writer per upload, across threads and processes: a second PUT arriving
+        # while a chunk is written is told where to resume instead of appending too
+        try:
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Another chunk of this upload is being written', 409,
+                              offset=os.path.getsize(part_path))
+        current = os.fstat(out.fileno()).st_size
+        if offset != current:
+            # Resume protocol: the client re-sends from the offset we actually hold
+            raise UploadError('Offset mismatch', 409, offset=current)
+        if current + content_length > meta['size']:
+            raise UploadError('Chunk runs past the declared size', 413)
+        with _hashers_lock:
+            state = _hashers.get(upload_id)
+        hasher = state[1] if state and state[0] == current else None
+        while written < content_length:
+            piece = stream.read(min(CHUNK_SIZE, content_length - written))
+            if not piece:
+                break
+            if current == 0 and written == 0:
+                mime = detect_audio_mime(piece[:16])
+                if mime is None:
+                    raise UploadError('File is not a supported audio format', 415)
+            if hasher is not None:
+                hasher.update(piece)
+            out.write(piece)
+            written += len(piece)
+        out.flush()
+        new_offset = current + written
+        with _hashers_lock:
+            if hasher is not None:
+                _hashers[upload_id] = (new_offset, hasher)
+            else:
+                _hashers.pop(upload_id, None)
+    if written < content_length:
+        raise UploadError('Chunk truncated', 400, offset=new_offset)
+    return {'upload_id': upload_id, 'offset': new_offset, 'size': meta['size']}
+
+
+def finalize_upload(upload_id, company_id, call_id):
+    """Verify a complete upload and move it into the recording store.
+
+    Returns the StoredRecording; the caller records its reference on the call row.
+    """
+    meta, part_path = _load(upload_id, company_id, call_id)
+    upload_id = meta['upload_id']
+    size = os.path.getsize(part_path)
+    if size != meta['size']:
+        raise UploadError('Upload incomplete', 409, offset=size)
+    with _hashers_lock:
+        state = _hashers.pop(upload_id, None)
+    if state and state[0] == size:
+        digest = state[1].hexdigest()
+    else:
+        hasher = hashlib.sha256()
+        with open(part_path, 'rb') as fh:
+            for piece in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                hasher.update(piece)
+        digest = hasher.hexdigest()
+    if meta['sha256'] and meta['sha256'] != digest:
+        _discard(upload_id)
+        raise UploadError('Checksum mismatch', 422)
+    with open(part_path, 'rb') as fh:
+        mime = detect_audio_mime(fh.read(16)) or 'audio/mpeg'
+    stored = get_recording_store().put_file(part_path, digest, size, mime)
+    _remove(_paths(upload_id)[0])
+    return stored
+
+
+def abort_upload(upload_id, company_id, call_id) -> None:
+    meta, _ = _load(upload_id, company_id, call_id)
+    _discard(meta['upload_id'])
+
+
+def _discard(upload_id):
+    meta_path, part_path = _paths(upload_id)
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+    _remove(meta_path, part_path)
+
+
+def purge_stale_uploads() -> int:
+    """Delete upload sessions older than the configured TTL. Returns the number removed.
+
+    The job worker runs this with its periodic maintenance.
+    """
+    removed = 0
+    directory = _uploads_dir()
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith('.json'):
+                with open(path) as fh:
+                    created_at = json.load(fh).get('created_at', 0)
+                if now - created_at > RECORDING_UPLOAD['session_ttl']:
+                    _remove(path, path[:-len('.json')] + '.part')
+                    removed += 1
+            elif name.endswith('.part') and not os.path.exists(path[:-len('.part')] + '.json'):
+                if now - os.path.getmtime(path) > RECORDING_UPLOAD['session_ttl']:
+                    _remove(path)
+        except (OSError, ValueError):
+            pass
+    _prune_hashers()
+    return removed
+
+
+def _prune_hashers():
+    """Forget digest state of sessions whose files are gone (committed, aborted or purged,
+    possibly by another process)."""
+    directory = _uploads_dir()
+    with _hashers_lock:
+        for upload_id in list(_hashers):
+            if not os.path.exists(os.path.join(directory, upload_id + '.json')):
+                _hashers.pop(upload_id, None)
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -163,10 +163,8 @@ function App() {
   
     setViewAllRemarksLoading(true);
   
-    const timestamp = new Date().toLocaleString('en-GB'); // dd/mm/yyyy hh:mm:ss
-    const newFormattedRemark = `${viewAllRemarksInput.trim()} <span style='font-size:10px;color:gray;'>[${timestamp}]</span>`;
-    const oldRemarks = viewCustomer.calls[0]?.remarks || '';
-    const updatedRemarks = `${newFormattedRemark}<br/>${oldRemarks}`;
+    // The server timestamps the entry and keeps the history; calls only carry the latest remark
+    const updatedRemarks = viewAllRemarksInput.trim();
   
     const callId = viewCustomer.calls[0].id;
   
@@ -175,7 +173,7 @@ function App() {
     if (res.success) {
       // ✅ Update locally — so UI shows updated immediately
       const updatedCalls = viewCustomer.calls.map(call =>
-        call.id === callId ? { ...call, remarks: updatedRemarks } : call
+        call.id === callId ? { ...call, remarks: updatedRemarks, remarks_count: res.remarksCount } : call
       );
   
       setViewCustomer(prev => ({
@@ -456,6 +454,7 @@ function App() {
         show={!!viewCustomer}
         onClose={() => setViewCustomer(null)}
         viewCustomer={viewCustomer}
+        token={token}
         viewAllRemarksEdit={viewAllRemarksEdit}
         viewAllRemarksInput={viewAllRemarksInput}
         setViewAllRemarksInput={setViewAllRemarksInput}
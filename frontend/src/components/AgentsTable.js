@@ -46,6 +46,8 @@ const AgentsTable = ({
   const [selectedAgentBreaks, setSelectedAgentBreaks] = useState({});
   const [selectedAgentNumber, setSelectedAgentNumber] = useState('');
   const [agentBreaksLoading, setAgentBreaksLoading] = useState(false);
+  const [agentBreaksNextBefore, setAgentBreaksNextBefore] = useState(null);
+  const [agentBreaksLoadingOlder, setAgentBreaksLoadingOlder] = useState(false);
   const [showUploadModal, setShowUploadModal] = useState(false);
   const [uploadFile, setUploadFile] = useState(null);
   const [uploading, setUploading] = useState(false);
@@ -221,18 +223,43 @@ const AgentsTable = ({
     setAgentBreaksLoading(true);
     setSelectedAgentNumber(agentNumber);
     try {
-      // Use the existing getAllAgentBreaks function with agent number as search parameter
-      const data = await getAllAgentBreaks(token, agentNumber.toString());
-      console.log('Fetched agent breaks data:', data); // Debug log
-      setSelectedAgentBreaks(data || {});
+      // The server returns the newest days first; older ones are loaded on demand
+      const page = await getAllAgentBreaks(token, '', { agent_number: agentNumber.toString(), page: true });
+      setSelectedAgentBreaks(page.breaks || {});
+      setAgentBreaksNextBefore(page.next_before || null);
       setShowAgentBreaksModal(true);
     } catch (error) {
       console.error('Error fetching agent breaks:', error);
       setSelectedAgentBreaks({});
+      setAgentBreaksNextBefore(null);
     }
     setAgentBreaksLoading(false);
   };
 
+  // Append the next (older) page of days to the open breaks modal
+  const handleLoadOlderAgentBreaks = async () => {
+    if (!agentBreaksNextBefore) return;
+    setAgentBreaksLoadingOlder(true);
+    try {
+      const page = await getAllAgentBreaks(token, '', {
+        agent_number: selectedAgentNumber.toString(),
+        before: agentBreaksNextBefore,
+        page: true,
+      });
+      setSelectedAgentBreaks(prev => {
+        const merged = { ...prev };
+        Object.entries(page.breaks || {}).forEach(([date, records]) => {
+          merged[date] = [...(merged[date] || []), ...records];
+        });
+        return merged;
+      });
+      setAgentBreaksNextBefore(page.next_before || null);
+    } catch (error) {
+      console.error('Error fetching older agent breaks:', error);
+    }
+    setAgentBreaksLoadingOlder(false);
+  };
+
   // Calculate total duration for a date
   const calculateDayTotal = (records) => {
     return records.reduce((total, record) => {
@@ -545,11 +572,11 @@ const AgentsTable = ({
         <div className="fixed inset-0 bg-black bg-opacity-30 flex items-center justify-center z-50">
           <div className="bg-white rounded-lg shadow-lg p-6 w-full max-w-md relative">
             <button className="absolute top-2 right-2 text-gray-400 hover:text-gray-600" onClick={() => setShowUploadModal(false)}>&times;</button>
-            <h3 className="text-lg font-bold mb-4">Upload Calls (Excel)</h3>
+            <h3 className="text-lg font-bold mb-4">Upload Calls</h3>
             <div className="space-y-3">
               <div>
-                <label className="block text-sm font-medium mb-1">Excel File (.xlsx)</label>
-                <input type="file" accept=".xlsx" onChange={e => setUploadFile(e.target.files?.[0] || null)} />
+                <label className="block text-sm font-medium mb-1">File (.xlsx, .csv, .tsv, .ndjson, optionally .gz)</label>
+                <input type="file" accept=".xlsx,.csv,.tsv,.ndjson,.jsonl,.gz" onChange={e => setUploadFile(e.target.files?.[0] || null)} />
               </div>
               <div className="flex gap-2 pt-2">
                 <button className="flex-1 bg-gray-500 text-white py-2 rounded hover:bg-gray-600" onClick={() => setShowUploadModal(false)}>Cancel</button>
@@ -853,6 +880,17 @@ const AgentsTable = ({
                 })
               )
             )}
+            {!agentBreaksLoading && agentBreaksNextBefore && (
+              <div className="flex justify-center mt-2">
+                <button
+                  className="px-4 py-2 text-sm text-blue-600 border border-blue-300 rounded-md hover:bg-blue-50 disabled:opacity-50"
+                  onClick={handleLoadOlderAgentBreaks}
+                  disabled={agentBreaksLoadingOlder}
+                >
+                  {agentBreaksLoadingOlder ? 'Loading…' : 'Load older days'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       )}
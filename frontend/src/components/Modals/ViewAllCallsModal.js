@@ -1,9 +1,68 @@
-import React from 'react';
+import React, { useState } from 'react';
+import { fetchCallRemarks } from '../../utils/api';
+
+// Full remark history of one call, loaded from the server a page at a time
+const RemarksHistory = ({ call, token }) => {
+  const [open, setOpen] = useState(false);
+  const [entries, setEntries] = useState([]);
+  const [nextBefore, setNextBefore] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState('');
+
+  const loadPage = async (before) => {
+    setLoading(true);
+    setError('');
+    const res = await fetchCallRemarks(call.id, token, before);
+    if (res.success) {
+      setEntries((prev) => (before ? [...prev, ...res.remarks] : res.remarks));
+      setNextBefore(res.nextBefore);
+    } else {
+      setError(res.message);
+    }
+    setLoading(false);
+  };
+
+  const toggle = () => {
+    if (!open && entries.length === 0) loadPage(null);
+    setOpen(!open);
+  };
+
+  return (
+    <div className="mt-1">
+      <button className="text-xs text-blue-600 hover:underline" onClick={toggle}>
+        {open ? 'Hide history' : `All remarks${call.remarks_count ? ` (${call.remarks_count})` : ''}`}
+      </button>
+      {open && (
+        <div className="mt-1 space-y-1 border-l-2 border-gray-200 pl-2">
+          {entries.map((entry, idx) => (
+            <div key={entry.id ?? `legacy-${idx}`} className="leading-snug">
+              <span>{entry.remark}</span>{' '}
+              {entry.created_at && (
+                <span className="text-[10px] text-gray-500">[{entry.created_at}]</span>
+              )}
+            </div>
+          ))}
+          {!loading && entries.length === 0 && !error && (
+            <span className="text-gray-400 text-xs">No remarks</span>
+          )}
+          {error && <div className="text-xs text-red-600">{error}</div>}
+          {loading && <div className="text-xs text-gray-500">Loading…</div>}
+          {!loading && nextBefore && (
+            <button className="text-xs text-blue-600 hover:underline" onClick={() => loadPage(nextBefore)}>
+              Load older
+            </button>
+          )}
+        </div>
+      )}
+    </div>
+  );
+};
 
 const ViewAllCallsModal = ({
   show,
   onClose,
   viewCustomer,
+  token,
 }) => {
   if (!show) return null;
   const mostRecentCall = viewCustomer?.calls?.[0];
@@ -96,6 +155,7 @@ const ViewAllCallsModal = ({
                       ) : (
                         <span className="text-gray-400 text-xs">-</span>
                       )}
+                      {(call.remarks || call.remarks_count > 0) && <RemarksHistory key={`${call.id}-${call.remarks_count}`} call={call} token={token} />}
                     </td>
                     <td className="px-6 py-4 text-sm">
                       {call.recordings ? (
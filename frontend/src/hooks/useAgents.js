@@ -71,9 +71,9 @@ export default function useAgents() {
     return await apiCloseLatestAgentBreak(agentNumber, breakEnd, token);
   };
 
-  // Fetch all agent break/working status records (admin)
-  const getAllAgentBreaks = async (token, search = '') => {
-    return await fetchAllAgentBreaks(token, search);
+  // Fetch agent break/working status records (admin); see fetchAllAgentBreaks for options
+  const getAllAgentBreaks = async (token, search = '', options = {}) => {
+    return await fetchAllAgentBreaks(token, search, options);
   };
 
   const resetAgents = () => {
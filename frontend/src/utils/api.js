@@ -194,12 +194,29 @@ export const handleSaveViewAllRemarks = async (callId, remarksData, token) => {
       body: JSON.stringify(remarksData),
     });
     if (response.ok) {
-      return { success: true };
+      const data = await response.json();
+      return { success: true, remarksCount: data.remarks_count };
     }
   } catch (err) {}
   return { success: false };
 };
 
+// Remark history of one call, newest first; pass the previous page's next_before to continue.
+export const fetchCallRemarks = async (callId, token, before = null, limit = 20) => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (before) params.set('before', String(before));
+  try {
+    const res = await fetch(`${API_BASE}/calls/${callId}/remarks?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    const data = await res.json();
+    if (res.ok) return { success: true, remarks: data.remarks, nextBefore: data.next_before };
+    return { success: false, message: data.message || 'Failed to load remarks' };
+  } catch (err) {
+    return { success: false, message: 'Network error. Please try again.' };
+  }
+};
+
 export const postAgentBreakStatus = async (breakData, token) => {
   try {
     const response = await fetch(`${API_BASE}/agents/breaks`, {
@@ -238,6 +255,36 @@ export const downloadCallsTemplate = async (token) => {
   return true;
 };
 
+// Large uploads run as background jobs (HTTP 202); poll until the job finishes and
+// resolve with its result, which has the same shape as a synchronous upload response.
+export const fetchJob = async (jobId, token) => {
+  const res = await fetch(`${API_BASE}/jobs/${jobId}`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  if (!res.ok) return null;
+  const data = await res.json();
+  return data.job;
+};
+
+export const waitForJob = async (jobId, token, failureMessage = 'Job failed', intervalMs = 1500) => {
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const job = await fetchJob(jobId, token);
+    if (!job) return { success: false, message: failureMessage };
+    if (job.status === 'succeeded') return { success: true, data: job.result, job };
+    if (job.status === 'failed') return { success: false, message: job.error || failureMessage, job };
+    if (job.status === 'cancelled') return { success: false, message: 'Upload was cancelled', job };
+  }
+};
+
+export const cancelJob = async (jobId, token) => {
+  const res = await fetch(`${API_BASE}/jobs/${jobId}/cancel`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  return res.ok;
+};
+
 export const uploadCallsExcel = async (file, token) => {
   const form = new FormData();
   form.append('file', file);
@@ -248,6 +295,7 @@ export const uploadCallsExcel = async (file, token) => {
       body: form,
     });
     const data = await res.json();
+    if (res.status === 202) return waitForJob(data.job.id, token, 'Upload failed');
     if (res.ok) return { success: true, data };
     return { success: false, message: data.message || 'Upload failed' };
   } catch (e) {
@@ -266,6 +314,7 @@ export const uploadCallCorrections = async (rows, token) => {
       body: JSON.stringify({ rows }),
     });
     const data = await res.json();
+    if (res.status === 202) return waitForJob(data.job.id, token, 'Correction upload failed');
     if (res.ok) return { success: true, data };
     return { success: false, message: data.message || 'Correction upload failed' };
   } catch (e) {
@@ -273,6 +322,29 @@ export const uploadCallCorrections = async (rows, token) => {
   }
 };
 
+// Server-side export of every call matching the filters; format is csv, xlsx, parquet or arrow.
+// Options: from, to (YYYY-MM-DD).
+export const downloadCallsExport = async (token, format = 'csv', options = {}) => {
+  const params = new URLSearchParams({ format });
+  Object.entries(options).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') params.set(key, value);
+  });
+  const res = await fetch(`${API_BASE}/calls/export?${params}`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  if (!res.ok) return false;
+  const blob = await res.blob();
+  const url = window.URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = `calls.${format}`;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  window.URL.revokeObjectURL(url);
+  return true;
+};
+
 export const fetchCallRecordingUrl = async (callId, token) => {
   const res = await fetch(`${API_BASE}/calls/${callId}/recording`, {
     headers: { Authorization: `Bearer ${token}` },
@@ -282,16 +354,24 @@ export const fetchCallRecordingUrl = async (callId, token) => {
   return URL.createObjectURL(blob);
 };
 
-export const fetchAllAgentBreaks = async (token, search = '') => {
+// One page of days; pass { before: page.next_before } for the next (older) page.
+// Options: from, to (YYYY-MM-DD), days, before, search_mode ('prefix' | 'fulltext'),
+// agent_number, aggregate. Set page: true to get the whole response instead of the breaks.
+export const fetchAllAgentBreaks = async (token, search = '', options = {}) => {
   try {
-    let url = `${API_BASE}/agents/breaks`;
-    if (search) url += `?search=${encodeURIComponent(search)}`;
-    const response = await fetch(url, {
+    const { page, ...filters } = options;
+    const params = new URLSearchParams();
+    if (search) params.set('search', search);
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') params.set(key, value);
+    });
+    const query = params.toString();
+    const response = await fetch(`${API_BASE}/agents/breaks${query ? `?${query}` : ''}`, {
       headers: { Authorization: `Bearer ${token}` },
     });
     if (response.ok) {
       const data = await response.json();
-      return data.breaks || {};
+      return page ? data : data.breaks || {};
     }
   } catch (err) {
     console.error('Failed to fetch agent breaks:', err);
@@ -399,4 +479,54 @@ export const stopCompany = async (companyId, token) => {
   } catch (e) {
     return { success: false, message: 'Network error' };
   }
-};
\ No newline at end of file
+};
+// Live updates (agent_status, call_updated, customer_updated, calls_uploaded).
+// EventSource reconnects by itself and resumes from the last event it saw; on
+// 'resync' the missed events are gone and the caller should refetch its data.
+export const openEventStream = (token, handlers = {}) => {
+  const source = new EventSource(`${API_BASE}/events?access_token=${encodeURIComponent(token)}`);
+  ['agent_status', 'call_updated', 'customer_updated', 'calls_uploaded', 'resync'].forEach((type) => {
+    if (handlers[type]) {
+      source.addEventListener(type, (e) => handlers[type](JSON.parse(e.data)));
+    }
+  });
+  return source;
+};
+
+// Call analytics from the server-side rollups.
+// Options: from, to (YYYY-MM-DD), granularity ('day' | 'hour'), agent_number, top.
+export const fetchCallAnalytics = async (token, options = {}) => {
+  const params = new URLSearchParams();
+  Object.entries(options).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') params.set(key, value);
+  });
+  try {
+    const res = await fetch(`${API_BASE}/analytics/calls?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    const data = await res.json();
+    if (res.ok) return { success: true, data };
+    return { success: false, message: data.message || 'Failed to load analytics' };
+  } catch (err) {
+    return { success: false, message: 'Network error. Please try again.' };
+  }
+};
+
+// Agent productivity: talk, break, working and idle time per agent.
+// Options: from, to (YYYY-MM-DD), agent_number, per_day.
+export const fetchAgentProductivity = async (token, options = {}) => {
+  const params = new URLSearchParams();
+  Object.entries(options).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') params.set(key, value);
+  });
+  try {
+    const res = await fetch(`${API_BASE}/analytics/agents?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    const data = await res.json();
+    if (res.ok) return { success: true, data };
+    return { success: false, message: data.message || 'Failed to load agent productivity' };
+  } catch (err) {
+    return { success: false, message: 'Network error. Please try again.' };
+  }
+};